@@ -0,0 +1,54 @@
+# Benchmark: fft_denoise_signal (rfft/irfft, batched) vs the original complex fft/ifft version.
+# Usage: python bench_denoise.py [--repeats N]
+import argparse
+import time
+import numpy as np
+from scipy.fft import fft, ifft
+from data_analyzer import fft_denoise_signal
+
+
+def legacy_fft_denoise(data, threshold_percent=0.1):
+    """The original implementation: full complex FFT, one signal at a time."""
+    n = len(data)
+    f_hat = fft(data)
+    psd = np.abs(f_hat) / n
+    limit = np.max(psd) * threshold_percent
+    indices = psd > limit
+    f_hat_clean = f_hat * indices
+    return np.real(ifft(f_hat_clean))
+
+
+def best_of(repeats, func, *args, **kwargs):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark FFT denoising implementations.")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'samples':>9} {'legacy':>10} {'rfft f64':>10} {'rfft f32':>10} {'speedup':>8} {'batch/rows':>11} {'per-row':>8} {'max err':>9}")
+    for n in (1_000, 10_000, 100_000, 1_000_000):
+        t = np.arange(n) / 1000.0
+        signal = np.sin(2 * np.pi * 1.2 * t) + 0.3 * rng.standard_normal(n)
+        signal32 = signal.astype(np.float32)
+
+        legacy = best_of(args.repeats, legacy_fft_denoise, signal)
+        new64 = best_of(args.repeats, fft_denoise_signal, signal)
+        new32 = best_of(args.repeats, fft_denoise_signal, signal32)
+        error = np.max(np.abs(fft_denoise_signal(signal) - legacy_fft_denoise(signal)))
+
+        # Batch: 64 signals per call, against 64 legacy calls
+        rows = max(1, min(64, 64_000_000 // (n * 8)))
+        batch = np.tile(signal32, (rows, 1))
+        legacy_rows = best_of(1, lambda: [legacy_fft_denoise(row) for row in batch])
+        new_batch = best_of(args.repeats, fft_denoise_signal, batch)
+
+        print(f"{n:>9,} {legacy * 1000:>8.2f}ms {new64 * 1000:>8.2f}ms {new32 * 1000:>8.2f}ms "
+              f"{legacy / new32:>7.1f}x {new_batch * 1000:>7.1f}ms/{rows:<3} {legacy_rows / new_batch:>7.1f}x {error:>9.1e}")
@@ -0,0 +1,87 @@
+# Validation + benchmark: vectorized cohort R-peaks (analyze_ecg_cohort) vs NeuroKit (ecg_summary).
+# Usage: python bench_ecg_cohort.py [--csv merged_patient_ecg_data.csv] [--window-seconds 10]
+# Compares R-peaks on the data_generator cohort (1 s records) and HR/SDNN on longer
+# windows cut from ecg_1d_timeseries_prediction.csv, where RR statistics are meaningful.
+import argparse
+import os
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from data_analyzer import analyze_ecg_cohort, ecg_summary
+
+# Detected beats within this distance of a NeuroKit R-peak count as the same beat
+MATCH_TOLERANCE_MS = 10.0
+# NeuroKit's smoothing windows rarely report beats this close to a record edge
+EDGE_SECONDS = 0.5
+
+
+def compare_peaks(vectorized, reference, n_samples, sampling_rate):
+    """(matched, missed, extra, extra near an edge, mean |offset| ms) over all records."""
+    tolerance = MATCH_TOLERANCE_MS * sampling_rate / 1000.0
+    edge = EDGE_SECONDS * sampling_rate
+    matched = missed = extra = extra_edge = 0
+    offsets = []
+    for ours, theirs in zip(vectorized, reference):
+        for peak in theirs:
+            distance = np.abs(ours - peak).min() if len(ours) else np.inf
+            if distance <= tolerance:
+                matched += 1
+                offsets.append(distance)
+            else:
+                missed += 1
+        for peak in ours:
+            if len(theirs) == 0 or np.abs(theirs - peak).min() > tolerance:
+                extra += 1
+                extra_edge += peak < edge or peak >= n_samples - edge
+    mean_offset = np.mean(offsets) * 1000.0 / sampling_rate if offsets else np.nan
+    return matched, missed, extra, extra_edge, mean_offset
+
+
+def run(name, signals, sampling_rate):
+    records = [(0, i, signal) for i, signal in enumerate(signals)]
+    analyze_ecg_cohort(records[:1], sampling_rate=sampling_rate)  # warm-up: loads SciPy
+
+    start = time.perf_counter()
+    fast = analyze_ecg_cohort(records, sampling_rate=sampling_rate)
+    fast_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        reference = [ecg_summary(signal, sampling_rate) for signal in signals]
+    reference_s = time.perf_counter() - start
+
+    matched, missed, extra, extra_edge, offset = compare_peaks(
+        fast['r_peaks'], [r['r_peaks'] for r in reference], signals.shape[1], sampling_rate)
+    print(f"{name}: {len(signals)} records x {signals.shape[1]} samples")
+    print(f"  NeuroKit {reference_s:.2f}s, vectorized {fast_s * 1000:.1f}ms ({reference_s / fast_s:,.0f}x)")
+    print(f"  beats matched {matched}, missed {missed}, extra {extra} ({extra_edge} within {EDGE_SECONDS}s of an edge), "
+          f"mean offset {offset:.1f}ms")
+
+    for field in ('mean_hr_bpm', 'sdnn_ms', 'rmssd_ms'):
+        theirs = np.array([r[field] for r in reference], dtype=float)
+        difference = np.abs(fast[field].to_numpy(dtype=float) - theirs)
+        both = ~np.isnan(difference)
+        if both.any():
+            print(f"  {field}: {both.sum()} comparable, median |diff| {np.median(difference[both]):.2f}, "
+                  f"max {difference[both].max():.2f}")
+
+
+if __name__ == "__main__":
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Validate and time the vectorized cohort ECG path.")
+    parser.add_argument("--csv", default=os.path.join(here, "merged_patient_ecg_data.csv"))
+    parser.add_argument("--recording", default=os.path.join(here, "ecg_1d_timeseries_prediction.csv"))
+    parser.add_argument("--window-seconds", type=float, default=10.0)
+    parser.add_argument("--sampling-rate", type=float, default=1000.0)
+    args = parser.parse_args()
+
+    cohort = pd.read_csv(args.csv)
+    signals = np.array([np.array(text.split(','), dtype=float) for text in cohort['ECG Signal']])
+    run("Generated cohort", signals, args.sampling_rate)
+
+    recording = pd.read_csv(args.recording, sep=';')['ecg_value'].to_numpy(dtype=float)
+    width = int(args.window_seconds * args.sampling_rate)
+    starts = range(0, len(recording) - width, int(args.sampling_rate * 0.1))
+    run(f"{args.window_seconds:g}s windows", np.array([recording[s:s + width] for s in starts]), args.sampling_rate)
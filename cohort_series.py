@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+# Resampling periods, as NumPy datetime64 units
+RESAMPLE_FREQUENCIES = {'D': 'Daily', 'W': 'Weekly', 'M': 'Monthly', 'Y': 'Yearly'}
+DEFAULT_BAND_FREQ = 'M'
+DEFAULT_BAND_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def parse_timestamps(dates):
+    """
+    Date strings (any mix of formats pandas understands) -> int64 Unix seconds, plus a
+    mask of the entries that parsed. Repeated strings are parsed once.
+    """
+    parsed = pd.to_datetime(pd.Series(dates, dtype=object), format='mixed', errors='coerce')
+    valid = parsed.notna().to_numpy()
+    seconds = np.zeros(len(parsed), dtype=np.int64)
+    if valid.any():
+        seconds[valid] = parsed[valid].to_numpy(dtype='datetime64[s]').astype(np.int64)
+    return seconds, valid
+
+
+def _group_bounds(group_ids):
+    """First and one-past-last position of each row's group (rows sorted by group)."""
+    group_ids = np.asarray(group_ids)
+    n = len(group_ids)
+    starts = np.flatnonzero(np.r_[True, group_ids[1:] != group_ids[:-1]])
+    ends = np.r_[starts[1:], n]
+    sizes = ends - starts
+    return np.repeat(starts, sizes), np.repeat(ends, sizes)
+
+
+def grouped_rolling_mean(group_ids, values, window):
+    """
+    Centered moving average of every group at once (rows sorted by group, then time),
+    from one cumulative sum. Windows are clipped at each group's first and last row,
+    like pandas rolling(window, center=True, min_periods=1) applied per group.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n == 0:
+        return values.copy()
+    window = max(1, int(window))
+    first, end = _group_bounds(group_ids)
+    positions = np.arange(n)
+    lo = np.maximum(positions - window // 2, first)
+    hi = np.minimum(positions + (window - 1 - window // 2) + 1, end)
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    return (cumulative[hi] - cumulative[lo]) / (hi - lo)
+
+
+def resample_groups(group_ids, timestamps, values, freq=DEFAULT_BAND_FREQ):
+    """
+    Mean of each group's values per calendar period (rows sorted by group, then time),
+    so every group counts once per period however often it was measured.
+    Returns (group_ids, period starts as datetime64[s], means, counts), one entry per
+    (group, period) that has data.
+    """
+    if freq not in RESAMPLE_FREQUENCIES:
+        raise ValueError(f"Unknown resampling frequency '{freq}'")
+    group_ids = np.asarray(group_ids)
+    values = np.asarray(values, dtype=np.float64)
+    # Integer timestamps are Unix seconds; datetime64 of any unit works too
+    periods = np.asarray(timestamps).astype('datetime64[s]').astype(f'datetime64[{freq}]')
+    if len(values) == 0:
+        return group_ids[:0], periods.astype('datetime64[s]'), values[:0], np.zeros(0, dtype=np.int64)
+
+    # A new bucket starts wherever the group or the period changes
+    starts = np.flatnonzero(np.r_[True, (group_ids[1:] != group_ids[:-1]) | (periods[1:] != periods[:-1])])
+    counts = np.diff(np.r_[starts, len(values)])
+    means = np.add.reduceat(values, starts) / counts
+    return group_ids[starts], periods[starts].astype('datetime64[s]'), means, counts
+
+
+def percentile_bands(bins, values, percentiles=DEFAULT_BAND_PERCENTILES):
+    """
+    Percentiles of the values in each bin, for all bins at once: one sort, then linear
+    interpolation between order statistics as in np.percentile.
+    Returns (unique bins, (n_bins, len(percentiles)) array, counts per bin).
+    """
+    bins = np.asarray(bins)
+    values = np.asarray(values, dtype=np.float64)
+    fractions = np.asarray(percentiles, dtype=np.float64) / 100.0
+    if len(values) == 0:
+        return bins[:0], np.empty((0, len(fractions))), np.zeros(0, dtype=np.int64)
+
+    order = np.lexsort((values, bins))
+    bins, values = bins[order], values[order]
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    counts = np.diff(np.r_[starts, len(values)])
+
+    positions = starts[:, None] + fractions[None, :] * (counts[:, None] - 1)
+    below = np.floor(positions).astype(np.int64)
+    above = np.minimum(below + 1, (starts + counts - 1)[:, None])
+    weight = positions - below
+    bands = values[below] * (1.0 - weight) + values[above] * weight
+    return bins[starts], bands, counts
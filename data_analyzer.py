@@ -1,10 +1,21 @@
+import os
+import threading
+import time
+import warnings
+from statistics import NormalDist
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import neurokit2 as nk
-from scipy.signal import find_peaks
-from scipy.fft import fft, ifft
+from signal_codec import to_signal_array, signal_sampling_rate
+from lazy_imports import LazyModule
+
+# Heavy dependencies load on first use (most sessions never run ECG/EEG analysis)
+plt = LazyModule('matplotlib.pyplot')
+sns = LazyModule('seaborn')
+nk = LazyModule('neurokit2')
+sps = LazyModule('scipy.signal')
+sp_fft = LazyModule('scipy.fft')
+sp_ndimage = LazyModule('scipy.ndimage')
 
 def load_data(file_path):
     """Loads the heart_disease.csv dataset into a pandas DataFrame."""
@@ -50,23 +61,105 @@ def apply_threshold_filter(df, column, min_val=None, max_val=None):
         
     return filtered_df
 
-def fft_denoise_signal(data, threshold_percent=0.1):
+def column_quartiles(values):
+    """(Q1, Q3) of every column of a 2-D array in one np.nanquantile call (2 x k; NaN for empty columns)."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanquantile(np.asarray(values, dtype=np.float64), [0.25, 0.75], axis=0)
+
+def iqr_outlier_mask(values, factor=1.5, how='any', quartiles=None):
+    """
+    Rows of a 2-D array (or DataFrame) inside the Tukey fences of every column, in one pass:
+    all quartiles come from a single np.nanquantile call and one boolean mask is built.
+    factor may be one value or one per column; quartiles (optional, 2 x k) replaces the
+    computed ones, e.g. cohort quartiles from DatabaseManager.get_metric_quantiles.
+    how='any' drops a row when any column is out of bounds (the column-by-column filter),
+    how='all' only when every column is. Missing values count as out of bounds.
+    Returns a boolean mask of the rows to keep.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    if quartiles is None:
+        quartiles = column_quartiles(values)
+    q1, q3 = np.asarray(quartiles, dtype=np.float64)
+    spread = np.asarray(factor, dtype=np.float64) * (q3 - q1)
+
+    inside = (values >= q1 - spread) & (values <= q3 + spread)
+    if how == 'any':
+        return inside.all(axis=1)
+    if how == 'all':
+        return inside.any(axis=1)
+    raise ValueError(f"how must be 'any' or 'all', not {how!r}")
+
+def iqr_filter(df, columns=None, factor=1.5, how='any', quartiles=None):
+    """DataFrame rows kept by iqr_outlier_mask over `columns` (default: every numeric column)."""
+    if columns is None:
+        columns = df.select_dtypes(include=np.number).columns
+    columns = list(columns)
+    if not columns:
+        return df.copy()
+    mask = iqr_outlier_mask(df[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64),
+                            factor, how, quartiles)
+    return df[mask]
+
+class FFTDenoiser:
+    """
+    Reusable denoising plan for one (signal length, dtype): keeps the spectrum-magnitude
+    workspace between calls, and scipy.fft caches the FFT plan for the length, so
+    repeated calls on equally long signals allocate only the spectrum itself.
+    """
+
+    def __init__(self, n, dtype=np.float64, threshold_percent=0.1):
+        self.n = n
+        self.dtype = np.dtype(dtype)
+        self.threshold_percent = threshold_percent
+        self._workspace = threading.local()  # per thread: GUI workers may share a plan
+
+    def __call__(self, data, out=None, overwrite_x=False, workers=None):
+        """Denoises a 1-D signal or each row of a 2-D (signals x samples) array."""
+        spectrum = sp_fft.rfft(data, axis=-1, overwrite_x=overwrite_x, workers=workers)
+
+        # |X| of the real FFT (half spectrum) has the same maximum as the full FFT's,
+        # and the mask is conjugate-symmetric, so this equals the complex fft/ifft result
+        magnitude = getattr(self._workspace, 'magnitude', None)
+        if magnitude is None or magnitude.shape != spectrum.shape or magnitude.dtype != spectrum.real.dtype:
+            magnitude = self._workspace.magnitude = np.empty(spectrum.shape, dtype=spectrum.real.dtype)
+        np.abs(spectrum, out=magnitude)
+        limit = magnitude.max(axis=-1, keepdims=True) * self.threshold_percent
+        spectrum[magnitude <= limit] = 0
+
+        cleaned = sp_fft.irfft(spectrum, n=self.n, axis=-1, overwrite_x=True, workers=workers)
+        if out is None:
+            return cleaned
+        np.copyto(out, cleaned)
+        return out
+
+
+_denoisers = {}
+
+def fft_denoise_signal(data, threshold_percent=0.1, out=None, overwrite_x=False, workers=None):
     """
-    NEW: Cleans a signal by zeroing out low-amplitude noise in the frequency domain.
+    Cleans a signal by zeroing out low-amplitude noise in the frequency domain.
     This is used for the 'Cleaned Signal' visualization in the GUI.
+    Accepts one signal or a 2-D batch (thresholded per row); float32 input stays float32.
+    out / overwrite_x let callers reuse buffers; workers parallelizes large batches.
     """
     if data is None or len(data) == 0:
         return data
 
-    n = len(data)
-    f_hat = fft(data) # Move to frequency domain
-    psd = np.abs(f_hat) / n # Power spectrum
-    
-    limit = np.max(psd) * threshold_percent
-    indices = psd > limit # Mask for significant frequencies
-    f_hat_clean = f_hat * indices
-    
-    return np.real(ifft(f_hat_clean)) # Back to time domain
+    data = np.asarray(data)
+    if data.dtype not in (np.float32, np.float64):
+        data = data.astype(np.float64)
+
+    # One plan per (length, dtype, threshold); a handful covers the GUI's signals
+    key = (data.shape[-1], data.dtype, threshold_percent)
+    denoiser = _denoisers.get(key)
+    if denoiser is None:
+        if len(_denoisers) >= 16:
+            _denoisers.clear()
+        denoiser = _denoisers[key] = FFTDenoiser(data.shape[-1], data.dtype, threshold_percent)
+    return denoiser(data, out=out, overwrite_x=overwrite_x, workers=workers)
 
 # ==========================================
 # ADVANCED ECG & EEG ANALYSIS (UPDATED)
@@ -81,21 +174,274 @@ def analyze_ecg_signal(signal_data, sampling_rate=1000):
     signals, info = nk.ecg_process(signal_data, sampling_rate=sampling_rate)
     
     # Manual peak detection for verification/custom logic
-    peaks, _ = find_peaks(signal_data, distance=sampling_rate*0.6, height=np.mean(signal_data))
+    peaks, _ = sps.find_peaks(signal_data, distance=sampling_rate*0.6, height=np.mean(signal_data))
     
     return signals, info, peaks
 
+def ecg_summary(signal_data, sampling_rate=1000):
+    """
+    Compact R-peak / heart-rate / HRV summary of one ECG.
+    Uses analyze_ecg_signal; records too short for the full nk.ecg_process pipeline
+    fall back to NeuroKit's cleaner + R-peak detector.
+    """
+    signal_data = np.asarray(signal_data, dtype=np.float64)
+    try:
+        _, info, _ = analyze_ecg_signal(signal_data, sampling_rate=sampling_rate)
+        method = "ecg_process"
+    except Exception:
+        cleaned = nk.ecg_clean(signal_data, sampling_rate=sampling_rate)
+        _, info = nk.ecg_peaks(cleaned, sampling_rate=sampling_rate)
+        method = "ecg_peaks"
+
+    r_peaks = np.asarray(info['ECG_R_Peaks'], dtype=np.int64)
+    rr_ms = np.diff(r_peaks) * 1000.0 / sampling_rate
+    mean_rr = rr_ms.mean() if len(rr_ms) > 0 else np.nan
+    return {
+        'method': method,
+        'r_peaks': r_peaks,
+        'n_peaks': len(r_peaks),
+        'mean_hr_bpm': 60000.0 / mean_rr if len(rr_ms) > 0 else np.nan,
+        'mean_rr_ms': mean_rr,
+        'sdnn_ms': rr_ms.std(ddof=1) if len(rr_ms) > 1 else np.nan,
+        'rmssd_ms': np.sqrt(np.mean(np.diff(rr_ms) ** 2)) if len(rr_ms) > 2 else np.nan,
+    }
+
+def _ecg_batch_chunk(chunk):
+    """Worker entry point (module level so it pickles): summarizes one chunk of records."""
+    rows = []
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # NeuroKit warns per record on short/flat signals
+        for patient_id, report_id, signal_data, sampling_rate in chunk:
+            start = time.process_time()  # CPU time: stays honest when workers share cores
+            row = {'patient_id': patient_id, 'report_id': report_id,
+                   'n_samples': len(signal_data), 'sampling_rate': sampling_rate}
+            try:
+                row.update(ecg_summary(signal_data, sampling_rate))
+                row['error'] = None
+            except Exception as e:
+                row.update({'method': None, 'r_peaks': np.empty(0, dtype=np.int64), 'n_peaks': 0,
+                            'mean_hr_bpm': np.nan, 'mean_rr_ms': np.nan, 'sdnn_ms': np.nan,
+                            'rmssd_ms': np.nan, 'error': str(e)})
+            row['processing_ms'] = (time.process_time() - start) * 1000.0
+            rows.append(row)
+    return rows
+
+def _run_batch(chunk_function, records, sampling_rate, max_workers, chunk_size):
+    """
+    Shared fan-out for the batch analyzers: decodes (patient_id, report_id, signal) records,
+    where signal is an array, legacy CSV text or an encoded BLOB (whose header rate wins
+    over sampling_rate), and maps chunk_function over chunks of them in a ProcessPoolExecutor;
+    a single worker runs in-process. Returns one row per record, in input order.
+    """
+    # 1. Decode in the parent; float32 halves what gets pickled to the workers
+    items = []
+    for patient_id, report_id, raw_signal in records:
+        signal_data = to_signal_array(raw_signal)
+        if signal_data is None:
+            continue
+        items.append((patient_id, report_id, np.asarray(signal_data, dtype=np.float32),
+                      signal_sampling_rate(raw_signal, default=sampling_rate)))
+    if not items:
+        return pd.DataFrame()
+
+    # 2. Several chunks per worker keeps the pool balanced without per-record IPC
+    workers = max_workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(items) // (workers * 4)))
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+    if workers == 1 or len(chunks) == 1:
+        rows = [row for chunk in chunks for row in chunk_function(chunk)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = [row for chunk_rows in pool.map(chunk_function, chunks) for row in chunk_rows]
+    return pd.DataFrame(rows)
+
+def analyze_ecg_batch(records, sampling_rate=1000, max_workers=None, chunk_size=None):
+    """
+    Summarizes many ECGs in parallel. records: iterable of (patient_id, report_id, signal).
+    Returns one row per record, in input order.
+    """
+    return _run_batch(_ecg_batch_chunk, records, sampling_rate, max_workers, chunk_size)
+
+# Cohort fast path: QRS detection band (Hz), energy integration window and
+# refractory period (s), R-peak search radius around each QRS (s), rows per block
+COHORT_QRS_BAND = (5.0, 15.0)
+COHORT_INTEGRATION_SECONDS = 0.12
+COHORT_REFRACTORY_SECONDS = 0.3
+COHORT_REFINE_SECONDS = 0.075
+COHORT_BLOCK_ROWS = 1024
+
+def ecg_cohort_peaks(signals, sampling_rate=1000):
+    """
+    Vectorized R-peak detection over a 2-D array of equal-length ECGs (one per row),
+    Pan-Tompkins style: band-pass, squared derivative, moving-window integration, then
+    peaks of the integrated energy that dominate their refractory neighbourhood and
+    exceed 30% of the row's (interior) 99th percentile. Each peak is moved to the maximum of the
+    0.5 Hz high-passed signal (what nk.ecg_clean keeps) nearby.
+    Returns (row indices, sample indices), sorted by row then sample.
+    """
+    x = np.atleast_2d(np.asarray(signals, dtype=np.float64))
+    n_samples = x.shape[1]
+
+    # 1. Zero-phase filtering along every row at once
+    highpass = sps.butter(5, 0.5, btype='highpass', fs=sampling_rate, output='sos')
+    cleaned = sps.sosfiltfilt(highpass, x, axis=1)
+    bandpass = sps.butter(2, COHORT_QRS_BAND, btype='bandpass', fs=sampling_rate, output='sos')
+    qrs_band = sps.sosfiltfilt(bandpass, x, axis=1)
+
+    # 2. Derivative-squared energy, integrated over a QRS-wide window
+    energy = np.gradient(qrs_band, axis=1) ** 2
+    window = max(1, int(COHORT_INTEGRATION_SECONDS * sampling_rate))
+    integrated = sp_ndimage.uniform_filter1d(energy, window, axis=1, mode='nearest')
+
+    # 3. Peak picking on the whole matrix: local maximum over +-refractory, above threshold,
+    # strictly above the previous sample so plateaus yield one peak
+    refractory = max(1, int(COHORT_REFRACTORY_SECONDS * sampling_rate))
+    local_max = sp_ndimage.maximum_filter1d(integrated, 2 * refractory + 1, axis=1, mode='nearest')
+    # Filter transients at the record edges would inflate the threshold, so it comes from the interior
+    edge = window if n_samples > 4 * window else 0
+    threshold = 0.3 * np.percentile(integrated[:, edge:n_samples - edge], 99, axis=1, keepdims=True)
+    rising = np.empty(integrated.shape, dtype=bool)
+    rising[:, 0] = True
+    rising[:, 1:] = integrated[:, 1:] > integrated[:, :-1]
+    rows, cols = np.nonzero((integrated == local_max) & (integrated > threshold) & rising)
+
+    # 4. R-peak = largest cleaned sample within the search radius; beats cut off by the
+    # record edge (maximum on the first/last sample) are dropped
+    radius = int(COHORT_REFINE_SECONDS * sampling_rate)
+    search = np.clip(cols[:, None] + np.arange(-radius, radius + 1), 0, n_samples - 1)
+    peaks = search[np.arange(len(cols)), cleaned[rows[:, None], search].argmax(axis=1)]
+    inside = (peaks > 0) & (peaks < n_samples - 1)
+    keys = np.unique(rows[inside].astype(np.int64) * n_samples + peaks[inside])
+    return keys // n_samples, keys % n_samples
+
+def ecg_cohort_summary(signals, sampling_rate=1000):
+    """
+    ecg_summary for a 2-D array of equal-length ECGs without NeuroKit: peaks from
+    ecg_cohort_peaks, RR/HR/SDNN/RMSSD reduced per row with bincount.
+    Returns one ecg_summary-style dict per row (method 'vectorized').
+    """
+    x = np.atleast_2d(signals)
+    n_rows = x.shape[0]
+    rows, peaks = ecg_cohort_peaks(x, sampling_rate)
+    n_peaks = np.bincount(rows, minlength=n_rows)
+
+    # 1. RR intervals between consecutive beats of the same row
+    same_row = rows[1:] == rows[:-1]
+    rr_rows = rows[1:][same_row]
+    rr_ms = (np.diff(peaks)[same_row]) * 1000.0 / sampling_rate
+    n_rr = np.bincount(rr_rows, minlength=n_rows)
+
+    # 2. Per-row mean, SDNN (two-pass) and RMSSD
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_rr = np.bincount(rr_rows, rr_ms, minlength=n_rows) / n_rr
+        deviation = rr_ms - mean_rr[rr_rows]
+        sdnn = np.sqrt(np.bincount(rr_rows, deviation ** 2, minlength=n_rows) / (n_rr - 1))
+        successive = rr_rows[1:] == rr_rows[:-1]
+        sd_rows = rr_rows[1:][successive]
+        rmssd = np.sqrt(np.bincount(sd_rows, np.diff(rr_ms)[successive] ** 2, minlength=n_rows) /
+                        np.bincount(sd_rows, minlength=n_rows))
+    sdnn[n_rr < 2] = np.nan
+    rmssd[n_rr < 3] = np.nan
+
+    # 3. Same fields as ecg_summary
+    r_peaks = np.split(peaks, np.cumsum(n_peaks)[:-1])
+    return [{
+        'method': 'vectorized',
+        'r_peaks': r_peaks[i],
+        'n_peaks': int(n_peaks[i]),
+        'mean_hr_bpm': 60000.0 / mean_rr[i] if n_rr[i] else np.nan,
+        'mean_rr_ms': mean_rr[i],
+        'sdnn_ms': sdnn[i],
+        'rmssd_ms': rmssd[i],
+    } for i in range(n_rows)]
+
+def analyze_ecg_cohort(records, sampling_rate=1000):
+    """
+    Fast path for analyze_ecg_batch on cohorts (e.g. data_generator's 100 patients x 5 visits):
+    signals of equal length and rate are stacked and summarized by ecg_cohort_summary in
+    blocks of COHORT_BLOCK_ROWS. Same columns as analyze_ecg_batch, in input order.
+    """
+    # 1. Decode and group by (length, rate)
+    groups = {}
+    for position, (patient_id, report_id, raw_signal) in enumerate(records):
+        signal_data = to_signal_array(raw_signal)
+        if signal_data is None:
+            continue
+        rate = signal_sampling_rate(raw_signal, default=sampling_rate)
+        groups.setdefault((len(signal_data), rate), []).append((position, patient_id, report_id, signal_data))
+    if not groups:
+        return pd.DataFrame()
+
+    # 2. One vectorized pass per block of each group
+    rows = []
+    for (n_samples, rate), items in groups.items():
+        for i in range(0, len(items), COHORT_BLOCK_ROWS):
+            block = items[i:i + COHORT_BLOCK_ROWS]
+            start = time.process_time()
+            try:
+                summaries = ecg_cohort_summary(np.vstack([item[3] for item in block]), rate)
+                error = None
+            except Exception as e:
+                # e.g. records shorter than the filters' padding
+                summaries = [{'method': None, 'r_peaks': np.empty(0, dtype=np.int64), 'n_peaks': 0,
+                              'mean_hr_bpm': np.nan, 'mean_rr_ms': np.nan, 'sdnn_ms': np.nan,
+                              'rmssd_ms': np.nan}] * len(block)
+                error = str(e)
+            per_record_ms = (time.process_time() - start) * 1000.0 / len(block)
+            for (position, patient_id, report_id, _), summary in zip(block, summaries):
+                row = {'patient_id': patient_id, 'report_id': report_id,
+                       'n_samples': n_samples, 'sampling_rate': rate}
+                row.update(summary)
+                row.update({'error': error, 'processing_ms': per_record_ms, '_position': position})
+                rows.append(row)
+    return pd.DataFrame(rows).sort_values('_position').drop(columns='_position').reset_index(drop=True)
+
+# Band names as reported by nk.eeg_power (stored lower-case in eeg_features)
+EEG_BAND_NAMES = ('Delta', 'Theta', 'Alpha', 'Beta', 'Gamma')
+
 def analyze_eeg_signal(signal_data, sampling_rate=1000):
     """
     UPDATED: Cleans EEG signal and extracts brainwave frequency bands (Alpha, Beta, etc.).
     """
-    eeg_cleaned = nk.eeg_clean(signal_data, sampling_rate=sampling_rate)
+    # NeuroKit has no eeg_clean: band-pass to the EEG range with its generic filter
+    highcut = min(45.0, sampling_rate * 0.45)
+    eeg_cleaned = nk.signal_filter(signal_data, sampling_rate=sampling_rate, lowcut=0.5, highcut=highcut,
+                                   method='butterworth', order=4)
     
     # Extract Power Spectral Density for bands
-    bands = nk.eeg_power(eeg_cleaned, sampling_rate=sampling_rate)
+    bands = nk.eeg_power(eeg_cleaned, sampling_rate=sampling_rate, frequency_band=list(EEG_BAND_NAMES))
     
     return eeg_cleaned, bands
 
+def _eeg_batch_chunk(chunk):
+    """Worker entry point: band powers (nk.eeg_power) for one chunk of EEG records."""
+    rows = []
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for patient_id, report_id, signal_data, sampling_rate in chunk:
+            start = time.process_time()
+            row = {'patient_id': patient_id, 'report_id': report_id,
+                   'n_samples': len(signal_data), 'sampling_rate': sampling_rate}
+            try:
+                _, bands = analyze_eeg_signal(np.asarray(signal_data, dtype=np.float64), sampling_rate)
+                row.update({band.lower(): float(bands[band].iloc[0]) for band in EEG_BAND_NAMES})
+                row['error'] = None
+            except Exception as e:
+                row.update({band.lower(): np.nan for band in EEG_BAND_NAMES})
+                row['error'] = str(e)
+            row['processing_ms'] = (time.process_time() - start) * 1000.0
+            rows.append(row)
+    return rows
+
+def analyze_eeg_batch(records, sampling_rate=1000, max_workers=None, chunk_size=None):
+    """
+    Cleans many EEGs and extracts delta/theta/alpha/beta/gamma power in parallel.
+    records: iterable of (patient_id, report_id, signal). Returns one row per record.
+    """
+    return _run_batch(_eeg_batch_chunk, records, sampling_rate, max_workers, chunk_size)
+
 # ==========================================
 # DATA QUALITY & DESCRIPTIVE STATS (ORIGINAL)
 # ==========================================
@@ -129,12 +475,62 @@ def compute_correlations(df):
     """Computes Pearson correlation coefficients between numerical metrics."""
     return df.select_dtypes(include=np.number).corr()
 
-def get_fft_analysis(series):
-    """Computes FFT for a specific signal series for spectrum analysis."""
+def linear_fit_with_ci(x, y, n_boot=1000, ci=95, grid_points=100, seed=None):
+    """
+    Least-squares trend line with a bootstrap confidence band (what sns.regplot draws),
+    computed with NumPy so it can run off the UI thread.
+    Returns (x_grid, y_hat, ci_low, ci_high).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    x_grid = np.linspace(x.min(), x.max(), grid_points)
+    slope, intercept = np.polyfit(x, y, 1)
+    y_hat = intercept + slope * x_grid
+
+    # Closed-form slope/intercept for every resample, in batches to bound memory
+    rng = np.random.default_rng(seed)
+    n = len(x)
+    batch = max(1, min(n_boot, 2_000_000 // max(n, 1)))
+    boot_lines = []
+    for start in range(0, n_boot, batch):
+        idx = rng.integers(0, n, size=(min(batch, n_boot - start), n))
+        xb, yb = x[idx], y[idx]
+        xc = xb - xb.mean(axis=1, keepdims=True)
+        yc = yb - yb.mean(axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            b_slope = (xc * yc).sum(axis=1) / (xc * xc).sum(axis=1)
+        b_intercept = yb.mean(axis=1) - b_slope * xb.mean(axis=1)
+        boot_lines.append(b_intercept[:, None] + b_slope[:, None] * x_grid)
+
+    tail = (100 - ci) / 2
+    ci_low, ci_high = np.nanpercentile(np.vstack(boot_lines), [tail, 100 - tail], axis=0)
+    return x_grid, y_hat, ci_low, ci_high
+
+def linear_fit_from_moments(n, mean_x, mean_y, var_x, var_y, cov_xy, x_min, x_max, ci=95, grid_points=100):
+    """
+    Least-squares trend line and its confidence band from summary statistics alone
+    (e.g. DatabaseManager.get_metric_comoments), for cohorts too large to bootstrap.
+    The band is the analytic interval of the fitted mean. Returns (x_grid, y_hat, ci_low, ci_high).
+    """
+    x_grid = np.linspace(x_min, x_max, grid_points)
+    slope = cov_xy / var_x
+    y_hat = mean_y + slope * (x_grid - mean_x)
+
+    # Residual variance, then the standard error of the fitted line at each x
+    residual_var = max((n - 1) * (var_y - slope * cov_xy) / max(n - 2, 1), 0.0)
+    se = np.sqrt(residual_var * (1.0 / n + (x_grid - mean_x) ** 2 / ((n - 1) * var_x)))
+    z = NormalDist().inv_cdf(0.5 + ci / 200)
+    return x_grid, y_hat, y_hat - z * se, y_hat + z * se
+
+def get_fft_analysis(series, sampling_rate=1.0):
+    """
+    Computes FFT for a specific signal series for spectrum analysis.
+    Frequencies are in Hz when the signal's sampling_rate is given (cycles/sample otherwise).
+    """
     data = series.dropna().values
     n = len(data)
     if n == 0: return None, None
-    freq = np.fft.rfftfreq(n, d=1.0)
+    freq = np.fft.rfftfreq(n, d=1.0 / sampling_rate)
     fft_values = np.abs(np.fft.rfft(data))
     return freq, fft_values
 
@@ -1,15 +1,355 @@
 import sqlite3
+import hashlib
+import threading
+import time
 import pandas as pd
 import numpy as np
 
+from record_cache import PatientRecordCache
+from signal_codec import (
+    encode_signal, decode_signal, is_encoded_signal, parse_signal_text, to_signal_blob,
+    encode_chunked_header, is_chunked_signal, read_signal_header, DEFAULT_SAMPLING_RATE, HEADER_SIZE
+)
+from derived_cache import hash_signal
+from decimation import block_envelope, envelope_positions
+from quantile_sketch import KLLSketch, iqr_bounds
+from cohort_series import (
+    parse_timestamps, grouped_rolling_mean, resample_groups, percentile_bands,
+    DEFAULT_BAND_FREQ, DEFAULT_BAND_PERCENTILES
+)
+
+# Columns holding ECG/EEG samples or spectra in the typed binary signal format
+SIGNAL_COLUMNS = ('ECG_Signal', 'EEG_Signal', 'ECG_FFT_Magnitude', 'EEG_FFT_Magnitude')
+
+# Raw recordings longer than CHUNKED_SIGNAL_MIN_SAMPLES are split into SIGNAL_CHUNK_SAMPLES
+# chunks (signal_chunks); the metrics column keeps a header-only stub, so a segment read
+# touches only the chunks it overlaps. SIGNAL_OVERVIEW_BLOCK sets the stored overview's
+# resolution (one min/max pair per block).
+CHUNKED_SIGNAL_COLUMNS = ('ECG_Signal', 'EEG_Signal')
+SIGNAL_CHUNK_SAMPLES = 16384
+CHUNKED_SIGNAL_MIN_SAMPLES = 4 * SIGNAL_CHUNK_SAMPLES
+SIGNAL_OVERVIEW_BLOCK = 256
+
+# Comprehensive mapping to handle various CSV header styles
+COLUMN_MAPPING = {
+    'Name': 'Name',
+    'Age': 'Age',
+    'Gender': 'Gender',
+    'ECG Signal': 'ECG_Signal',
+    'ECG_Signal': 'ECG_Signal',
+    'EEG Signal': 'EEG_Signal',
+    'EEG_Signal': 'EEG_Signal',
+    'Blood Pressure': 'Blood_Pressure',
+    'Cholesterol Level': 'Cholesterol_Level',
+    'BMI': 'BMI',
+    'Sleep Hours': 'Sleep_Hours',
+    'Triglyceride Level': 'Triglyceride_Level',
+    'Fasting Blood Sugar': 'Fasting_Blood_Sugar',
+    'CRP Level': 'CRP_Level',
+    'Homocysteine Level': 'Homocysteine_Level',
+    'Heart Disease Status': 'Heart_Disease_Status',
+    'Date Recorded': 'Date_Recorded'
+}
+
+# patient_health_metrics columns populated from imported files
+METRIC_IMPORT_COLUMNS = [
+    'Age', 'Blood_Pressure', 'Cholesterol_Level', 'BMI', 'Sleep_Hours', 'Triglyceride_Level',
+    'Fasting_Blood_Sugar', 'CRP_Level', 'Homocysteine_Level', 'Heart_Disease_Status',
+    'ECG_Signal', 'EEG_Signal', 'Date_Recorded'
+]
+
+# Numeric metrics summarized inside SQLite (get_metric_summary / get_metric_comoments)
+NUMERIC_METRIC_COLUMNS = (
+    'Age', 'Blood_Pressure', 'Cholesterol_Level', 'BMI', 'Sleep_Hours', 'Triglyceride_Level',
+    'Fasting_Blood_Sugar', 'CRP_Level', 'Homocysteine_Level'
+)
+
+# Rows read per batch when a metric's quantile sketch is rebuilt from the table
+SKETCH_REBUILD_BATCH = 65536
+# Reports read per batch when a metric's long-format time series is materialized
+SERIES_REBUILD_BATCH = 65536
+
+# Bumped by one-shot data migrations (stored in PRAGMA user_version)
+SCHEMA_VERSION = 4
+
+# Unsaved derived_results entries are recomputable; older ones are purged at startup
+DERIVED_CACHE_DAYS = 30
+
+# --- Hot read/update queries ---
+# Kept at module level so check_query_plans() explains exactly the SQL the methods run.
+
+# Keyset pagination over (Date_Recorded, report_id), newest first. NULL dates sort
+# last, so the walk is split into a dated range and an undated tail; each part is
+# a single seek on idx_metrics_date (report_id is the rowid, so the index already
+# ends in it) and costs the same on page 1 as on page 10,000.
+SQL_PAGE_SELECT = """
+SELECT p.Name, p.Gender, m.*
+FROM patients p
+JOIN patient_health_metrics m ON p.patient_id = m.patient_id
+"""
+
+PAGE_FILTERS = {
+    'dated': "m.Date_Recorded IS NOT NULL",
+    'undated': "m.Date_Recorded IS NULL",
+    'dated_before': "(m.Date_Recorded, m.report_id) < (?, ?)",
+    'dated_after': "(m.Date_Recorded, m.report_id) > (?, ?)",
+    'undated_before': "m.Date_Recorded IS NULL AND m.report_id < ?",
+    'undated_after': "m.Date_Recorded IS NULL AND m.report_id > ?",
+}
+
+def page_sql(filter_name, descending=True):
+    """Builds one keyset page query; descending walks towards older records."""
+    order = "DESC" if descending else "ASC"
+    return (f"{SQL_PAGE_SELECT}WHERE {PAGE_FILTERS[filter_name]}\n"
+            f"ORDER BY m.Date_Recorded {order}, m.report_id {order}\nLIMIT ?")
+
+SQL_PATIENT_HISTORY = """
+SELECT m.*, p.Name, p.Gender 
+FROM patient_health_metrics m
+JOIN patients p ON m.patient_id = p.patient_id
+WHERE m.patient_id = ?
+ORDER BY m.Date_Recorded ASC
+"""
+
+SQL_PATIENT_IMAGES = """
+SELECT report_id, Date_Recorded 
+FROM patient_health_metrics 
+WHERE patient_id = ? AND Image_Data IS NOT NULL
+ORDER BY report_id ASC
+"""
+
+SQL_UPDATE_LATEST_CORRELATION = """
+UPDATE patient_health_metrics 
+SET Correlation_Data = ? 
+WHERE report_id = (
+    SELECT MAX(report_id) FROM patient_health_metrics WHERE patient_id = ?
+)
+"""
+
+SQL_SEARCH_BY_ID = "SELECT p.Name, p.Gender, m.* FROM patients p JOIN patient_health_metrics m ON p.patient_id = m.patient_id WHERE p.patient_id = ?"
+
+# CROSS JOIN pins patients as the outer loop: the LIKE filter has to scan the
+# (small) patients table, and each match then seeks its reports by index.
+SQL_SEARCH_BY_NAME = "SELECT p.Name, p.Gender, m.* FROM patients p CROSS JOIN patient_health_metrics m ON p.patient_id = m.patient_id WHERE p.Name LIKE ?"
+
+# Derived-result cache: one seek on the UNIQUE key index
+SQL_DERIVED_LOOKUP = """
+SELECT result FROM derived_results
+WHERE signal_hash = ? AND seg_start = ? AND seg_end = ? AND transform = ? AND params = ?
+"""
+
+SQL_DERIVED_INSERT = """
+INSERT INTO derived_results (signal_hash, seg_start, seg_end, transform, params, result,
+                             patient_id, report_id, signal_type, saved, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, DATETIME('now')))
+ON CONFLICT (signal_hash, seg_start, seg_end, transform, params) DO UPDATE SET
+    result = excluded.result,
+    patient_id = COALESCE(excluded.patient_id, patient_id),
+    report_id = COALESCE(excluded.report_id, report_id),
+    signal_type = COALESCE(excluded.signal_type, signal_type),
+    saved = MAX(saved, excluded.saved)
+"""
+
+SQL_DERIVED_HISTORY = """
+SELECT result_id, signal_type, transform, seg_start, seg_end, created_at, result
+FROM derived_results
+WHERE patient_id = ? AND saved = 1
+ORDER BY result_id ASC
+"""
+
+SQL_EEG_FEATURES = """
+SELECT f.*, m.Date_Recorded
+FROM eeg_features f
+LEFT JOIN patient_health_metrics m ON m.report_id = f.report_id
+"""
+SQL_EEG_FEATURES_ORDER = "ORDER BY m.Date_Recorded, f.report_id"
+
+# Chunked signals: chunk size/overview lookup, then a range seek over one window's chunks
+SQL_CHUNKED_SIGNAL_INFO = """
+SELECT chunk_samples, signal_hash, overview FROM chunked_signals
+WHERE report_id = ? AND column_name = ?
+"""
+
+SQL_SIGNAL_CHUNKS = """
+SELECT chunk_index, samples FROM signal_chunks
+WHERE report_id = ? AND column_name = ? AND chunk_index BETWEEN ? AND ?
+ORDER BY chunk_index
+"""
+
+# Long-format metric time series: one patient's trend, or the whole cohort in
+# (patient_id, recorded_at) order, both straight from the primary key
+SQL_METRIC_SERIES = """
+SELECT patient_id, recorded_at, value FROM metric_series
+WHERE metric = ?
+ORDER BY patient_id, recorded_at, report_id
+"""
+
+SQL_PATIENT_METRIC_SERIES = """
+SELECT patient_id, recorded_at, value FROM metric_series
+WHERE metric = ? AND patient_id = ?
+ORDER BY recorded_at, report_id
+"""
+
+# name -> (sql, sample params, tables allowed to be scanned)
+HOT_QUERIES = {
+    'get_patient_page_first': (page_sql('dated'), (51,), ()),
+    'get_patient_page_next': (page_sql('dated_before'), ('2024-01-01', 1000, 51), ()),
+    'get_patient_page_prev': (page_sql('dated_after', descending=False), ('2024-01-01', 1000, 51), ()),
+    'get_patient_page_undated_next': (page_sql('undated_before'), (1000, 51), ()),
+    'get_patient_page_undated_prev': (page_sql('undated_after', descending=False), (1000, 51), ()),
+    'get_all_records_for_patient': (SQL_PATIENT_HISTORY, (1,), ()),
+    'get_patient_images': (SQL_PATIENT_IMAGES, (1,), ()),
+    'update_correlation_data': (SQL_UPDATE_LATEST_CORRELATION, ('Corr: 0.00', 1), ()),
+    'search_patient_by_id': (SQL_SEARCH_BY_ID, (1,), ()),
+    'search_patient_by_name': (SQL_SEARCH_BY_NAME, ('%Patient%',), ('p',)),
+    'get_derived_result': (SQL_DERIVED_LOOKUP, ('0' * 64, 0, 1000, 'fft_magnitude', '{}'), ()),
+    'get_fft_history': (SQL_DERIVED_HISTORY, (1,), ()),
+    'get_eeg_features': (SQL_EEG_FEATURES + "WHERE f.patient_id = ?\n" + SQL_EEG_FEATURES_ORDER, (1,), ()),
+    'get_chunked_signal_info': (SQL_CHUNKED_SIGNAL_INFO, (1, 'ECG_Signal'), ()),
+    'get_signal_window': (SQL_SIGNAL_CHUNKS, (1, 'ECG_Signal', 0, 3), ()),
+    'get_metric_series': (SQL_METRIC_SERIES, ('BMI',), ()),
+    'get_metric_series_patient': (SQL_PATIENT_METRIC_SERIES, ('BMI', 1), ()),
+}
+
+def normalize_columns(df_source):
+    """Strips header whitespace and renames known CSV headers to database column names."""
+    df = df_source.copy()
+    df.columns = [str(col).strip() for col in df.columns]
+    return df.rename(columns={csv_col: db_col for csv_col, db_col in COLUMN_MAPPING.items() if csv_col in df.columns})
+
+def _correlation_frame(moments):
+    """Pearson correlation DataFrame from a get_metric_comoments-style dict."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = moments['cov'] / np.sqrt(moments['var_x'] * moments['var_y'])
+    return pd.DataFrame(np.clip(corr, -1.0, 1.0), index=moments['columns'], columns=moments['columns'])
+
+
+class MetricCoMoments:
+    """
+    SQLite aggregate metric_comoments(col1, ..., colk): pairwise-complete counts, means,
+    squared deviations and co-moments of k numeric columns in one scan. Rows are
+    buffered and folded in blocks with NumPy (Chan et al.'s parallel update), so the
+    state stays O(k^2) however many rows SQLite feeds it.
+    Returns a float64 BLOB: n, mean_x, m2_x, comoment (k x k each, [i, j] over the rows
+    where both i and j are present), then the k minima and k maxima.
+    """
+    BLOCK_ROWS = 4096
+
+    def __init__(self):
+        self.rows = []
+        self.k = None
+
+    def step(self, *values):
+        self.rows.append(values)
+        if len(self.rows) >= self.BLOCK_ROWS:
+            self._fold()
+
+    def _fold(self):
+        try:
+            block = np.array(self.rows, dtype=np.float64)
+        except (TypeError, ValueError):
+            # Leftover text values count as missing, like pd.to_numeric(errors='coerce')
+            block = np.array([[v if isinstance(v, (int, float)) else np.nan for v in row] for row in self.rows],
+                             dtype=np.float64)
+        self.rows = []
+        if self.k is None:
+            self.k = block.shape[1]
+            k = self.k
+            # Values are shifted by a reference per column (the first block's means) for precision
+            counts = np.isfinite(block).sum(axis=0)
+            self.shift = np.where(counts > 0, np.nansum(block, axis=0) / np.maximum(counts, 1), 0.0)
+            self.n, self.mean, self.m2, self.comoment = (np.zeros((k, k)) for _ in range(4))
+            self.mins, self.maxs = np.full(k, np.inf), np.full(k, -np.inf)
+
+        present = np.isfinite(block)
+        self.mins = np.fmin(self.mins, np.nanmin(block, axis=0, initial=np.inf))
+        self.maxs = np.fmax(self.maxs, np.nanmax(block, axis=0, initial=-np.inf))
+        x = np.where(present, block - self.shift, 0.0)
+        present = present.astype(np.float64)
+
+        # 1. Block statistics for every column pair at once: [i, j] uses rows where both are present
+        n_b = present.T @ present
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_b = np.nan_to_num((x.T @ present) / n_b)
+        m2_b = (x * x).T @ present - n_b * mean_b ** 2
+        comoment_b = x.T @ x - n_b * mean_b * mean_b.T
+
+        # 2. Merge into the running state
+        n = self.n + n_b
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight = np.nan_to_num(n_b / n)
+            delta = mean_b - self.mean
+            self.comoment += comoment_b + np.nan_to_num(delta * delta.T * self.n * n_b / n)
+            self.m2 += m2_b + np.nan_to_num(delta ** 2 * self.n * n_b / n)
+        self.mean += delta * weight
+        self.n = n
+
+    def finalize(self):
+        if self.rows:
+            self._fold()
+        if self.k is None:
+            return None
+        mins = np.where(np.isfinite(self.mins), self.mins, np.nan)
+        maxs = np.where(np.isfinite(self.maxs), self.maxs, np.nan)
+        state = (self.n, self.mean + self.shift[:, None], self.m2, self.comoment, mins, maxs)
+        return np.concatenate([np.ravel(a) for a in state]).astype('<f8').tobytes()
+
+
 class DatabaseManager:
-    def __init__(self, db_name='health_metrics.db'):
+    def __init__(self, db_name='health_metrics.db', create_schema=True, check_same_thread=True):
         """Initializes connection and enables WAL mode for high performance."""
-        self.conn = sqlite3.connect(db_name)
+        self.db_name = db_name
+        self.conn = sqlite3.connect(db_name, check_same_thread=check_same_thread)
         self.conn.execute('PRAGMA journal_mode=WAL;')
+        self.conn.create_aggregate('metric_comoments', -1, MetricCoMoments)
         self.cursor = self.conn.cursor()
+        # Cached COUNT(*) for the pager, valid while PRAGMA data_version is unchanged
+        self._row_count = None
+        self._row_count_version = None
+        # Parsed quantile sketches, valid for one PRAGMA data_version (see get_metric_quantiles)
+        self._sketches = {}
+        self._sketches_version = None
+        # Cohort percentile bands per (metric, freq, percentiles), valid for one PRAGMA data_version
+        self._bands = {}
+        self._bands_version = None
+        # SQLite connections belong to the thread that opened them
+        self._owner_thread = threading.get_ident()
+        self._thread_local = threading.local()
+        # Managers handed out by for_thread(), closed by close_thread_connections()
+        self._thread_managers = []
+        self._thread_managers_lock = threading.Lock()
+        # Per-patient history cache, shared by every manager (and thread) on this file
+        self.record_cache = PatientRecordCache.for_database(db_name)
         print(f"Successfully connected to {db_name} in WAL mode.")
-        self.create_tables()
+        if create_schema:
+            self.create_tables()
+
+    def for_thread(self):
+        """
+        Returns a DatabaseManager usable from the calling thread: this instance on the
+        thread that created it, otherwise one connection per worker thread (schema is
+        already in place, so it is not re-created).
+        """
+        if threading.get_ident() == self._owner_thread:
+            return self
+        db = getattr(self._thread_local, 'db', None)
+        if db is None:
+            # Used only on this worker thread, but closed from the owner on shutdown
+            db = DatabaseManager(self.db_name, create_schema=False, check_same_thread=False)
+            self._thread_local.db = db
+            with self._thread_managers_lock:
+                self._thread_managers.append(db)
+        return db
+
+    def close_thread_connections(self):
+        """
+        Closes the connections for_thread() opened on worker threads. Call once the workers
+        are idle (e.g. after the task pool has drained on shutdown).
+        """
+        with self._thread_managers_lock:
+            managers, self._thread_managers = self._thread_managers, []
+        for db in managers:
+            db.close_connection()
 
     def create_tables(self):
         create_patients_table = '''
@@ -33,19 +373,198 @@ class DatabaseManager:
             CRP_Level REAL,
             Homocysteine_Level REAL,
             Heart_Disease_Status TEXT,
-            ECG_Signal TEXT,
-            ECG_FFT_Magnitude TEXT,
-            EEG_FFT_Magnitude TEXT,
+            ECG_Signal BLOB,
+            ECG_FFT_Magnitude BLOB,
+            EEG_FFT_Magnitude BLOB,
             Correlation_Data TEXT,
-            EEG_Signal TEXT,
+            EEG_Signal BLOB,
             Date_Recorded TEXT,
-            Image_Data BLOB,
-            Original_Image_Data BLOB,
+            Image_Data TEXT,            -- sha256 reference into images
+            Original_Image_Data TEXT,   -- sha256 reference into images
             FOREIGN KEY (patient_id) REFERENCES patients(patient_id)
         );
         '''
+        # Content-addressed pixel store: identical blobs are kept once and
+        # metrics rows only carry the hash, so table/page queries never load pixels.
+        create_images_table = '''
+        CREATE TABLE IF NOT EXISTS images (
+            image_hash TEXT PRIMARY KEY,
+            data BLOB NOT NULL,
+            byte_size INTEGER
+        );
+        '''
+        # Per-source import progress so background ingestion can resume after restarts
+        create_ingest_checkpoints_table = '''
+        CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+            source TEXT PRIMARY KEY,    -- sha256 of the header and first record (content, not path)
+            file_hash TEXT,             -- sha256 of the first byte_offset bytes already imported
+            row_offset INTEGER,
+            byte_offset INTEGER,
+            updated_at TEXT
+        );
+        '''
+        # One row of batch ECG analysis results per report (see data_analyzer.analyze_ecg_batch)
+        create_ecg_features_table = '''
+        CREATE TABLE IF NOT EXISTS ecg_features (
+            report_id INTEGER PRIMARY KEY,
+            patient_id INTEGER,
+            n_samples INTEGER,
+            sampling_rate REAL,
+            method TEXT,
+            r_peaks BLOB,               -- little-endian int32 sample indices
+            n_peaks INTEGER,
+            mean_hr_bpm REAL,
+            mean_rr_ms REAL,
+            sdnn_ms REAL,
+            rmssd_ms REAL,
+            processing_ms REAL,         -- CPU time spent on this record
+            error TEXT,
+            computed_at TEXT
+        );
+        '''
+        # One row of batch EEG band powers per report (see data_analyzer.analyze_eeg_batch)
+        create_eeg_features_table = '''
+        CREATE TABLE IF NOT EXISTS eeg_features (
+            report_id INTEGER PRIMARY KEY,
+            patient_id INTEGER,
+            n_samples INTEGER,
+            sampling_rate REAL,
+            delta REAL,                 -- nk.eeg_power band powers
+            theta REAL,
+            alpha REAL,
+            beta REAL,
+            gamma REAL,
+            processing_ms REAL,         -- CPU time spent on this record
+            error TEXT,
+            computed_at TEXT
+        );
+        '''
+        # Content-keyed cache of spectra and features computed from signals (see derived_cache.py).
+        # saved = 1 marks entries the user kept as FFT history; the rest may be purged.
+        create_derived_results_table = '''
+        CREATE TABLE IF NOT EXISTS derived_results (
+            result_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            signal_hash TEXT NOT NULL,  -- sha256 of the source samples + sampling rate
+            seg_start INTEGER NOT NULL,
+            seg_end INTEGER NOT NULL,
+            transform TEXT NOT NULL,
+            params TEXT NOT NULL,       -- canonical JSON of the transform parameters
+            result BLOB NOT NULL,
+            patient_id INTEGER,
+            report_id INTEGER,
+            signal_type TEXT,
+            saved INTEGER DEFAULT 0,
+            created_at TEXT,
+            UNIQUE (signal_hash, seg_start, seg_end, transform, params)
+        );
+        '''
+        # Live monitor recordings, persisted in fixed windows (see ecg_stream.StreamingECGAnalyzer)
+        create_stream_windows_table = '''
+        CREATE TABLE IF NOT EXISTS ecg_stream_windows (
+            window_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            stream_id TEXT NOT NULL,    -- one live monitoring session
+            patient_id INTEGER,
+            start_sample INTEGER,       -- offset from the start of the stream
+            sampling_rate REAL,
+            samples BLOB,               -- binary signal format
+            r_peaks BLOB,               -- little-endian int32, relative to start_sample
+            mean_hr_bpm REAL,
+            recorded_at TEXT
+        );
+        '''
+        # Fixed-size sample chunks of long recordings (see get_signal_window)
+        create_signal_chunks_table = '''
+        CREATE TABLE IF NOT EXISTS signal_chunks (
+            report_id INTEGER NOT NULL,
+            column_name TEXT NOT NULL,  -- ECG_Signal / EEG_Signal
+            chunk_index INTEGER NOT NULL,
+            samples BLOB NOT NULL,      -- raw little-endian samples, dtype from the column's header
+            UNIQUE (report_id, column_name, chunk_index)
+        );
+        '''
+        create_chunked_signals_table = '''
+        CREATE TABLE IF NOT EXISTS chunked_signals (
+            report_id INTEGER NOT NULL,
+            column_name TEXT NOT NULL,
+            chunk_samples INTEGER NOT NULL,
+            signal_hash TEXT,           -- derived_cache.hash_signal of the full recording
+            overview BLOB,              -- min/max per SIGNAL_OVERVIEW_BLOCK samples, binary signal format
+            PRIMARY KEY (report_id, column_name)
+        );
+        '''
         self.cursor.execute(create_patients_table)
         self.cursor.execute(create_health_reports_table)
+        self.cursor.execute(create_images_table)
+        self.cursor.execute(create_ingest_checkpoints_table)
+        self.cursor.execute(create_ecg_features_table)
+        self.cursor.execute(create_eeg_features_table)
+        self.cursor.execute(create_derived_results_table)
+        self.cursor.execute(create_stream_windows_table)
+        # Running sums per metric pair (col_x <= col_y in NUMERIC_METRIC_COLUMNS order), over the
+        # rows where both are present: the global correlation matrix without a table scan
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS metric_pair_stats (
+            col_x TEXT NOT NULL,
+            col_y TEXT NOT NULL,
+            n REAL NOT NULL,
+            sum_x REAL NOT NULL,
+            sum_y REAL NOT NULL,
+            sum_xx REAL NOT NULL,
+            sum_yy REAL NOT NULL,
+            sum_xy REAL NOT NULL,
+            PRIMARY KEY (col_x, col_y)
+        );
+        ''')
+        # One KLL quantile sketch per numeric metric; stale after updates/deletes, rebuilt on read
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS metric_sketches (
+            column_name TEXT PRIMARY KEY,
+            sketch BLOB NOT NULL,       -- KLLSketch.to_bytes()
+            stale INTEGER NOT NULL DEFAULT 0
+        );
+        ''')
+        # Long-format (metric, patient, time, value) copy of NUMERIC_METRIC_COLUMNS with
+        # Date_Recorded parsed once to Unix seconds; materialized per metric on first use
+        # (metric_series_built) and kept current by the insert/update/delete paths
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS metric_series (
+            metric TEXT NOT NULL,
+            patient_id INTEGER NOT NULL,
+            recorded_at INTEGER NOT NULL,   -- Date_Recorded as Unix seconds (UTC)
+            report_id INTEGER NOT NULL,
+            value REAL NOT NULL,
+            PRIMARY KEY (metric, patient_id, recorded_at, report_id)
+        ) WITHOUT ROWID;
+        ''')
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS metric_series_built (
+            metric TEXT PRIMARY KEY
+        );
+        ''')
+        self.cursor.execute(create_signal_chunks_table)
+        self.cursor.execute(create_chunked_signals_table)
+
+        # Secondary indexes for the hot queries (see HOT_QUERIES / check_query_plans)
+        # - per-patient history ordered by date, also serves MAX(report_id) per patient
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_metrics_patient_date "
+                            "ON patient_health_metrics(patient_id, Date_Recorded)")
+        # - newest-first main table paging; doubles as the (Date_Recorded, report_id) keyset index
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_metrics_date "
+                            "ON patient_health_metrics(Date_Recorded)")
+        # - partial index: only the (few) reports that carry an image
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_metrics_patient_images "
+                            "ON patient_health_metrics(patient_id) WHERE Image_Data IS NOT NULL")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_ecg_features_patient "
+                            "ON ecg_features(patient_id)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_eeg_features_patient "
+                            "ON eeg_features(patient_id)")
+        # - partial index: saved FFT history per patient
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_derived_results_history "
+                            "ON derived_results(patient_id) WHERE saved = 1")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_stream_windows_stream "
+                            "ON ecg_stream_windows(stream_id, start_sample)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_stream_windows_patient "
+                            "ON ecg_stream_windows(patient_id)")
         
         # --- MIGRATION LOGIC ---
         # This section ensures existing databases are updated without losing data.
@@ -58,6 +577,14 @@ class DatabaseManager:
             self.cursor.execute("ALTER TABLE patient_health_metrics ADD COLUMN Original_Image_Data BLOB")
             self.conn.commit()
             
+        # Migration: byte-prefix ingest checkpoints (older path-keyed rows never match a content key)
+        try:
+            self.cursor.execute("SELECT byte_offset FROM ingest_checkpoints LIMIT 1")
+        except sqlite3.OperationalError:
+            print("Migrating database: Adding ingest_checkpoints.byte_offset column...")
+            self.cursor.execute("ALTER TABLE ingest_checkpoints ADD COLUMN byte_offset INTEGER")
+            self.conn.commit()
+
         # Migration: Correlation_Data
         try:
             self.cursor.execute("SELECT Correlation_Data FROM patient_health_metrics LIMIT 1")
@@ -74,117 +601,414 @@ class DatabaseManager:
             print("Migrating database: Adding EEG_FFT_Magnitude column...")
             self.cursor.execute("ALTER TABLE patient_health_metrics ADD COLUMN EEG_FFT_Magnitude TEXT")
             self.conn.commit()
-            
+
+        # Migration: comma-joined signal TEXT -> typed binary BLOBs (runs once per database)
+        schema_version = self.cursor.execute("PRAGMA user_version").fetchone()[0]
+        if schema_version < 1:
+            self._migrate_signal_text_to_blob()
+
+        # Migration: inline image BLOBs -> content-addressed images table
+        if schema_version < 2:
+            self._migrate_inline_images()
+
+        # Migration: FFT-only metrics rows -> derived_results history
+        if schema_version < 3:
+            self._migrate_fft_rows_to_derived()
+
+        # Migration: long inline recordings -> signal_chunks
+        if schema_version < 4:
+            self._chunk_long_signals()
+            self.conn.commit()
+
+        self.purge_derived_results(DERIVED_CACHE_DAYS)
+
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         self.conn.commit()
         print("Tables ensured successfully with full schema.")
 
+    def _migrate_signal_text_to_blob(self):
+        """Re-encodes legacy comma-separated signal strings as binary signal BLOBs."""
+        migrated = 0
+        for column in SIGNAL_COLUMNS:
+            rows = self.cursor.execute(
+                f"SELECT report_id, {column} FROM patient_health_metrics WHERE typeof({column}) = 'text'"
+            ).fetchall()
+
+            updates = []
+            for report_id, text in rows:
+                try:
+                    updates.append((to_signal_blob(text), report_id))
+                except ValueError as e:
+                    print(f"Skipping unparsable {column} in report {report_id}: {e}")
+
+            if updates:
+                self.cursor.executemany(
+                    f"UPDATE patient_health_metrics SET {column} = ? WHERE report_id = ?", updates
+                )
+                migrated += len(updates)
+
+        self.conn.commit()
+        if migrated:
+            print(f"Migrated {migrated} signal values from TEXT to binary storage.")
+
+    def _migrate_inline_images(self):
+        """Moves inline image BLOBs into the images table, leaving hash references behind."""
+        report_ids = [row[0] for row in self.cursor.execute(
+            "SELECT report_id FROM patient_health_metrics "
+            "WHERE typeof(Image_Data) = 'blob' OR typeof(Original_Image_Data) = 'blob'"
+        ).fetchall()]
+
+        # One row at a time keeps memory bounded on image-heavy databases
+        for report_id in report_ids:
+            proc_blob, orig_blob = self.cursor.execute(
+                "SELECT Image_Data, Original_Image_Data FROM patient_health_metrics WHERE report_id = ?",
+                (report_id,)
+            ).fetchone()
+            proc_ref = self._store_image(proc_blob) if isinstance(proc_blob, bytes) else proc_blob
+            orig_ref = self._store_image(orig_blob) if isinstance(orig_blob, bytes) else orig_blob
+            self.cursor.execute(
+                "UPDATE patient_health_metrics SET Image_Data = ?, Original_Image_Data = ? WHERE report_id = ?",
+                (proc_ref, orig_ref, report_id)
+            )
+
+        self.conn.commit()
+        if report_ids:
+            print(f"Migrated images for {len(report_ids)} records into the content-addressed image store.")
+
+    def _migrate_fft_rows_to_derived(self):
+        """
+        Moves the metrics rows that only carried a saved FFT (the old save_new_fft_record
+        output) into derived_results as FFT history. Their source signal is unknown, so
+        they are keyed by the spectrum's own content hash.
+        """
+        empty_columns = [col for col in METRIC_IMPORT_COLUMNS if col != 'Date_Recorded'] + \
+                        ['Correlation_Data', 'Image_Data', 'Original_Image_Data']
+        rows = self.cursor.execute(
+            "SELECT report_id, patient_id, Date_Recorded, ECG_FFT_Magnitude, EEG_FFT_Magnitude "
+            "FROM patient_health_metrics "
+            "WHERE (ECG_FFT_Magnitude IS NOT NULL OR EEG_FFT_Magnitude IS NOT NULL) AND "
+            + " AND ".join(f"{col} IS NULL" for col in empty_columns)
+        ).fetchall()
+
+        entries = []
+        for report_id, patient_id, date_recorded, ecg_fft, eeg_fft in rows:
+            for signal_type, value in (('ECG', ecg_fft), ('EEG', eeg_fft)):
+                if value is None:
+                    continue
+                try:
+                    blob = to_signal_blob(value)
+                except ValueError as e:
+                    print(f"Skipping unparsable {signal_type} FFT in report {report_id}: {e}")
+                    continue
+                entries.append((hashlib.sha256(blob).hexdigest(), 0, len(decode_signal(blob)[0]),
+                                'fft_magnitude', '{}', sqlite3.Binary(blob), patient_id, None,
+                                signal_type, 1, date_recorded))
+
+        self.cursor.executemany(SQL_DERIVED_INSERT, entries)
+        self.cursor.executemany("DELETE FROM patient_health_metrics WHERE report_id = ?",
+                                [(row[0],) for row in rows])
+        self.conn.commit()
+        if rows:
+            print(f"Moved {len(rows)} FFT-only records into the derived results history.")
+
+    def _chunk_long_signals(self, after_report_id=0, patient_id=None):
+        """
+        Moves inline recordings longer than CHUNKED_SIGNAL_MIN_SAMPLES (in reports after
+        after_report_id, optionally only one patient's) into signal_chunks.
+        Does not commit; runs inside the insert's / update's transaction.
+        """
+        # length() reads only the BLOB size, so short signals are skipped without loading them
+        min_bytes = HEADER_SIZE + CHUNKED_SIGNAL_MIN_SAMPLES * 4
+        chunked = 0
+        for column in CHUNKED_SIGNAL_COLUMNS:
+            where, params = "report_id > ? AND length({}) > ?", (after_report_id, min_bytes)
+            if patient_id is not None:
+                where, params = where + " AND patient_id = ?", params + (patient_id,)
+            rows = self.cursor.execute(
+                f"SELECT report_id, {column} FROM patient_health_metrics WHERE {where.format(column)}", params
+            ).fetchall()
+            for report_id, value in rows:
+                if not is_encoded_signal(value) or is_chunked_signal(value):
+                    continue
+                data, sampling_rate = decode_signal(value)
+                if len(data) <= CHUNKED_SIGNAL_MIN_SAMPLES:
+                    continue
+                stub = self._store_signal_chunks(report_id, column, data, sampling_rate)
+                self.cursor.execute(f"UPDATE patient_health_metrics SET {column} = ? WHERE report_id = ?",
+                                    (sqlite3.Binary(stub), report_id))
+                chunked += 1
+        if chunked:
+            print(f"Stored {chunked} long recordings as {SIGNAL_CHUNK_SAMPLES}-sample chunks.")
+        return chunked
+
+    def _store_signal_chunks(self, report_id, column, data, sampling_rate=DEFAULT_SAMPLING_RATE):
+        """
+        Writes a recording as fixed-size chunks plus its hash and overview envelope.
+        Returns the header-only stub for the metrics column. Does not commit.
+        """
+        data = np.ascontiguousarray(data)
+        data = data.astype(data.dtype.newbyteorder('<'), copy=False)
+        self.cursor.execute("DELETE FROM signal_chunks WHERE report_id = ? AND column_name = ?", (report_id, column))
+        self.cursor.executemany(
+            "INSERT INTO signal_chunks (report_id, column_name, chunk_index, samples) VALUES (?, ?, ?, ?)",
+            ((report_id, column, index, sqlite3.Binary(data[start:start + SIGNAL_CHUNK_SAMPLES].tobytes()))
+             for index, start in enumerate(range(0, len(data), SIGNAL_CHUNK_SAMPLES)))
+        )
+        overview = encode_signal(block_envelope(data, SIGNAL_OVERVIEW_BLOCK), sampling_rate=sampling_rate,
+                                 dtype=data.dtype)
+        self.cursor.execute(
+            "INSERT OR REPLACE INTO chunked_signals (report_id, column_name, chunk_samples, signal_hash, overview) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (report_id, column, SIGNAL_CHUNK_SAMPLES, hash_signal(data, sampling_rate), sqlite3.Binary(overview))
+        )
+        return encode_chunked_header(len(data), sampling_rate, data.dtype)
+
+    def _store_image(self, image_bytes):
+        """
+        Adds image bytes to the images table (deduplicated by sha256) and returns the hash.
+        Does not commit; callers commit together with the row that references the image.
+        """
+        if image_bytes is None:
+            return None
+        image_bytes = bytes(image_bytes)
+        image_hash = hashlib.sha256(image_bytes).hexdigest()
+        self.cursor.execute(
+            "INSERT OR IGNORE INTO images (image_hash, data, byte_size) VALUES (?, ?, ?)",
+            (image_hash, sqlite3.Binary(image_bytes), len(image_bytes))
+        )
+        return image_hash
+
+    def _purge_orphan_images(self):
+        """Deletes image blobs no longer referenced by any health record."""
+        self.cursor.execute("""
+            DELETE FROM images WHERE image_hash NOT IN (
+                SELECT Image_Data FROM patient_health_metrics WHERE Image_Data IS NOT NULL
+                UNION
+                SELECT Original_Image_Data FROM patient_health_metrics WHERE Original_Image_Data IS NOT NULL
+            )
+        """)
+
+    def get_image_blob(self, image_hash):
+        """Fetches image bytes by content hash."""
+        if not image_hash:
+            return None
+        self.cursor.execute("SELECT data FROM images WHERE image_hash = ?", (image_hash,))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+
+    def write_signal(self, report_id, column, values, sampling_rate=DEFAULT_SAMPLING_RATE, dtype=np.float32):
+        """Stores a NumPy signal in the binary format for an existing report."""
+        if column not in SIGNAL_COLUMNS:
+            raise ValueError(f"{column} is not a signal column.")
+        try:
+            data = np.ravel(values)
+            if column in CHUNKED_SIGNAL_COLUMNS and len(data) > CHUNKED_SIGNAL_MIN_SAMPLES:
+                blob = self._store_signal_chunks(report_id, column, data.astype(dtype), sampling_rate)
+            else:
+                blob = encode_signal(data, sampling_rate=sampling_rate, dtype=dtype)
+                self.cursor.execute("DELETE FROM signal_chunks WHERE report_id = ? AND column_name = ?",
+                                    (report_id, column))
+                self.cursor.execute("DELETE FROM chunked_signals WHERE report_id = ? AND column_name = ?",
+                                    (report_id, column))
+            patient_id = self._patient_for_report(report_id)
+            self.cursor.execute(
+                f"UPDATE patient_health_metrics SET {column} = ? WHERE report_id = ?",
+                (sqlite3.Binary(blob), report_id)
+            )
+            self.conn.commit()
+            self.record_cache.invalidate(patient_id)
+            return True
+        except Exception as e:
+            print(f"Signal write error: {e}")
+            return False
+
+    def read_signal(self, report_id, column):
+        """
+        Returns (array, sampling_rate) for one signal column of a report.
+        Binary values are returned as zero-copy read-only views; (None, None) if absent.
+        """
+        if column not in SIGNAL_COLUMNS:
+            raise ValueError(f"{column} is not a signal column.")
+        try:
+            self.cursor.execute(f"SELECT {column} FROM patient_health_metrics WHERE report_id = ?", (report_id,))
+            row = self.cursor.fetchone()
+            if not row or row[0] is None:
+                return None, None
+            if is_chunked_signal(row[0]):
+                return self.get_signal_window(report_id, 0, read_signal_header(row[0])[1], column)
+            if is_encoded_signal(row[0]):
+                return decode_signal(row[0])
+            return parse_signal_text(row[0]), DEFAULT_SAMPLING_RATE
+        except Exception as e:
+            print(f"Signal read error: {e}")
+            return None, None
+
+    def get_signal_window(self, report_id, start, end, column='ECG_Signal'):
+        """
+        Returns (samples [start, end), sampling_rate) of one stored signal, or (None, None).
+        Chunked recordings read only the chunks overlapping the window; short inline
+        signals are decoded and sliced.
+        """
+        if column not in SIGNAL_COLUMNS:
+            raise ValueError(f"{column} is not a signal column.")
+        try:
+            self.cursor.execute(f"SELECT {column} FROM patient_health_metrics WHERE report_id = ?", (report_id,))
+            row = self.cursor.fetchone()
+            if not row or row[0] is None:
+                return None, None
+            if not is_chunked_signal(row[0]):
+                data, sampling_rate = (decode_signal(row[0]) if is_encoded_signal(row[0])
+                                       else (parse_signal_text(row[0]), DEFAULT_SAMPLING_RATE))
+                return data[max(0, int(start)):int(end)], sampling_rate
+
+            dtype, length, sampling_rate = read_signal_header(row[0])
+            start, end = max(0, int(start)), min(length, int(end))
+            if end <= start:
+                return np.empty(0, dtype=dtype), sampling_rate
+            chunk_samples = self.cursor.execute(SQL_CHUNKED_SIGNAL_INFO, (report_id, column)).fetchone()[0]
+            first, last = start // chunk_samples, (end - 1) // chunk_samples
+            chunks = self.cursor.execute(SQL_SIGNAL_CHUNKS, (report_id, column, first, last)).fetchall()
+            data = np.concatenate([np.frombuffer(blob, dtype=dtype) for _, blob in chunks])
+            offset = first * chunk_samples
+            return data[start - offset:end - offset], sampling_rate
+        except Exception as e:
+            print(f"Signal window read error: {e}")
+            return None, None
+
+    def get_chunked_signal_info(self, report_id, column='ECG_Signal'):
+        """
+        (signal_hash, overview positions, overview values) of a chunked recording, or None
+        for signals stored inline. The overview is the stored min/max envelope, so a long
+        recording can be drawn without reading its samples.
+        """
+        row = self.cursor.execute(SQL_CHUNKED_SIGNAL_INFO, (report_id, column)).fetchone()
+        if row is None:
+            return None
+        _, signal_hash, overview = row
+        self.cursor.execute(f"SELECT {column} FROM patient_health_metrics WHERE report_id = ?", (report_id,))
+        n_samples = read_signal_header(self.cursor.fetchone()[0])[1]
+        values, _ = decode_signal(overview)
+        return signal_hash, envelope_positions(n_samples, SIGNAL_OVERVIEW_BLOCK), values
+
     def update_correlation_data(self, patient_id, corr_string):
         """Updates the most recent health report for a patient with correlation results."""
         try:
             # Targets the most recent report for this specific patient
-            sql = """
-                UPDATE patient_health_metrics 
-                SET Correlation_Data = ? 
-                WHERE report_id = (
-                    SELECT MAX(report_id) FROM patient_health_metrics WHERE patient_id = ?
-                )
-            """
-            self.cursor.execute(sql, (corr_string, patient_id))
+            self.cursor.execute(SQL_UPDATE_LATEST_CORRELATION, (corr_string, patient_id))
             self.conn.commit()
+            self.record_cache.invalidate(patient_id)
             return True
         except Exception as e:
             print(f"Database correlation update error: {e}")
             return False
 
-    def insert_patient_data(self, df_source):
-        """Processes and inserts a DataFrame of patient data into the relational structure."""
-        
-        # 1. Comprehensive Mapping to handle various CSV header styles
-        column_mapping = {
-            'Name': 'Name',
-            'Age': 'Age',
-            'Gender': 'Gender',
-            'ECG Signal': 'ECG_Signal',
-            'ECG_Signal': 'ECG_Signal',
-            'EEG Signal': 'EEG_Signal',
-            'EEG_Signal': 'EEG_Signal',
-            'Blood Pressure': 'Blood_Pressure',
-            'Cholesterol Level': 'Cholesterol_Level',
-            'BMI': 'BMI',
-            'Sleep Hours': 'Sleep_Hours',
-            'Triglyceride Level': 'Triglyceride_Level',
-            'Fasting Blood Sugar': 'Fasting_Blood_Sugar',
-            'CRP Level': 'CRP_Level',
-            'Homocysteine Level': 'Homocysteine_Level',
-            'Heart Disease Status': 'Heart_Disease_Status',
-            'Date Recorded': 'Date_Recorded'
-        }
+    def insert_patient_data(self, df_source, checkpoint=None):
+        """
+        Bulk-loads a DataFrame of patient data into the relational structure.
+        All patient names are resolved in one pass and the metrics are written with a
+        single executemany inside one transaction. Returns the number of rows inserted.
+        An optional (source, prefix_hash, row_offset, byte_offset) checkpoint is saved in the same transaction.
+        """
+        start_time = time.perf_counter()
+        try:
+            rows_inserted, patient_ids = self._bulk_insert_metrics(normalize_columns(df_source))
+            if checkpoint is not None:
+                self._save_ingest_checkpoint(*checkpoint)
+            self.conn.commit()
+            self._adjust_row_count(rows_inserted)
+            self.record_cache.invalidate(*patient_ids)
+        except Exception as e:
+            print(f"Bulk insert failed, transaction rolled back: {e}")
+            self.conn.rollback()
+            return 0
 
-        df = df_source.copy()
-        
-        # 2. Advanced column cleanup (removes extra spaces and ensures correct naming)
-        df.columns = [col.strip() for col in df.columns]
-        for csv_col, db_col in column_mapping.items():
-            if csv_col in df.columns:
-                df.rename(columns={csv_col: db_col}, inplace=True)
-
-        rows_inserted = 0
-        for i, row in df.iterrows():
-            try:
-                # 3. Patient logic
-                name = str(row.get('Name', '')).strip()
-                if not name or name.lower() == 'nan':
-                    name = f"Patient_{i+1}"
-                
-                gender = row.get('Gender', 'Unknown')
+        elapsed = time.perf_counter() - start_time
+        rate = rows_inserted / elapsed if elapsed > 0 else float(rows_inserted)
+        print(f"Relational insertion complete. Processed {rows_inserted} entries "
+              f"in {elapsed:.2f}s ({rate:,.0f} rows/sec).")
+        return rows_inserted
 
-                # Check if patient exists, if not create them
-                self.cursor.execute("SELECT patient_id FROM patients WHERE Name = ?", (name,))
-                result = self.cursor.fetchone()
-                if result:
-                    patient_id = result[0]
-                else:
-                    self.cursor.execute("INSERT INTO patients (Name, Gender) VALUES (?, ?)", (name, gender))
-                    patient_id = self.cursor.lastrowid
+    def get_ingest_checkpoint(self, source):
+        """Returns (prefix_hash, row_offset, byte_offset) recorded for an import source, or None."""
+        self.cursor.execute("SELECT file_hash, row_offset, byte_offset FROM ingest_checkpoints WHERE source = ?",
+                            (source,))
+        return self.cursor.fetchone()
 
-                # 4. Extract data using the cleaned column names
-                metrics_data = {
-                    'patient_id': patient_id,
-                    'Age': row.get('Age'),
-                    'Blood_Pressure': row.get('Blood_Pressure'),
-                    'Cholesterol_Level': row.get('Cholesterol_Level'),
-                    'BMI': row.get('BMI'),
-                    'Sleep_Hours': row.get('Sleep_Hours'),
-                    'Triglyceride_Level': row.get('Triglyceride_Level'),
-                    'Fasting_Blood_Sugar': row.get('Fasting_Blood_Sugar'),
-                    'CRP_Level': row.get('CRP_Level'),
-                    'Homocysteine_Level': row.get('Homocysteine_Level'),
-                    'Heart_Disease_Status': row.get('Heart_Disease_Status'),
-                    'ECG_Signal': row.get('ECG_Signal'),
-                    'EEG_Signal': row.get('EEG_Signal'),
-                    'Date_Recorded': row.get('Date_Recorded')
-                }
-
-                # 5. Remove None/NaN values so SQLite doesn't crash
-                # We also ensure signal strings are treated as strings
-                cleaned_metrics = {}
-                for k, v in metrics_data.items():
-                    if v is not None and not (isinstance(v, float) and np.isnan(v)):
-                        cleaned_metrics[k] = str(v) if 'Signal' in k else v
-
-                if cleaned_metrics:
-                    columns = ', '.join(cleaned_metrics.keys())
-                    placeholders = ', '.join(['?' for _ in cleaned_metrics])
-                    values = tuple(cleaned_metrics.values())
-                    
-                    self.cursor.execute(f"INSERT INTO patient_health_metrics ({columns}) VALUES ({placeholders})", values)
-                    rows_inserted += 1
-
-            except Exception as e:
-                print(f"Error inserting row {i}: {e}")
+    def _save_ingest_checkpoint(self, source, prefix_hash, row_offset, byte_offset):
+        """Records import progress for a source. Does not commit."""
+        self.cursor.execute("""
+            INSERT INTO ingest_checkpoints (source, file_hash, row_offset, byte_offset, updated_at)
+            VALUES (?, ?, ?, ?, DATETIME('now'))
+            ON CONFLICT(source) DO UPDATE SET
+                file_hash = excluded.file_hash,
+                row_offset = excluded.row_offset,
+                byte_offset = excluded.byte_offset,
+                updated_at = excluded.updated_at
+        """, (source, prefix_hash, row_offset, byte_offset))
 
-        self.conn.commit()
-        print(f"Relational insertion complete. Processed {rows_inserted} entries.")
+    def _resolve_patient_ids(self, names, genders):
+        """
+        Maps every name to a patient_id with one INSERT OR IGNORE batch and one joined SELECT.
+        Does not commit.
+        """
+        unique_patients = pd.DataFrame({'Name': names, 'Gender': genders}).drop_duplicates('Name')
+        unique_patients = unique_patients.astype(object).where(unique_patients.notna(), None)
+        self.cursor.executemany(
+            "INSERT OR IGNORE INTO patients (Name, Gender) VALUES (?, ?)",
+            unique_patients.itertuples(index=False, name=None)
+        )
+
+        self.cursor.execute("CREATE TEMP TABLE IF NOT EXISTS import_names (Name TEXT PRIMARY KEY)")
+        self.cursor.execute("DELETE FROM import_names")
+        self.cursor.executemany("INSERT INTO import_names (Name) VALUES (?)",
+                                ((name,) for name in unique_patients['Name']))
+        self.cursor.execute("SELECT p.Name, p.patient_id FROM patients p JOIN import_names n ON n.Name = p.Name")
+        return dict(self.cursor.fetchall())
+
+    def _bulk_insert_metrics(self, df):
+        """
+        Inserts an already-normalized DataFrame without committing.
+        Returns (rows_inserted, set of affected patient_ids).
+        """
+        if df is None or df.empty:
+            return 0, set()
+
+        # 1. Patient names: blanks fall back to Patient_<row number> like manual imports
+        fallback_names = pd.Series([f"Patient_{i+1}" for i in df.index], index=df.index)
+        if 'Name' in df.columns:
+            names = df['Name'].astype(str).str.strip()
+            missing = (names == '') | (names.str.lower() == 'nan')
+            names = names.mask(missing, fallback_names)
+        else:
+            names = fallback_names
+        genders = df['Gender'] if 'Gender' in df.columns else pd.Series('Unknown', index=df.index)
+
+        id_map = self._resolve_patient_ids(names, genders)
+        patient_ids = names.map(id_map)
+
+        # 2. Column-aligned values straight from the DataFrame (NaN -> NULL)
+        insert_cols = [col for col in METRIC_IMPORT_COLUMNS if col in df.columns]
+        values = df[insert_cols].astype(object)
+        values = values.where(df[insert_cols].notna(), None)
+        for col in insert_cols:
+            if col in SIGNAL_COLUMNS:
+                values[col] = values[col].map(to_signal_blob)
+
+        # 3. One executemany for the whole column set
+        columns = ', '.join(['patient_id'] + insert_cols)
+        placeholders = ', '.join(['?'] * (len(insert_cols) + 1))
+        rows = zip(patient_ids.tolist(), *(values[col].tolist() for col in insert_cols))
+        last_report_id = self.cursor.execute("SELECT MAX(report_id) FROM patient_health_metrics").fetchone()[0]
+        self.cursor.executemany(f"INSERT INTO patient_health_metrics ({columns}) VALUES ({placeholders})", rows)
+
+        # 4. Long recordings in this batch move to signal_chunks (same transaction)
+        if any(col in CHUNKED_SIGNAL_COLUMNS for col in insert_cols):
+            self._chunk_long_signals(after_report_id=last_report_id or 0)
+
+        # 5. New values folded into the metrics' quantile sketches and pair statistics
+        self._fold_new_metric_rows(after_report_id=last_report_id or 0)
+
+        return len(df), set(id_map.values())
 
     def insert_manual_record(self, metrics_data):
         try:
@@ -202,13 +1026,16 @@ class DatabaseManager:
                     patient_id = result[0]
                 metrics_data['patient_id'] = patient_id
 
-            # CRITICAL: Convert raw bytes to SQLite Binary for Processed Image
-            if 'Image_Data' in metrics_data and metrics_data['Image_Data'] is not None:
-                metrics_data['Image_Data'] = sqlite3.Binary(metrics_data['Image_Data'])
-            
-            # NEW: Convert raw bytes to SQLite Binary for Original Image
-            if 'Original_Image_Data' in metrics_data and metrics_data['Original_Image_Data'] is not None:
-                metrics_data['Original_Image_Data'] = sqlite3.Binary(metrics_data['Original_Image_Data'])
+            # Images go to the content-addressed store; the record keeps only the hash.
+            # An identical original/processed pair is stored once.
+            for column in ('Image_Data', 'Original_Image_Data'):
+                if column in metrics_data:
+                    metrics_data[column] = self._store_image(metrics_data[column])
+
+            # Pack CSV-style signal input into the binary signal format (empty input -> NULL)
+            for column in SIGNAL_COLUMNS:
+                if column in metrics_data:
+                    metrics_data[column] = to_signal_blob(metrics_data[column])
 
             # Build and execute query
             columns = ', '.join(metrics_data.keys())
@@ -216,29 +1043,76 @@ class DatabaseManager:
             query = f"INSERT INTO patient_health_metrics ({columns}) VALUES ({placeholders})"
             
             self.cursor.execute(query, tuple(metrics_data.values()))
+            report_id = self.cursor.lastrowid
+            self._chunk_long_signals(after_report_id=report_id - 1)
+            self._fold_new_metric_rows(after_report_id=report_id - 1)
             self.conn.commit()
+            self._adjust_row_count(1)
+            if 'patient_id' in metrics_data:
+                self.record_cache.invalidate(metrics_data['patient_id'])
             return True
         except Exception as e:
             print(f"Database Error: {e}")
+            self.conn.rollback()
             return False
 
-    def get_patient_data(self, limit=50, offset=0):
-        """Fetches data for the main table view using m.* to preserve all columns."""
-        query = """
-        SELECT p.Name, p.Gender, m.*
-        FROM patients p
-        JOIN patient_health_metrics m ON p.patient_id = m.patient_id
-        ORDER BY m.Date_Recorded DESC
-        LIMIT ? OFFSET ?
+    def get_patient_page(self, after=None, before=None, limit=50):
         """
+        Keyset pagination for the main table, newest first by (Date_Recorded, report_id).
+        after: key of the last row on the current page -> next page.
+        before: key of the first row on the current page -> previous page.
+        Neither -> first page. Keys are (Date_Recorded or None, report_id) tuples.
+        Returns (df, cursors) where cursors holds 'first'/'last' keys and 'has_prev'/'has_next'.
+        """
+        backward = before is not None
+        key = before if backward else after
+
+        # 1. Ordered parts of the walk from the key (dated range first going forward)
+        if key is None:
+            steps = [('dated', ()), ('undated', ())]
+        elif backward and key[0] is None:
+            steps = [('undated_after', (key[1],)), ('dated', ())]
+        elif backward:
+            steps = [('dated_after', tuple(key))]
+        elif key[0] is None:
+            steps = [('undated_before', (key[1],))]
+        else:
+            steps = [('dated_before', tuple(key)), ('undated', ())]
+
+        # 2. One extra row tells whether another page exists in the walk direction
         try:
-            df = pd.read_sql_query(query, self.conn, params=(limit, offset))
-            # Remove duplicate patient_id column if present from JOIN
+            rows = []
+            for filter_name, params in steps:
+                self.cursor.execute(page_sql(filter_name, descending=not backward),
+                                    (*params, limit + 1 - len(rows)))
+                rows.extend(self.cursor.fetchall())
+                if len(rows) > limit:
+                    break
+            columns = [col[0] for col in self.cursor.description]
+            df = pd.DataFrame(rows, columns=columns)
             df = df.loc[:, ~df.columns.duplicated()]
-            return df
         except Exception as e:
-            print(f"Error fetching data: {e}")
-            return pd.DataFrame()
+            print(f"Error fetching page: {e}")
+            return pd.DataFrame(), {'first': None, 'last': None, 'has_prev': False, 'has_next': False}
+
+        more = len(df) > limit
+        df = df.iloc[:limit]
+        if backward:
+            df = df.iloc[::-1]
+        df = df.reset_index(drop=True)
+
+        # 3. Cursors for the neighbouring pages
+        def row_key(row):
+            date = row['Date_Recorded']
+            return (None if pd.isna(date) else date, int(row['report_id']))
+
+        cursors = {
+            'first': row_key(df.iloc[0]) if not df.empty else None,
+            'last': row_key(df.iloc[-1]) if not df.empty else None,
+            'has_prev': more if backward else key is not None,
+            'has_next': True if backward else more,
+        }
+        return df, cursors
 
     def get_both_images(self, report_id):
         """
@@ -250,9 +1124,11 @@ class DatabaseManager:
             # We explicitly name the columns to guarantee index 0 is Original 
             # and index 1 is Processed, regardless of table schema updates.
             query = """
-                SELECT Original_Image_Data, Image_Data 
-                FROM patient_health_metrics 
-                WHERE report_id = ?
+                SELECT orig.data, proc.data
+                FROM patient_health_metrics m
+                LEFT JOIN images orig ON orig.image_hash = m.Original_Image_Data
+                LEFT JOIN images proc ON proc.image_hash = m.Image_Data
+                WHERE m.report_id = ?
             """
             self.cursor.execute(query, (report_id,))
             result = self.cursor.fetchone()
@@ -272,7 +1148,11 @@ class DatabaseManager:
     def get_original_image_blob(self, report_id):
         """Fetches the untouched original image from the database."""
         try:
-            query = "SELECT Original_Image_Data FROM patient_health_metrics WHERE report_id = ?"
+            query = """
+                SELECT i.data FROM patient_health_metrics m
+                JOIN images i ON i.image_hash = m.Original_Image_Data
+                WHERE m.report_id = ?
+            """
             self.cursor.execute(query, (report_id,))
             result = self.cursor.fetchone()
             return result[0] if result else None
@@ -303,13 +1183,39 @@ class DatabaseManager:
             
             # Update Metrics table (Age, BP, etc.)
             if m_updates:
+                # Signals are stored in the binary format like on insert; chunks of the
+                # recordings being replaced go, and long new ones are re-chunked below
+                signal_updated = [k for k in m_updates if k in SIGNAL_COLUMNS]
+                for column in signal_updated:
+                    m_updates[column] = to_signal_blob(m_updates[column])
+                    if column in CHUNKED_SIGNAL_COLUMNS:
+                        for table in ('signal_chunks', 'chunked_signals'):
+                            self.cursor.execute(
+                                f"DELETE FROM {table} WHERE column_name = ? AND report_id IN "
+                                "(SELECT report_id FROM patient_health_metrics WHERE patient_id = ?)",
+                                (column, patient_id)
+                            )
                 sets = ", ".join([f"{k} = ?" for k in m_updates.keys()])
+                # Pair statistics: the old values go out, the updated ones come back in
+                numeric_updated = [k for k in m_updates if k in NUMERIC_METRIC_COLUMNS]
+                if numeric_updated:
+                    self._adjust_metric_pair_stats(self._metric_values("patient_id = ?", (patient_id,)), -1)
                 # This updates all reports for this specific patient
                 self.cursor.execute(f"UPDATE patient_health_metrics SET {sets} WHERE patient_id = ?", 
                                    (*m_updates.values(), patient_id))
                 rows_affected += self.cursor.rowcount
+                if any(column in CHUNKED_SIGNAL_COLUMNS for column in signal_updated):
+                    self._chunk_long_signals(patient_id=patient_id)
+                if numeric_updated:
+                    self._adjust_metric_pair_stats(self._metric_values("patient_id = ?", (patient_id,)), +1)
+                self._mark_sketches_stale(numeric_updated)
+                # Time series: the patient's rows are re-derived (values or dates may have changed)
+                if numeric_updated or 'Date_Recorded' in m_updates:
+                    self._drop_patient_metric_series(patient_id)
+                    self._append_metric_series("patient_id = ?", (patient_id,))
             
             self.conn.commit()
+            self.record_cache.invalidate(patient_id)
             return rows_affected
         except Exception as e:
             print(f"Database Update error: {e}")
@@ -318,12 +1224,17 @@ class DatabaseManager:
 
     def update_processed_image(self, report_id, image_blob):
         try:
+            image_hash = self._store_image(image_blob)
+            patient_id = self._patient_for_report(report_id)
             sql = "UPDATE patient_health_metrics SET Image_Data = ? WHERE report_id = ?"
-            self.cursor.execute(sql, (sqlite3.Binary(image_blob), report_id))
+            self.cursor.execute(sql, (image_hash, report_id))
+            self._purge_orphan_images()
             self.conn.commit()
+            self.record_cache.invalidate(patient_id)
             return True
         except Exception as e:
             print(f"Database Update Error: {e}")
+            self.conn.rollback()
             return False
 
     def delete_patient_data(self, patient_id):
@@ -332,16 +1243,33 @@ class DatabaseManager:
         Returns the number of patient records removed (0 if not found).
         """
         try:
-            # 1. Delete dependent health metrics first
+            # 1. Delete dependent health metrics first (and the chunks of their long recordings)
+            self._adjust_metric_pair_stats(self._metric_values("patient_id = ?", (patient_id,)), -1)
+            self._drop_patient_metric_series(patient_id)
+            for table in ('signal_chunks', 'chunked_signals'):
+                self.cursor.execute(f"DELETE FROM {table} WHERE report_id IN "
+                                    "(SELECT report_id FROM patient_health_metrics WHERE patient_id = ?)", (patient_id,))
             self.cursor.execute("DELETE FROM patient_health_metrics WHERE patient_id = ?", (patient_id,))
+            metrics_deleted = self.cursor.rowcount
+            if metrics_deleted:
+                self._mark_sketches_stale()
+            self.cursor.execute("DELETE FROM ecg_features WHERE patient_id = ?", (patient_id,))
+            self.cursor.execute("DELETE FROM eeg_features WHERE patient_id = ?", (patient_id,))
+            self.cursor.execute("DELETE FROM derived_results WHERE patient_id = ?", (patient_id,))
+            self.cursor.execute("DELETE FROM ecg_stream_windows WHERE patient_id = ?", (patient_id,))
             
             # 2. Delete the primary patient record
             self.cursor.execute("DELETE FROM patients WHERE patient_id = ?", (patient_id,))
             
             # 3. Capture how many patients were actually removed (0 or 1)
             rows_deleted = self.cursor.rowcount
+
+            # 4. Drop image blobs that only this patient referenced
+            self._purge_orphan_images()
             
             self.conn.commit()
+            self._adjust_row_count(-metrics_deleted)
+            self.record_cache.invalidate(patient_id)
             return rows_deleted # Returns 1 if deleted, 0 if patient didn't exist
 
         except Exception as e:
@@ -368,18 +1296,27 @@ class DatabaseManager:
     def save_image_to_db(self, report_id, image_bytes):
         """Updates an existing record with processed image data."""
         try:
+            image_hash = self._store_image(image_bytes)
+            patient_id = self._patient_for_report(report_id)
             sql = "UPDATE patient_health_metrics SET Image_Data = ? WHERE report_id = ?"
-            self.cursor.execute(sql, (sqlite3.Binary(image_bytes), report_id))
+            self.cursor.execute(sql, (image_hash, report_id))
+            self._purge_orphan_images()
             self.conn.commit()
+            self.record_cache.invalidate(patient_id)
             return True
         except Exception as e:
             print(f"Failed to save image to DB: {e}")
+            self.conn.rollback()
             return False
 
     def retrieve_image_from_db(self, report_id):
         """Fetches image BLOB for a specific report."""
         try:
-            self.cursor.execute("SELECT Image_Data FROM patient_health_metrics WHERE report_id = ?", (report_id,))
+            self.cursor.execute("""
+                SELECT i.data FROM patient_health_metrics m
+                JOIN images i ON i.image_hash = m.Image_Data
+                WHERE m.report_id = ?
+            """, (report_id,))
             row = self.cursor.fetchone()
             return row[0] if row and row[0] else None
         except Exception as e:
@@ -390,10 +1327,10 @@ class DatabaseManager:
         """Searches by ID or Name."""
         try:
             if query.isdigit():
-                sql = "SELECT p.Name, p.Gender, m.* FROM patients p JOIN patient_health_metrics m ON p.patient_id = m.patient_id WHERE p.patient_id = ?"
+                sql = SQL_SEARCH_BY_ID
                 params = (int(query),)
             else:
-                sql = "SELECT p.Name, p.Gender, m.* FROM patients p JOIN patient_health_metrics m ON p.patient_id = m.patient_id WHERE p.Name LIKE ?"
+                sql = SQL_SEARCH_BY_NAME
                 params = (f"%{query}%",)
             return pd.read_sql_query(sql, self.conn, params=params)
         except Exception as e:
@@ -404,52 +1341,711 @@ class DatabaseManager:
         """Returns a list of (report_id, Date_Recorded) for a specific patient."""
         try:
             # We fetch report_id and Date_Recorded to allow selection between old/new
-            sql = """
-                SELECT report_id, Date_Recorded 
-                FROM patient_health_metrics 
-                WHERE patient_id = ? AND Image_Data IS NOT NULL
-                ORDER BY report_id ASC
-            """
-            self.cursor.execute(sql, (patient_id,))
+            self.cursor.execute(SQL_PATIENT_IMAGES, (patient_id,))
             return self.cursor.fetchall()
         except Exception as e:
             print(f"Error fetching images for patient {patient_id}: {e}")
             return []
         
-    def save_new_fft_record(self, patient_id, fft_string, signal_type='ECG'):
+    def save_new_fft_record(self, patient_id, fft_values, signal_type='ECG', sampling_rate=DEFAULT_SAMPLING_RATE,
+                            signal_hash=None, seg_start=0, seg_end=None):
         """
-        Creates a new record for the patient with the computed FFT data.
-        Handles both ECG and EEG based on signal_type.
+        Saves a computed FFT to the patient's FFT history (derived_results, saved = 1).
+        Handles both ECG and EEG based on signal_type. Accepts an array or a legacy CSV string.
+        With the source signal's hash and segment the matching cache entry is reused;
+        otherwise the spectrum is keyed by its own content hash.
         """
-        # Determine which column to use based on the signal type
-        column_name = "ECG_FFT_Magnitude" if signal_type == 'ECG' else "EEG_FFT_Magnitude"
-        
         try:
-            sql = f"""
-                INSERT INTO patient_health_metrics (patient_id, Date_Recorded, {column_name})
-                VALUES (?, DATETIME('now'), ?)
-            """
-            self.cursor.execute(sql, (patient_id, fft_string))
-            self.conn.commit()
-            return True
+            fft_blob = to_signal_blob(fft_values, sampling_rate=sampling_rate)
+            if signal_hash is None:
+                signal_hash = hashlib.sha256(fft_blob).hexdigest()
+            if seg_end is None:
+                seg_end = seg_start + len(decode_signal(fft_blob)[0])
+            return self.save_derived_results([
+                (signal_hash, seg_start, seg_end, 'fft_magnitude', '{}', fft_blob,
+                 patient_id, None, signal_type, 1, None)
+            ]) == 1
         except Exception as e:
             print(f"Database FFT Insert Error ({signal_type}): {e}")
             return False
+
+    def get_derived_result(self, signal_hash, seg_start, seg_end, transform, params):
+        """Cached result BLOB for (signal, segment, transform, params), or None."""
+        try:
+            self.cursor.execute(SQL_DERIVED_LOOKUP, (signal_hash, seg_start, seg_end, transform, params))
+            row = self.cursor.fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            print(f"Derived result lookup failed: {e}")
+            return None
+
+    def save_derived_result(self, signal_hash, seg_start, seg_end, transform, params, result,
+                            patient_id=None, report_id=None, signal_type=None):
+        """Stores (or refreshes) one cached derived result. Returns True on success."""
+        return self.save_derived_results([
+            (signal_hash, seg_start, seg_end, transform, params, result,
+             patient_id, report_id, signal_type, 0, None)
+        ]) == 1
+
+    def save_derived_results(self, entries):
+        """
+        Bulk upsert of derived_results rows in one transaction:
+        (signal_hash, seg_start, seg_end, transform, params, result, patient_id, report_id,
+        signal_type, saved, created_at or None). Returns the number of rows written.
+        """
+        # NumPy scalars (ids taken from DataFrames) would otherwise be bound as BLOBs
+        entries = [entry[:5] + (sqlite3.Binary(bytes(entry[5])),) +
+                   tuple(v.item() if isinstance(v, np.generic) else v for v in entry[6:])
+                   for entry in entries]
+        if not entries:
+            return 0
+        try:
+            self.cursor.executemany(SQL_DERIVED_INSERT, entries)
+            self.conn.commit()
+            return len(entries)
+        except Exception as e:
+            print(f"Derived result save failed, transaction rolled back: {e}")
+            self.conn.rollback()
+            return 0
+
+    def get_fft_history(self, patient_id):
+        """The patient's saved FFT spectra (result holds the encoded magnitude BLOB)."""
+        try:
+            return pd.read_sql_query(SQL_DERIVED_HISTORY, self.conn, params=(patient_id,))
+        except Exception as e:
+            print(f"Error fetching FFT history for patient {patient_id}: {e}")
+            return pd.DataFrame()
+
+    def purge_derived_results(self, max_age_days=DERIVED_CACHE_DAYS):
+        """Drops unsaved cache entries older than max_age_days (they are recomputed on demand)."""
+        self.cursor.execute(
+            "DELETE FROM derived_results WHERE saved = 0 AND created_at < DATETIME('now', ?)",
+            (f"-{int(max_age_days)} days",)
+        )
+        self.conn.commit()
+        return self.cursor.rowcount
     
     def get_all_records_for_patient(self, patient_id):
-        """Fetches every record for a specific patient, regardless of pagination."""
-        query = """
-        SELECT m.*, p.Name, p.Gender 
-        FROM patient_health_metrics m
-        JOIN patients p ON m.patient_id = p.patient_id
-        WHERE m.patient_id = ?
-        ORDER BY m.Date_Recorded ASC
         """
-        return pd.read_sql_query(query, self.conn, params=(patient_id,))
+        Fetches every record for a specific patient, regardless of pagination.
+        Served from the shared LRU record cache when possible; callers get their own copy.
+        """
+        try:
+            key = int(patient_id)
+        except (TypeError, ValueError):
+            return pd.read_sql_query(SQL_PATIENT_HISTORY, self.conn, params=(patient_id,))
+
+        df = self.record_cache.get(key)
+        if df is None:
+            generation = self.record_cache.generation(key)
+            df = pd.read_sql_query(SQL_PATIENT_HISTORY, self.conn, params=(key,))
+            self.record_cache.put(key, df, generation)
+        return df
+
+    def iter_ecg_signal_records(self, batch_size=2000):
+        """Yields lists of (patient_id, report_id, ECG_Signal) for every report with an ECG."""
+        return self.iter_signal_records('ECG_Signal', batch_size)
+
+    def iter_signal_records(self, column, batch_size=2000):
+        """
+        Yields lists of (patient_id, report_id, signal) for every report with data in a
+        signal column, paging by report_id so a cohort run never holds every signal in memory.
+        """
+        if column not in SIGNAL_COLUMNS:
+            raise ValueError(f"Not a signal column: {column}")
+        last_report_id = 0
+        while True:
+            self.cursor.execute(
+                f"SELECT patient_id, report_id, {column} FROM patient_health_metrics "
+                f"WHERE report_id > ? AND {column} IS NOT NULL ORDER BY report_id LIMIT ?",
+                (last_report_id, batch_size)
+            )
+            rows = self.cursor.fetchall()
+            if not rows:
+                return
+            last_report_id = rows[-1][1]
+            # Chunked recordings are reassembled so analyzers always get the full signal
+            yield [(patient_id, report_id, self._full_signal_blob(report_id, column, value))
+                   for patient_id, report_id, value in rows]
+
+    def _full_signal_blob(self, report_id, column, value):
+        """Inline signal value for a stored one: chunked stubs are read back and re-encoded."""
+        if not is_chunked_signal(value):
+            return value
+        data, sampling_rate = self.get_signal_window(report_id, 0, read_signal_header(value)[1], column)
+        return encode_signal(data, sampling_rate=sampling_rate, dtype=data.dtype)
+
+    def save_ecg_features(self, results_df):
+        """
+        Bulk-writes analyze_ecg_batch results (one row per report, replacing earlier runs)
+        in a single transaction. Returns the number of rows written.
+        """
+        if results_df is None or results_df.empty:
+            return 0
+        columns = ['report_id', 'patient_id', 'n_samples', 'sampling_rate', 'method', 'r_peaks',
+                   'n_peaks', 'mean_hr_bpm', 'mean_rr_ms', 'sdnn_ms', 'rmssd_ms', 'processing_ms', 'error']
+        values = results_df[columns].astype(object)
+        values = values.where(results_df[columns].notna(), None)
+        values['r_peaks'] = [np.asarray(peaks, dtype='<i4').tobytes() for peaks in results_df['r_peaks']]
+        return self._save_feature_rows('ecg_features', columns, values)
+
+    def save_eeg_features(self, results_df):
+        """Bulk-writes analyze_eeg_batch results (one row per report) in a single transaction."""
+        if results_df is None or results_df.empty:
+            return 0
+        columns = ['report_id', 'patient_id', 'n_samples', 'sampling_rate', 'delta', 'theta', 'alpha',
+                   'beta', 'gamma', 'processing_ms', 'error']
+        values = results_df[columns].astype(object)
+        values = values.where(results_df[columns].notna(), None)
+        return self._save_feature_rows('eeg_features', columns, values)
+
+    def _save_feature_rows(self, table, columns, values):
+        """INSERT OR REPLACE of prepared feature rows, stamped with computed_at."""
+        try:
+            self.cursor.executemany(
+                f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}, computed_at) "
+                f"VALUES ({', '.join(['?'] * len(columns))}, DATETIME('now'))",
+                values.itertuples(index=False, name=None)
+            )
+            self.conn.commit()
+            return len(values)
+        except Exception as e:
+            print(f"{table} save failed, transaction rolled back: {e}")
+            self.conn.rollback()
+            return 0
+
+    def get_eeg_features(self, patient_id=None):
+        """Stored EEG band powers (all, or one patient's) with each report's Date_Recorded."""
+        sql = SQL_EEG_FEATURES
+        params = ()
+        if patient_id is not None:
+            sql += "WHERE f.patient_id = ?\n"
+            params = (patient_id,)
+        try:
+            return pd.read_sql_query(sql + SQL_EEG_FEATURES_ORDER, self.conn, params=params)
+        except Exception as e:
+            print(f"Error fetching EEG features: {e}")
+            return pd.DataFrame()
+
+    def get_ecg_features(self, patient_id=None):
+        """Stored batch ECG results (all, or one patient's) with r_peaks decoded to arrays."""
+        sql = "SELECT * FROM ecg_features"
+        params = ()
+        if patient_id is not None:
+            sql += " WHERE patient_id = ?"
+            params = (patient_id,)
+        df = pd.read_sql_query(sql + " ORDER BY report_id", self.conn, params=params)
+        df['r_peaks'] = [np.frombuffer(blob, dtype='<i4') if blob else np.empty(0, dtype='<i4')
+                         for blob in df['r_peaks']]
+        return df
+
+    # --- SQL aggregates: summaries over the whole table without loading its rows ---
+
+    @staticmethod
+    def _check_metric_columns(columns):
+        for col in columns:
+            if col not in NUMERIC_METRIC_COLUMNS:
+                raise ValueError(f"{col} is not a numeric metric column.")
+
+    def _numeric_metric_values(self, columns):
+        """SELECT list reading `columns` as numbers (leftover text becomes NULL)."""
+        self._check_metric_columns(columns)
+        return ', '.join(f"CASE WHEN typeof({col}) IN ('integer', 'real') THEN {col} END AS {col}" for col in columns)
+
+    def _numeric_metrics_source(self, columns, patient_id=None):
+        """
+        Subquery exposing `columns` as numbers (leftover text becomes NULL, like
+        pd.to_numeric(errors='coerce')), optionally limited to one patient.
+        """
+        sql = f"(SELECT {self._numeric_metric_values(columns)} FROM patient_health_metrics"
+        params = ()
+        if patient_id is not None:
+            sql += " WHERE patient_id = ?"
+            params = (int(patient_id),)
+        return sql + ")", params
+
+    def _metric_comoments(self, columns, patient_id=None):
+        """Runs the metric_comoments aggregate over `columns`; returns (n, mean_x, m2_x, comoment, mins, maxs)."""
+        self._check_metric_columns(columns)
+        sql = f"SELECT metric_comoments({', '.join(columns)}) FROM patient_health_metrics"
+        params = ()
+        if patient_id is not None:
+            sql += " WHERE patient_id = ?"
+            params = (int(patient_id),)
+        blob = self.conn.execute(sql, params).fetchone()[0]
+        k = len(columns)
+        if blob is None:
+            return (np.zeros((k, k)),) + tuple(np.full((k, k), np.nan) for _ in range(3)) + \
+                   (np.full(k, np.nan), np.full(k, np.nan))
+        state = np.frombuffer(blob, dtype='<f8')
+        n, mean_x, m2_x, comoment = state[:4 * k * k].reshape(4, k, k)
+        return n, mean_x, m2_x, comoment, state[4 * k * k:4 * k * k + k], state[4 * k * k + k:]
+
+    def get_metric_summary(self, columns=NUMERIC_METRIC_COLUMNS, patient_id=None):
+        """
+        Per-column count, mean, sample variance, min and max, aggregated by SQLite in a
+        single scan (see MetricCoMoments). Returns a DataFrame indexed by column.
+        """
+        columns = list(columns)
+        n, mean_x, m2_x, _, mins, maxs = self._metric_comoments(columns, patient_id)
+        counts, means, m2 = np.diag(n), np.diag(mean_x), np.diag(m2_x)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = np.where(counts > 1, m2 / (counts - 1), np.nan)
+        return pd.DataFrame({
+            'count': counts.astype(np.int64), 'mean': np.where(counts > 0, means, np.nan), 'variance': variance,
+            'min': mins, 'max': maxs
+        }, index=columns)
+
+    def get_metric_comoments(self, columns=NUMERIC_METRIC_COLUMNS, patient_id=None):
+        """
+        Pairwise-complete co-moments of the metric columns, as pandas' DataFrame.cov/corr
+        use them, aggregated by SQLite in one scan. Returns a dict of k x k arrays: n (rows
+        where both are present), mean_x / mean_y (column means over those rows), var_x /
+        var_y and cov (sample variances and covariance over those rows).
+        """
+        columns = list(columns)
+        n, mean_x, m2_x, comoment, _, _ = self._metric_comoments(columns, patient_id)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            valid = np.where(n > 1, 1.0, np.nan)
+            var_x = m2_x / (n - 1) * valid
+            return {
+                'columns': columns, 'n': n,
+                'mean_x': np.where(n > 0, mean_x, np.nan), 'mean_y': np.where(n > 0, mean_x.T, np.nan),
+                'var_x': var_x, 'var_y': var_x.T, 'cov': comoment / (n - 1) * valid
+            }
+
+    def get_metric_correlation(self, columns=NUMERIC_METRIC_COLUMNS, patient_id=None):
+        """Pearson correlation matrix over the whole table (or one patient), like DataFrame.corr()."""
+        return _correlation_frame(self.get_metric_comoments(columns, patient_id))
+
+    def get_metric_histogram(self, column, bins=30, patient_id=None, value_range=None):
+        """Histogram of one metric binned by SQLite (GROUP BY bin). Returns (counts, edges)."""
+        counts, edges = self.get_metric_histogram2d(column, None, bins, patient_id, value_range)
+        return counts, edges[0]
+
+    def get_metric_histogram2d(self, col1, col2, bins=18, patient_id=None, value_range=None):
+        """
+        Joint histogram of two metrics over the rows where both are present (col2=None:
+        a 1-D histogram of col1). Bins span each column's range like np.histogram.
+        Returns (counts, [edges per column]).
+        """
+        columns = [col1] if col2 is None else [col1, col2]
+        source, params = self._numeric_metrics_source(columns, patient_id)
+        present = ' AND '.join(f"{c} IS NOT NULL" for c in columns)
+
+        # 1. Bin edges from the columns' extremes
+        if value_range is None:
+            extremes = ', '.join(f"MIN({c}), MAX({c})" for c in columns)
+            row = self.conn.execute(f"SELECT {extremes} FROM {source} WHERE {present}", params).fetchone()
+            value_range = [(row[2 * i], row[2 * i + 1]) for i in range(len(columns))]
+        else:
+            value_range = [value_range] if col2 is None else list(value_range)
+        edges = []
+        for low, high in value_range:
+            if low is None:
+                low, high = 0.0, 1.0
+            elif low == high:
+                low, high = low - 0.5, high + 0.5
+            edges.append(np.linspace(low, high, bins + 1))
+
+        # 2. Counts per bin; the top edge belongs to the last bin, as in np.histogram
+        bin_exprs = ', '.join(f"MIN(CAST(({c} - ?) / ? AS INTEGER), {bins - 1})" for c in columns)
+        bin_params = [value for e in edges for value in (e[0], (e[-1] - e[0]) / bins)]
+        in_range = ' AND '.join(f"{c} BETWEEN ? AND ?" for c in columns)
+        range_params = [value for e in edges for value in (e[0], e[-1])]
+        group = ', '.join(str(i + 1) for i in range(len(columns)))
+        rows = self.conn.execute(
+            f"SELECT {bin_exprs}, COUNT(*) FROM {source} WHERE {present} AND {in_range} GROUP BY {group}",
+            bin_params + list(params) + range_params
+        ).fetchall()
+
+        counts = np.zeros((bins,) * len(columns), dtype=np.int64)
+        for row in rows:
+            counts[tuple(row[:-1])] = row[-1]
+        return counts, edges
+
+    # --- Quantile sketches: approximate quartiles / IQR fences without rescanning ---
+
+    def _metric_values(self, where, params=()):
+        """NUMERIC_METRIC_COLUMNS of the matching reports as an (n, k) float array (NaN = missing)."""
+        rows = self.cursor.execute(
+            f"SELECT {self._numeric_metric_values(NUMERIC_METRIC_COLUMNS)} FROM patient_health_metrics WHERE {where}",
+            params
+        ).fetchall()
+        return np.array(rows, dtype=np.float64).reshape(len(rows), len(NUMERIC_METRIC_COLUMNS))
+
+    def _fold_new_metric_rows(self, after_report_id=0):
+        """
+        Adds the reports after after_report_id to the quantile sketches, pair statistics
+        and materialized metric series. Does not commit.
+        """
+        values = self._metric_values("report_id > ?", (after_report_id,))
+        if len(values):
+            self._update_metric_sketches(values)
+            self._adjust_metric_pair_stats(values, +1)
+            self._append_metric_series("report_id > ?", (after_report_id,))
+
+    def _update_metric_sketches(self, values):
+        """
+        Folds new (n, k) metric values into the stored sketches. Missing or stale sketches
+        are left for get_metric_quantiles to rebuild. Does not commit.
+        """
+        stored = dict(self.cursor.execute("SELECT column_name, sketch FROM metric_sketches WHERE stale = 0").fetchall())
+        self.cursor.executemany(
+            "UPDATE metric_sketches SET sketch = ? WHERE column_name = ?",
+            ((sqlite3.Binary(KLLSketch.from_bytes(stored[col]).update(values[:, i]).to_bytes()), col)
+             for i, col in enumerate(NUMERIC_METRIC_COLUMNS) if col in stored)
+        )
+        self._sketches = {}
+
+    def _mark_sketches_stale(self, columns=NUMERIC_METRIC_COLUMNS):
+        """Updated or deleted values cannot be taken out of a sketch: flag it for a rebuild. Does not commit."""
+        if not columns:
+            return
+        self.cursor.execute(
+            f"UPDATE metric_sketches SET stale = 1 WHERE column_name IN ({', '.join(['?'] * len(columns))})",
+            tuple(columns)
+        )
+        self._sketches = {}
+
+    def _rebuild_metric_sketch(self, column):
+        """Builds a column's sketch from the whole table in bounded batches and stores it."""
+        source, _ = self._numeric_metrics_source([column])
+        sketch = KLLSketch()
+        # Scan and store in one write transaction: a row another connection committed in
+        # between would be missed by the scan, then skipped by _update_metric_sketches
+        # (which only folds into fresh sketches), and lost from the sketch for good.
+        # Pending writes on this connection already hold the write lock.
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self.conn.execute(f"SELECT {column} FROM {source} WHERE {column} IS NOT NULL")
+            while True:
+                rows = cursor.fetchmany(SKETCH_REBUILD_BATCH)
+                if not rows:
+                    break
+                sketch.update(np.array(rows, dtype=np.float64))
+            self.conn.execute("INSERT OR REPLACE INTO metric_sketches (column_name, sketch, stale) VALUES (?, ?, 0)",
+                              (column, sqlite3.Binary(sketch.to_bytes())))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return sketch
+
+    def get_metric_quantiles(self, columns=NUMERIC_METRIC_COLUMNS, qs=(0.25, 0.75)):
+        """
+        Approximate quantiles of each metric over the whole table, from its KLL sketch
+        (about 1% rank error). Returns {column: array of len(qs)}. Sketches are parsed once
+        per database version, so repeated calls (e.g. while dragging a slider) cost no scans.
+        """
+        self._check_metric_columns(columns)
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._sketches_version:
+            self._sketches, self._sketches_version = {}, data_version
+
+        missing = [col for col in columns if col not in self._sketches]
+        if missing:
+            placeholders = ', '.join(['?'] * len(missing))
+            stored = dict(self.cursor.execute(
+                f"SELECT column_name, sketch FROM metric_sketches WHERE stale = 0 AND column_name IN ({placeholders})",
+                tuple(missing)
+            ).fetchall())
+            for col in missing:
+                self._sketches[col] = (KLLSketch.from_bytes(stored[col]) if col in stored
+                                       else self._rebuild_metric_sketch(col))
+        return {col: self._sketches[col].quantiles(qs) for col in columns}
+
+    def get_iqr_bounds(self, columns, factor=1.5):
+        """Tukey fences {column: (low, high)} from the sketched quartiles."""
+        return {col: iqr_bounds(q1, q3, factor) for col, (q1, q3) in self.get_metric_quantiles(columns).items()}
+
+    # --- Pair statistics: the global correlation matrix, maintained on every write ---
+
+    def _adjust_metric_pair_stats(self, values, sign):
+        """
+        Adds (sign=+1) or removes (sign=-1) rows of metric values from the running pair
+        sums. Only updates existing rows: until get_metric_pair_stats has built the
+        table there is nothing to keep current. Does not commit.
+        """
+        if len(values) == 0:
+            return
+        present = np.isfinite(values).astype(np.float64)
+        x = np.where(present > 0, values, 0.0)
+        n, sum_x, sum_xx, sum_xy = present.T @ present, x.T @ present, (x * x).T @ present, x.T @ x
+        k = len(NUMERIC_METRIC_COLUMNS)
+        self.cursor.executemany(
+            "UPDATE metric_pair_stats SET n = n + ?, sum_x = sum_x + ?, sum_y = sum_y + ?, "
+            "sum_xx = sum_xx + ?, sum_yy = sum_yy + ?, sum_xy = sum_xy + ? WHERE col_x = ? AND col_y = ?",
+            ((sign * n[i, j], sign * sum_x[i, j], sign * sum_x[j, i], sign * sum_xx[i, j], sign * sum_xx[j, i],
+              sign * sum_xy[i, j], NUMERIC_METRIC_COLUMNS[i], NUMERIC_METRIC_COLUMNS[j])
+             for i in range(k) for j in range(i, k))
+        )
+
+    def rebuild_metric_pair_stats(self):
+        """Recomputes the pair sums from scratch (one aggregate scan) and stores them."""
+        moments = self.get_metric_comoments(NUMERIC_METRIC_COLUMNS)
+        n = moments['n']
+        mean_x, mean_y = np.nan_to_num(moments['mean_x']), np.nan_to_num(moments['mean_y'])
+        with np.errstate(invalid='ignore'):
+            var_x, var_y, cov = (np.nan_to_num(moments[name]) for name in ('var_x', 'var_y', 'cov'))
+        dof = np.maximum(n - 1, 0)
+        k = len(NUMERIC_METRIC_COLUMNS)
+        self.cursor.executemany(
+            "INSERT OR REPLACE INTO metric_pair_stats (col_x, col_y, n, sum_x, sum_y, sum_xx, sum_yy, sum_xy) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ((NUMERIC_METRIC_COLUMNS[i], NUMERIC_METRIC_COLUMNS[j], n[i, j],
+              n[i, j] * mean_x[i, j], n[i, j] * mean_y[i, j],
+              dof[i, j] * var_x[i, j] + n[i, j] * mean_x[i, j] ** 2,
+              dof[i, j] * var_y[i, j] + n[i, j] * mean_y[i, j] ** 2,
+              dof[i, j] * cov[i, j] + n[i, j] * mean_x[i, j] * mean_y[i, j])
+             for i in range(k) for j in range(i, k))
+        )
+        self.conn.commit()
+        return moments
+
+    def get_metric_pair_stats(self):
+        """
+        Pair co-moments of NUMERIC_METRIC_COLUMNS from the maintained sums, in the
+        get_metric_comoments format; no rows are read. Builds the table on first use.
+        """
+        k = len(NUMERIC_METRIC_COLUMNS)
+        rows = self.cursor.execute(
+            "SELECT col_x, col_y, n, sum_x, sum_y, sum_xx, sum_yy, sum_xy FROM metric_pair_stats"
+        ).fetchall()
+        if len(rows) < k * (k + 1) // 2:
+            return self.rebuild_metric_pair_stats()
+
+        index = {col: i for i, col in enumerate(NUMERIC_METRIC_COLUMNS)}
+        sums = np.zeros((6, k, k))
+        for col_x, col_y, *values in rows:
+            i, j = index[col_x], index[col_y]
+            sums[:, i, j] = values
+            sums[:, j, i] = values[0], values[2], values[1], values[4], values[3], values[5]
+        n, sum_x, sum_y, sum_xx, sum_yy, sum_xy = sums
+        # Removals can leave tiny float residue on an emptied pair
+        n = np.round(n)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            valid = np.where(n > 1, 1.0, np.nan)
+            return {
+                'columns': list(NUMERIC_METRIC_COLUMNS), 'n': n,
+                'mean_x': np.where(n > 0, sum_x / n, np.nan), 'mean_y': np.where(n > 0, sum_y / n, np.nan),
+                'var_x': (sum_xx - sum_x ** 2 / n) / (n - 1) * valid,
+                'var_y': (sum_yy - sum_y ** 2 / n) / (n - 1) * valid,
+                'cov': (sum_xy - sum_x * sum_y / n) / (n - 1) * valid
+            }
+
+    def get_global_correlation(self, verify=False):
+        """
+        Correlation matrix of the metrics with data and spread, from the maintained pair
+        statistics. verify=True recomputes them from scratch instead, stores the fresh
+        sums and also returns the largest correlation drift found (else None).
+        """
+        maintained = self.get_metric_pair_stats()
+        moments = self.rebuild_metric_pair_stats() if verify else maintained
+        corr = _correlation_frame(moments)
+        keep = [col for i, col in enumerate(moments['columns'])
+                if moments['n'][i, i] > 1 and moments['var_x'][i, i] > 0]
+        corr = corr.loc[keep, keep]
+        drift = None
+        if verify:
+            drift = float(np.nanmax(np.abs(_correlation_frame(maintained).loc[keep, keep].values - corr.values),
+                                    initial=0.0))
+        return corr, drift
+
+    # --- Metric time series: long-format trends and cached cohort percentile bands ---
+
+    def _metric_series_rows(self, metrics, where, params=()):
+        """
+        (metric, patient_id, recorded_at, report_id, value) rows of the matching reports.
+        Reports without a patient or a parseable Date_Recorded, and missing values, are left out.
+        """
+        rows = self.cursor.execute(
+            f"SELECT report_id, patient_id, Date_Recorded, {self._numeric_metric_values(metrics)} "
+            f"FROM patient_health_metrics WHERE patient_id IS NOT NULL AND ({where})", params
+        ).fetchall()
+        if not rows:
+            return []
+        report_ids, patient_ids, dates, *columns = zip(*rows)
+        seconds, dated = parse_timestamps(dates)
+        report_ids, patient_ids = np.array(report_ids), np.array(patient_ids)
+        series_rows = []
+        for metric, column in zip(metrics, columns):
+            values = np.array(column, dtype=np.float64)
+            keep = dated & np.isfinite(values)
+            series_rows.extend(zip([metric] * int(keep.sum()), patient_ids[keep].tolist(),
+                                   seconds[keep].tolist(), report_ids[keep].tolist(), values[keep].tolist()))
+        return series_rows
+
+    def _append_metric_series(self, where, params=()):
+        """Adds the matching reports to the metrics already materialized. Does not commit."""
+        built = [row[0] for row in self.cursor.execute("SELECT metric FROM metric_series_built").fetchall()]
+        if built:
+            self.cursor.executemany("INSERT OR REPLACE INTO metric_series VALUES (?, ?, ?, ?, ?)",
+                                    self._metric_series_rows(built, where, params))
+        self._bands = {}
+
+    def _drop_patient_metric_series(self, patient_id):
+        """Removes a patient's rows from every metric series. Does not commit."""
+        self.cursor.execute(
+            f"DELETE FROM metric_series WHERE metric IN ({', '.join(['?'] * len(NUMERIC_METRIC_COLUMNS))}) "
+            "AND patient_id = ?", (*NUMERIC_METRIC_COLUMNS, patient_id)
+        )
+        self._bands = {}
+
+    def rebuild_metric_series(self, metrics=NUMERIC_METRIC_COLUMNS):
+        """Materializes the metrics' long-format series from the whole table, in report_id batches."""
+        self._check_metric_columns(metrics)
+        placeholders = ', '.join(['?'] * len(metrics))
+        self.cursor.execute(f"DELETE FROM metric_series WHERE metric IN ({placeholders})", tuple(metrics))
+        last_report_id = self.cursor.execute("SELECT MAX(report_id) FROM patient_health_metrics").fetchone()[0] or 0
+        for start in range(0, last_report_id, SERIES_REBUILD_BATCH):
+            self.cursor.executemany(
+                "INSERT INTO metric_series VALUES (?, ?, ?, ?, ?)",
+                self._metric_series_rows(metrics, "report_id > ? AND report_id <= ?",
+                                         (start, start + SERIES_REBUILD_BATCH))
+            )
+        self.cursor.executemany("INSERT OR IGNORE INTO metric_series_built (metric) VALUES (?)",
+                                ((metric,) for metric in metrics))
+        self.conn.commit()
+        self._bands = {}
+
+    def get_metric_series(self, metric, patient_id=None, window=1):
+        """
+        A metric's time series in long format: DataFrame of patient_id, timestamp
+        (datetime64) and value, ordered by patient then time; one patient's, or the whole
+        cohort's. window > 1 adds a 'trend' column, the centered moving average of each
+        patient's series (all patients in one pass). Materializes the metric on first use.
+        """
+        self._check_metric_columns([metric])
+        if not self.cursor.execute("SELECT 1 FROM metric_series_built WHERE metric = ?", (metric,)).fetchone():
+            self.rebuild_metric_series([metric])
+        if patient_id is None:
+            rows = self.cursor.execute(SQL_METRIC_SERIES, (metric,)).fetchall()
+        else:
+            rows = self.cursor.execute(SQL_PATIENT_METRIC_SERIES, (metric, patient_id)).fetchall()
+
+        values = np.array(rows, dtype=np.float64).reshape(len(rows), 3)
+        patient_ids = values[:, 0].astype(np.int64)
+        series = pd.DataFrame({
+            'patient_id': patient_ids,
+            'timestamp': values[:, 1].astype(np.int64).astype('datetime64[s]'),
+            'value': values[:, 2]
+        })
+        if window > 1:
+            series['trend'] = grouped_rolling_mean(patient_ids, series['value'].to_numpy(), window)
+        return series
+
+    def get_cohort_bands(self, metric, freq=DEFAULT_BAND_FREQ, percentiles=DEFAULT_BAND_PERCENTILES):
+        """
+        Population distribution of a metric over time: each patient's values are averaged
+        per period (freq: 'D', 'W', 'M' or 'Y'), then the percentiles across patients are
+        taken per period. DataFrame indexed by period start, one 'p<percentile>' column
+        each plus 'patients'. Cached until the data changes, so overlaying another
+        patient's trend costs no scan.
+        """
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._bands_version:
+            self._bands, self._bands_version = {}, data_version
+
+        key = (metric, freq, tuple(percentiles))
+        if key not in self._bands:
+            series = self.get_metric_series(metric)
+            _, periods, means, _ = resample_groups(series['patient_id'].to_numpy(), series['timestamp'].to_numpy(),
+                                                   series['value'].to_numpy(), freq)
+            bins, bands, counts = percentile_bands(periods, means, percentiles)
+            frame = pd.DataFrame(bands, index=pd.DatetimeIndex(bins, name='period'),
+                                 columns=[f"p{p:g}" for p in percentiles])
+            frame['patients'] = counts
+            self._bands[key] = frame
+        return self._bands[key]
+
+    def save_stream_windows(self, stream_id, patient_id, windows, sampling_rate=DEFAULT_SAMPLING_RATE):
+        """
+        Appends a batch of live-monitor windows (dicts from StreamingECGAnalyzer.process)
+        in one transaction. Returns the number of windows written.
+        """
+        if not windows:
+            return 0
+        rows = [(stream_id, patient_id, int(w['start_sample']), sampling_rate,
+                 sqlite3.Binary(encode_signal(w['samples'], sampling_rate=sampling_rate)),
+                 sqlite3.Binary(np.asarray(w['r_peaks'], dtype='<i4').tobytes()),
+                 None if np.isnan(w['mean_hr_bpm']) else float(w['mean_hr_bpm']))
+                for w in windows]
+        try:
+            self.cursor.executemany(
+                "INSERT INTO ecg_stream_windows (stream_id, patient_id, start_sample, sampling_rate, "
+                "samples, r_peaks, mean_hr_bpm, recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?, DATETIME('now'))",
+                rows
+            )
+            self.conn.commit()
+            return len(rows)
+        except Exception as e:
+            print(f"Stream window save failed, transaction rolled back: {e}")
+            self.conn.rollback()
+            return 0
+
+    def get_stream_signal(self, stream_id):
+        """Reassembles a recorded stream: (samples, r_peaks as absolute indices), or (None, None)."""
+        self.cursor.execute(
+            "SELECT start_sample, samples, r_peaks FROM ecg_stream_windows "
+            "WHERE stream_id = ? ORDER BY start_sample", (stream_id,)
+        )
+        rows = self.cursor.fetchall()
+        if not rows:
+            return None, None
+        samples = np.concatenate([decode_signal(blob)[0] for _, blob, _ in rows])
+        r_peaks = np.concatenate([np.frombuffer(peaks, dtype='<i4').astype(np.int64) + start
+                                  for start, _, peaks in rows])
+        return samples, r_peaks
+
+    def record_cache_stats(self):
+        """Hit/miss/eviction counters and memory use of the per-patient record cache."""
+        return self.record_cache.stats()
+
+    def _patient_for_report(self, report_id):
+        self.cursor.execute("SELECT patient_id FROM patient_health_metrics WHERE report_id = ?", (report_id,))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
 
     def get_total_count(self):
-        self.cursor.execute("SELECT COUNT(*) FROM patient_health_metrics")
-        return self.cursor.fetchone()[0]
+        """
+        Returns the number of health records. The COUNT(*) result is cached and kept
+        current by the insert/delete paths; it is recounted only when another
+        connection (e.g. the import thread) has committed, as seen by PRAGMA data_version.
+        """
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._row_count is None or data_version != self._row_count_version:
+            self.cursor.execute("SELECT COUNT(*) FROM patient_health_metrics")
+            self._row_count = self.cursor.fetchone()[0]
+            self._row_count_version = data_version
+        return self._row_count
+
+    def _adjust_row_count(self, delta):
+        """Applies a committed insert/delete to the cached row count."""
+        if self._row_count is not None:
+            self._row_count += delta
+
+    def check_query_plans(self, verbose=False):
+        """
+        Runs EXPLAIN QUERY PLAN on every hot query and reports full table scans.
+        Returns a list of (query name, plan step) failures; empty means every query is indexed.
+        """
+        failures = []
+        for name, (sql, params, allowed_scans) in HOT_QUERIES.items():
+            plan = [row[3] for row in self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            for step in plan:
+                words = step.split()
+                # "SCAN t" is a table scan; "SCAN t USING [COVERING] INDEX ..." walks an index
+                is_table_scan = words[0] == 'SCAN' and 'USING' not in words
+                if is_table_scan and words[1] not in allowed_scans:
+                    failures.append((name, step))
+            if verbose:
+                print(f"{name}:\n    " + "\n    ".join(plan))
+
+        for name, step in failures:
+            print(f"Query plan regression in {name}: {step}")
+        return failures
     
 
     def close_connection(self):
@@ -0,0 +1,164 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Pyramid levels start at this block size; narrower views are decimated from the raw samples
+PYRAMID_BASE_BLOCK = 8
+# Pyramids kept in memory (one per signal / spectrum)
+PYRAMID_CACHE_SIZE = 8
+
+_pyramids = OrderedDict()
+_pyramids_lock = threading.Lock()
+
+
+def target_points(pixel_width):
+    """Points worth plotting on a canvas: two per horizontal pixel (one min, one max)."""
+    return max(2 * int(pixel_width), 200)
+
+
+def minmax_decimate(x, y, n_out):
+    """
+    Min/max envelope: splits the series into n_out // 2 buckets and keeps each bucket's
+    extremes in their original order, so spikes (R-peaks, spectral lines) survive.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(y)
+    buckets = max(1, n_out // 2)
+    if n <= n_out:
+        return x, y
+
+    # Equal buckets over the first size * buckets samples, the remainder folds into the last one
+    size = n // buckets
+    head = y[:size * buckets].reshape(buckets, size)
+    arg_min = head.argmin(axis=1)
+    arg_max = head.argmax(axis=1)
+    tail = y[size * buckets:]
+    if len(tail):
+        last = np.concatenate((head[-1], tail))
+        arg_min[-1], arg_max[-1] = last.argmin(), last.argmax()
+
+    starts = np.arange(buckets) * size
+    first = starts + np.minimum(arg_min, arg_max)
+    second = starts + np.maximum(arg_min, arg_max)
+    idx = np.column_stack((first, second)).ravel()
+    return x[idx], y[idx]
+
+
+def block_envelope(y, block):
+    """
+    Min/max of every `block` samples (the last block may be shorter), interleaved in the
+    order they occur: a compact overview of a long recording, two values per block.
+    """
+    y = np.asarray(y)
+    n_full = len(y) // block
+    pairs = []
+    if n_full:
+        head = y[:n_full * block].reshape(n_full, block)
+        lows, highs = head.min(axis=1), head.max(axis=1)
+        min_first = head.argmin(axis=1) <= head.argmax(axis=1)
+        pairs.append(np.column_stack((np.where(min_first, lows, highs), np.where(min_first, highs, lows))).ravel())
+    tail = y[n_full * block:]
+    if len(tail):
+        ordered = (tail.min(), tail.max()) if tail.argmin() <= tail.argmax() else (tail.max(), tail.min())
+        pairs.append(np.asarray(ordered, dtype=y.dtype))
+    return np.concatenate(pairs) if pairs else y[:0]
+
+
+def envelope_positions(n_samples, block):
+    """Sample positions for a block_envelope: a quarter and three quarters into each block."""
+    starts = np.arange(0, n_samples, block)
+    widths = np.minimum(block, n_samples - starts)
+    return np.column_stack((starts + widths // 4, starts + (3 * widths) // 4)).ravel()
+
+
+class SignalPyramid:
+    """
+    Multi-resolution min/max envelope of one series. Level k holds the min, max and
+    which-came-first flag of every block of PYRAMID_BASE_BLOCK * 2**k samples, so any
+    visible range is served from the coarsest level that still gives enough points:
+    the work is proportional to the points drawn, not the samples in view.
+    """
+
+    def __init__(self, y, x=None):
+        self.y = np.asarray(y)
+        self.x = np.arange(len(self.y)) if x is None else np.asarray(x)
+        self.levels = []  # (block size, mins, maxs, min_first)
+
+        n_blocks = len(self.y) // PYRAMID_BASE_BLOCK
+        if n_blocks < 2:
+            return
+        base = self.y[:n_blocks * PYRAMID_BASE_BLOCK].reshape(n_blocks, PYRAMID_BASE_BLOCK)
+        mins, maxs = base.min(axis=1), base.max(axis=1)
+        min_first = base.argmin(axis=1) <= base.argmax(axis=1)
+        block = PYRAMID_BASE_BLOCK
+        self.levels.append((block, mins, maxs, min_first))
+
+        # Each coarser level merges pairs of blocks from the one below
+        while len(mins) >= 4:
+            pairs = len(mins) // 2
+            lo_min, hi_min = mins[0:2 * pairs:2], mins[1:2 * pairs:2]
+            lo_max, hi_max = maxs[0:2 * pairs:2], maxs[1:2 * pairs:2]
+            min_in_hi = hi_min < lo_min
+            max_in_hi = hi_max > lo_max
+            child_first = np.where(min_in_hi, min_first[1:2 * pairs:2], min_first[0:2 * pairs:2])
+            min_first = np.where(min_in_hi == max_in_hi, child_first, ~min_in_hi)
+            mins = np.where(min_in_hi, hi_min, lo_min)
+            maxs = np.where(max_in_hi, hi_max, lo_max)
+            block *= 2
+            self.levels.append((block, mins, maxs, min_first))
+
+    def view(self, start, end, n_out):
+        """Decimated (x, y) for samples [start, end), about n_out points."""
+        start = max(0, int(start))
+        end = min(len(self.y), int(end))
+        if end <= start:
+            return self.x[:0], self.y[:0]
+        span = end - start
+        if span <= n_out:
+            return self.x[start:end], self.y[start:end]
+
+        # Coarsest level whose blocks still give at least n_out / 2 min/max pairs in view
+        level = None
+        for candidate in self.levels:
+            if span // candidate[0] >= n_out // 2:
+                level = candidate
+        if level is None:
+            return minmax_decimate(self.x[start:end], self.y[start:end], n_out)
+
+        block, mins, maxs, min_first = level
+        first_block = -(-start // block)
+        last_block = min(end // block, len(mins))
+        blocks = np.arange(first_block, last_block)
+        lows, highs, order = mins[blocks], maxs[blocks], min_first[blocks]
+        ys = np.column_stack((np.where(order, lows, highs), np.where(order, highs, lows))).ravel()
+        positions = np.column_stack((blocks * block + block // 4, blocks * block + (3 * block) // 4)).ravel()
+        xs = self.x[positions]
+
+        # Partial blocks at the edges come straight from the samples
+        head_x, head_y = minmax_decimate(self.x[start:first_block * block], self.y[start:first_block * block], 2)
+        tail_from = max(last_block * block, start)
+        tail_x, tail_y = minmax_decimate(self.x[tail_from:end], self.y[tail_from:end], 2)
+        return np.concatenate((head_x, xs, tail_x)), np.concatenate((head_y, ys, tail_y))
+
+    def view_x(self, x_min, x_max, n_out):
+        """Like view(), for an x-axis range (x must be increasing, e.g. time or frequency)."""
+        start = np.searchsorted(self.x, x_min, side='left')
+        end = np.searchsorted(self.x, x_max, side='right')
+        # One sample beyond each edge keeps the line running to the axes border
+        return self.view(max(0, start - 1), min(len(self.y), end + 1), n_out)
+
+
+def pyramid_for(key, y, x=None):
+    """Cached SignalPyramid for a signal/spectrum identified by key (e.g. its content hash)."""
+    with _pyramids_lock:
+        pyramid = _pyramids.get(key)
+        if pyramid is not None:
+            _pyramids.move_to_end(key)
+            return pyramid
+    pyramid = SignalPyramid(y, x)
+    with _pyramids_lock:
+        _pyramids[key] = pyramid
+        while len(_pyramids) > PYRAMID_CACHE_SIZE:
+            _pyramids.popitem(last=False)
+    return pyramid
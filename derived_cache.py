@@ -0,0 +1,100 @@
+import hashlib
+import json
+import numpy as np
+
+from signal_codec import (
+    encode_signal, decode_signal, to_signal_array, signal_sampling_rate, DEFAULT_SAMPLING_RATE
+)
+
+# Transform names stored in derived_results.transform
+FFT_MAGNITUDE = 'fft_magnitude'
+FFT_DENOISED_MAGNITUDE = 'fft_denoised_magnitude'
+WELCH_PSD = 'welch_psd'
+ECG_SUMMARY = 'ecg_summary'
+
+# data_analyzer.ecg_summary fields kept per signal
+ECG_SUMMARY_FIELDS = ('method', 'r_peaks', 'n_peaks', 'mean_hr_bpm', 'mean_rr_ms', 'sdnn_ms', 'rmssd_ms')
+
+
+def hash_signal(values, sampling_rate=DEFAULT_SAMPLING_RATE):
+    """
+    Content hash identifying a signal: samples (as float64, so BLOB and legacy text
+    copies of the same recording agree) plus the sampling rate.
+    """
+    digest = hashlib.sha256(np.ascontiguousarray(values, dtype='<f8').tobytes())
+    digest.update(str(float(sampling_rate)).encode())
+    return digest.hexdigest()
+
+
+def params_key(params=None):
+    """Canonical text form of transform parameters (stable key order)."""
+    return json.dumps(params or {}, sort_keys=True, separators=(',', ':'))
+
+
+def cached_spectrum(db, signal_hash, seg_start, seg_end, transform, params, compute,
+                    sampling_rate=DEFAULT_SAMPLING_RATE, patient_id=None, report_id=None):
+    """
+    Returns (array, hit). A hit is a single indexed read of derived_results; a miss
+    runs compute(), stores the float32 result and returns it.
+    Without a db or signal hash the result is simply computed.
+    """
+    key = (signal_hash, seg_start, seg_end, transform, params_key(params))
+    if db is not None and signal_hash:
+        blob = db.get_derived_result(*key)
+        if blob is not None:
+            return decode_signal(blob)[0], True
+
+    result = np.asarray(compute())
+    if db is not None and signal_hash:
+        db.save_derived_result(*key, encode_signal(result, sampling_rate=sampling_rate),
+                               patient_id=patient_id, report_id=report_id)
+    return result, False
+
+
+def encode_features(features):
+    """Serializes a feature dict (NumPy arrays/scalars become plain lists/numbers) for derived_results."""
+    return json.dumps({k: v.tolist() if isinstance(v, (np.ndarray, np.generic)) else v
+                       for k, v in features.items()}).encode()
+
+
+def decode_features(blob):
+    features = json.loads(bytes(blob).decode())
+    if 'r_peaks' in features:
+        features['r_peaks'] = np.asarray(features['r_peaks'], dtype=np.int64)
+    return features
+
+
+def split_cached_ecg_summaries(db, records, sampling_rate=DEFAULT_SAMPLING_RATE):
+    """
+    Partitions (patient_id, report_id, signal) records into ECG summaries already cached
+    in derived_results (as analyze_ecg_batch-style rows) and records still to analyze.
+    Returns (cached_rows, pending_records, signal_hashes by report_id).
+    """
+    cached_rows, pending, hashes = [], [], {}
+    for patient_id, report_id, raw_signal in records:
+        signal = to_signal_array(raw_signal)
+        if signal is None:
+            continue
+        rate = signal_sampling_rate(raw_signal, default=sampling_rate)
+        hashes[report_id] = hash_signal(signal, rate)
+        blob = db.get_derived_result(hashes[report_id], 0, len(signal), ECG_SUMMARY, params_key())
+        if blob is None:
+            pending.append((patient_id, report_id, raw_signal))
+            continue
+        row = {'patient_id': patient_id, 'report_id': report_id, 'n_samples': len(signal), 'sampling_rate': rate}
+        row.update(decode_features(blob))
+        row.update({'error': None, 'processing_ms': 0.0})
+        cached_rows.append(row)
+    return cached_rows, pending, hashes
+
+
+def store_ecg_summaries(db, results, hashes):
+    """Caches the successful rows of an analyze_ecg_batch result by signal hash."""
+    entries = []
+    for row in results.to_dict('records'):
+        if isinstance(row.get('error'), str) or row['report_id'] not in hashes:
+            continue
+        entries.append((hashes[row['report_id']], 0, int(row['n_samples']), ECG_SUMMARY, params_key(),
+                        encode_features({field: row[field] for field in ECG_SUMMARY_FIELDS}),
+                        row['patient_id'], row['report_id'], 'ECG', 0, None))
+    return db.save_derived_results(entries)
@@ -0,0 +1,203 @@
+import time
+import numpy as np
+import pandas as pd
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from signal_codec import DEFAULT_SAMPLING_RATE
+from lazy_imports import LazyModule
+
+sps = LazyModule('scipy.signal')
+
+
+class RingBuffer:
+    """Fixed-capacity circular sample buffer; memory stays constant however long the stream runs."""
+
+    def __init__(self, capacity, dtype=np.float32):
+        self.capacity = int(capacity)
+        self._data = np.zeros(self.capacity, dtype=dtype)
+        self._pos = 0
+        self.total = 0  # samples written since creation (absolute index of the next sample)
+
+    def extend(self, samples):
+        samples = np.asarray(samples, dtype=self._data.dtype)
+        self.total += len(samples)
+        samples = samples[-self.capacity:]
+        n = len(samples)
+        first = min(n, self.capacity - self._pos)
+        self._data[self._pos:self._pos + first] = samples[:first]
+        self._data[:n - first] = samples[first:]
+        self._pos = (self._pos + n) % self.capacity
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def latest(self, n=None):
+        """The newest n samples (default: all held), oldest first, as a contiguous copy."""
+        n = len(self) if n is None else min(n, len(self))
+        start = (self._pos - n) % self.capacity
+        if start + n <= self.capacity:
+            return self._data[start:start + n].copy()
+        return np.concatenate((self._data[start:], self._data[:self._pos]))
+
+
+class StreamingECGAnalyzer:
+    """
+    Incremental version of analyze_ecg_signal for live data: a stateful 0.5 Hz high-pass
+    plus powerline notch (the nk.ecg_clean steps) filters each chunk as it arrives, and
+    R-peaks are found with the same find_peaks rule (0.6 s refractory distance, height
+    above the window mean) over a sliding window of the cleaned signal.
+    Raw samples are also cut into fixed windows, released with their R-peaks for storage.
+    """
+
+    def __init__(self, sampling_rate=DEFAULT_SAMPLING_RATE, window_seconds=3.0, persist_seconds=10.0,
+                 powerline=50.0):
+        self.sampling_rate = float(sampling_rate)
+        self.min_distance = int(self.sampling_rate * 0.6)
+        # Peaks this close to the newest sample may still move, so they are confirmed later
+        self.guard = int(self.sampling_rate * 0.3)
+        # Beats are not reported while the high-pass filter is still settling
+        self.settle = int(self.sampling_rate * 0.5)
+
+        sos = sps.butter(5, 0.5, btype='highpass', fs=self.sampling_rate, output='sos')
+        if powerline < self.sampling_rate / 2:
+            sos = np.vstack((sos, sps.tf2sos(*sps.iirnotch(powerline, 30.0, fs=self.sampling_rate))))
+        self._sos = sos
+        self._zi = None
+
+        self.cleaned = RingBuffer(int(window_seconds * self.sampling_rate))
+        self.r_peaks = RingBuffer(64, dtype=np.int64)  # absolute sample indices of recent beats
+        self._last_peak = self.settle - self.min_distance
+
+        self.persist_samples = int(persist_seconds * self.sampling_rate)
+        self._window_chunks = []
+        self._window_start = 0
+        self._window_fill = 0
+        self._closed_windows = []  # (start, raw samples) waiting for their peaks to be confirmed
+        self._window_peaks = []
+
+    def process(self, samples):
+        """
+        Consumes one chunk of raw samples. Returns (new R-peak indices, completed windows);
+        each window is a dict with start_sample, samples, r_peaks (relative) and mean_hr_bpm.
+        """
+        samples = np.asarray(samples, dtype=np.float64)
+        if len(samples) == 0:
+            return np.empty(0, dtype=np.int64), []
+
+        # 1. Stateful filtering: chunk boundaries leave no edge artifacts
+        if self._zi is None:
+            self._zi = sps.sosfilt_zi(self._sos) * samples[0]
+        cleaned, self._zi = sps.sosfilt(self._sos, samples, zi=self._zi)
+        self.cleaned.extend(cleaned)
+
+        # 2. Peak search over the sliding window, keeping only newly confirmed beats.
+        # Waiting for a full window keeps the filter's settling transient from passing
+        # for a beat and gives the height threshold a representative mean.
+        if len(self.cleaned) < self.cleaned.capacity:
+            self._collect_raw(samples.astype(np.float32))
+            return np.empty(0, dtype=np.int64), []
+        window = self.cleaned.latest()
+        offset = self.cleaned.total - len(window)
+        peaks, _ = sps.find_peaks(window, distance=self.min_distance, height=np.mean(window))
+        peaks = peaks[peaks < len(window) - self.guard] + offset
+        new_peaks = []
+        for peak in peaks:
+            if peak >= self._last_peak + self.min_distance:
+                new_peaks.append(peak)
+                self._last_peak = peak
+        new_peaks = np.asarray(new_peaks, dtype=np.int64)
+        self.r_peaks.extend(new_peaks)
+        self._window_peaks.extend(new_peaks.tolist())
+
+        # 3. Cut raw samples into persistence windows
+        self._collect_raw(samples.astype(np.float32))
+        return new_peaks, self._release_windows()
+
+    def heart_rate(self, beats=10):
+        """Mean heart rate (bpm) over the last `beats` RR intervals, or NaN before two beats."""
+        recent = self.r_peaks.latest(beats + 1)
+        if len(recent) < 2:
+            return np.nan
+        return 60.0 * self.sampling_rate / np.mean(np.diff(recent))
+
+    def finish(self):
+        """Ends the stream: releases every remaining window, including the partial one."""
+        if self._window_fill:
+            self._closed_windows.append((self._window_start, np.concatenate(self._window_chunks)))
+            self._window_start += self._window_fill
+            self._window_chunks, self._window_fill = [], 0
+        return self._release_windows(confirmed_until=self._window_start)
+
+    def _collect_raw(self, samples):
+        while len(samples):
+            take = min(len(samples), self.persist_samples - self._window_fill)
+            self._window_chunks.append(samples[:take])
+            self._window_fill += take
+            samples = samples[take:]
+            if self._window_fill == self.persist_samples:
+                self._closed_windows.append((self._window_start, np.concatenate(self._window_chunks)))
+                self._window_start += self._window_fill
+                self._window_chunks, self._window_fill = [], 0
+
+    def _release_windows(self, confirmed_until=None):
+        # A window is final once every peak inside it is past the confirmation guard
+        if confirmed_until is None:
+            confirmed_until = self.cleaned.total - self.guard
+        released = []
+        while self._closed_windows:
+            start, raw = self._closed_windows[0]
+            end = start + len(raw)
+            if end > confirmed_until:
+                break
+            self._closed_windows.pop(0)
+            peaks = np.asarray([p for p in self._window_peaks if start <= p < end], dtype=np.int64)
+            self._window_peaks = [p for p in self._window_peaks if p >= end]
+            rr = np.diff(peaks)
+            released.append({
+                'start_sample': start,
+                'samples': raw,
+                'r_peaks': peaks - start,
+                'mean_hr_bpm': 60.0 * self.sampling_rate / rr.mean() if len(rr) else np.nan,
+            })
+        return released
+
+
+class EcgReplayThread(QThread):
+    """
+    Replays a recorded ECG (e.g. ecg_1d_timeseries_prediction.csv, ';'-separated
+    time/ecg_value columns) in real time, emitting small sample chunks like a live monitor.
+    """
+    samples_ready = pyqtSignal(object)
+
+    def __init__(self, csv_path, sampling_rate=DEFAULT_SAMPLING_RATE, chunk_ms=20, loop=True):
+        super().__init__()
+        self.csv_path = csv_path
+        self.sampling_rate = sampling_rate
+        self.chunk_ms = chunk_ms
+        self.loop = loop
+
+    def stop(self):
+        self.requestInterruption()
+
+    def run(self):
+        try:
+            data = pd.read_csv(self.csv_path, sep=';')
+            values = data['ecg_value'].to_numpy(dtype=np.float32)
+        except Exception as e:
+            print(f"ECG replay could not read {self.csv_path}: {e}")
+            return
+
+        chunk = max(1, int(self.sampling_rate * self.chunk_ms / 1000))
+        start_time = time.perf_counter()
+        sent = 0
+        while not self.isInterruptionRequested():
+            position = sent % len(values)
+            if not self.loop and sent >= len(values):
+                break
+            block = values[position:position + chunk]
+            self.samples_ready.emit(block)
+            sent += len(block)
+            # Pace against the wall clock so the stream never drifts from real time
+            delay = start_time + sent / self.sampling_rate - time.perf_counter()
+            if delay > 0:
+                self.msleep(int(delay * 1000))
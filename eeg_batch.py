@@ -0,0 +1,39 @@
+# Nightly cohort EEG analysis: delta/theta/alpha/beta/gamma band power for every stored EEG.
+# Usage: python eeg_batch.py [path/to/health_metrics.db] [--workers N] [--sampling-rate HZ]
+# Results are written to the eeg_features table, one row per report.
+import argparse
+import os
+import time
+from database_manager import DatabaseManager
+from data_analyzer import analyze_eeg_batch
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch EEG band-power analysis over every stored EEG signal.")
+    parser.add_argument("db_path", nargs="?", default=os.path.join(os.path.dirname(__file__), "health_metrics.db"))
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--sampling-rate", type=float, default=1000.0,
+                        help="rate for signals without one in their header (Hz)")
+    parser.add_argument("--batch-size", type=int, default=2000, help="reports loaded per batch")
+    args = parser.parse_args()
+
+    db = DatabaseManager(db_name=args.db_path)
+    start = time.perf_counter()
+    processed = saved = failed = 0
+    cpu_ms = 0.0
+
+    for records in db.iter_signal_records('EEG_Signal', batch_size=args.batch_size):
+        results = analyze_eeg_batch(records, sampling_rate=args.sampling_rate, max_workers=args.workers)
+        if results.empty:
+            continue
+        saved += db.save_eeg_features(results)
+        processed += len(results)
+        failed += int(results['error'].notna().sum())
+        cpu_ms += results['processing_ms'].sum()
+
+    elapsed = time.perf_counter() - start
+    db.close_connection()
+
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    parallelism = (cpu_ms / 1000.0) / elapsed if elapsed > 0 else 0.0
+    print(f"Analyzed {processed} EEGs in {elapsed:.2f}s ({rate:,.1f} records/sec, "
+          f"{parallelism:.1f} cores busy). Saved {saved}, failed {failed}.")
@@ -1,33 +1,57 @@
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QPushButton, QComboBox, QTabWidget, QFileDialog, QTableWidget,
-    QTableWidgetItem, QScrollArea, QSlider, QLineEdit, QCheckBox,
+    QPushButton, QComboBox, QTabWidget, QFileDialog, QTableView,
+    QScrollArea, QSlider, QLineEdit, QCheckBox,
     QSpinBox, QMessageBox, QGridLayout, QInputDialog, QDoubleSpinBox,
     QFrame, QGroupBox, QHeaderView
 )
 
 from PyQt5.QtGui import QImage, QPixmap
-from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtCore import Qt, QSize, QTimer
 from PyQt5.QtWidgets import QDateTimeEdit
 from PyQt5.QtCore import QDateTime
-import matplotlib
-matplotlib.use('Qt5Agg')
 
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-
-from data_analyzer import fft_denoise_signal, analyze_ecg_signal, analyze_eeg_signal
+from data_analyzer import (
+    fft_denoise_signal, analyze_ecg_signal, analyze_eeg_signal, linear_fit_with_ci, linear_fit_from_moments,
+    iqr_outlier_mask, EEG_BAND_NAMES
+)
+from signal_codec import to_signal_array, signal_length, signal_sampling_rate, is_chunked_signal
+from insert_thread import CsvImportThread
+from table_model import PatientTableModel, STATUS_COLUMNS
+from task_runner import TaskRunner, TaskWarning
+from database_manager import SIGNAL_OVERVIEW_BLOCK, NUMERIC_METRIC_COLUMNS
+from cohort_series import DEFAULT_BAND_FREQ
+from derived_cache import hash_signal, cached_spectrum, FFT_MAGNITUDE, FFT_DENOISED_MAGNITUDE, WELCH_PSD
+from decimation import pyramid_for, target_points
+from ecg_stream import RingBuffer, StreamingECGAnalyzer, EcgReplayThread
+from spectral_analysis import (
+    welch_psd, welch_frequencies, stft_spectrogram, band_powers, default_nperseg, EEG_BANDS, ECG_BANDS
+)
+from lazy_imports import LazyModule, load_module
 
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 import numpy as np
-import cv2
 import os
+import time
+
+# Loaded with the first image / seaborn plot instead of at startup
+cv2 = LazyModule('cv2')
+sns = LazyModule('seaborn')
+
+# Spectrum methods offered in the Signal Analysis panel
+SPECTRAL_FFT = "FFT (single window)"
+SPECTRAL_WELCH = "Welch PSD"
+SPECTRAL_STFT = "Spectrogram (STFT)"
+
+# Live monitor: replayed recording, visible history and DB flush period
+LIVE_REPLAY_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ecg_1d_timeseries_prediction.csv")
+LIVE_SAMPLING_RATE = 1000.0
+LIVE_DISPLAY_SECONDS = 5
+LIVE_FRAME_MS = 33
+LIVE_FLUSH_MS = 5000
 
 class DatabaseManager:
     def __init__(self): pass
-    def get_patient_data(self): return pd.DataFrame()
     def insert_patient_data(self, df): pass
     def update_patient_data(self, patient_id, **kwargs): pass
     def delete_patient_data(self, patient_id): pass
@@ -39,10 +63,17 @@ class HealthcareApp(QMainWindow):
         self.df = df
         self.db_manager = db_manager
         self.current_page = 0
-        self.rows_per_page = 50
+        self.rows_per_page = 1000
+        # Keyset pager state: None (first page) or ('after'|'before', (Date_Recorded, report_id))
+        self.page_anchor = None
+        self.page_cursors = {}
         self.filtered_df = df.copy()
         self.cv_image = None
         self.processed_cv_image = None
+        # DB queries and heavy compute run here; handlers only validate input and render
+        self.tasks = TaskRunner(parent=self)
+        # Full x-range of each axes' decimated line (for "reset view")
+        self.decimated_extents = {}
 
         self.setWindowTitle("Healthcare Data and Medical Image Processing Tool")
         self.setGeometry(50, 50, 1400, 800)
@@ -64,10 +95,16 @@ class HealthcareApp(QMainWindow):
         self.stacked_widget.tabBar().setVisible(False) 
 
         self.stacked_widget.addTab(self.create_data_management_panel(), "Data Loading and Management")
-        self.stacked_widget.addTab(self.create_analysis_panel(), "Health Data Analysis")
-        self.stacked_widget.addTab(self.create_spectrum_panel(), "Signal Analysis")
-        self.stacked_widget.addTab(self.create_image_processing_panel(), "Medical Image Processing")
-        self.stacked_widget.addTab(self.create_data_visualization_panel(), "Data Visualization")
+        # The other panels (and matplotlib/cv2 with them) are built on first navigation
+        self.panel_builders = {}
+        for builder, title in ((self.create_analysis_panel, "Health Data Analysis"),
+                               (self.create_spectrum_panel, "Signal Analysis"),
+                               (self.create_image_processing_panel, "Medical Image Processing"),
+                               (self.create_data_visualization_panel, "Data Visualization")):
+            placeholder = QWidget()
+            QVBoxLayout(placeholder).setContentsMargins(0, 0, 0, 0)
+            self.panel_builders[self.stacked_widget.addTab(placeholder, title)] = builder
+        self.stacked_widget.currentChanged.connect(self.ensure_panel)
 
         tab_names = ["Patient Data Management", "Health Data Analysis", "Signal Analysis",
                      "Image Processing", "Data Visualization"]
@@ -91,6 +128,24 @@ class HealthcareApp(QMainWindow):
         else:
             self.populate_table(self.df.head(self.rows_per_page))
 
+    def ensure_panel(self, index):
+        """Builds a lazily created panel into its placeholder tab the first time it is shown."""
+        builder = self.panel_builders.pop(index, None)
+        if builder is None:
+            return
+        start = time.perf_counter()
+        self.stacked_widget.widget(index).layout().addWidget(builder())
+        # The dropdowns were last refreshed before this panel existed
+        self._update_analysis_dropdowns()
+        self._update_viz_dropdowns()
+        print(f"Built panel '{self.stacked_widget.tabText(index)}' in {time.perf_counter() - start:.2f} s")
+
+    def _new_figure_canvas(self, figsize):
+        """Figure and Qt canvas for a panel; matplotlib loads with the first panel that plots."""
+        load_module('matplotlib').use('Qt5Agg')
+        figure = load_module('matplotlib.figure').Figure(figsize=figsize)
+        return figure, load_module('matplotlib.backends.backend_qt5agg').FigureCanvasQTAgg(figure)
+
     def _setup_menu_bar(self):
         menu_bar = self.menuBar()
 
@@ -112,93 +167,51 @@ class HealthcareApp(QMainWindow):
         help_menu.addAction("Documentation").setToolTip("View detailed tool documentation.")
         help_menu.addAction("Report Issue").setToolTip("Provide feedback or report a bug.")
         
-    def populate_table(self, df):
-        if not hasattr(self, 'table_widget'):
-            return
-
-        self.table_widget.setRowCount(0) 
-        self.table_widget.clearContents()
+    def _run_task(self, key, compute, render, error_title, error_text, *args, on_error=None):
+        """
+        Runs compute(token, *args) on the worker pool and render(result) on the UI thread.
+        Tasks sharing a key coalesce, so only the newest request is rendered.
+        """
+        def show_error(error):
+            if on_error is not None:
+                on_error(error)
+            elif isinstance(error, TaskWarning):
+                QMessageBox.warning(self, error.title, str(error))
+            else:
+                QMessageBox.critical(self, error_title, f"{error_text}: {error}")
 
-        if df is None or df.empty:
-            self.table_widget.setColumnCount(0)
-            return
+        def show_result(result):
+            try:
+                render(result)
+            except Exception as e:
+                show_error(e)
 
-        # Columns to exclude from the dataset view to keep it clean
-        columns_to_exclude = [
-            'Sleep_Hours', 'Sleep Hours',
-            'Triglyceride_Level', 'Triglyceride Level',
-            'CRP_Level', 'CRP Level',
-            'Homocysteine_Level', 'Homocysteine Level'
-        ]
-        
-        display_df = df.drop(columns=[col for col in columns_to_exclude if col in df.columns], errors='ignore')
+        return self.tasks.submit(key, compute, show_result, show_error, *args)
 
-        self.table_widget.setRowCount(len(display_df))
-        self.table_widget.setColumnCount(len(display_df.columns))
-        self.table_widget.setHorizontalHeaderLabels(display_df.columns)
+    def closeEvent(self, event):
+        # Stop the live stream first; its last windows are written before the tasks are cancelled
+        self.stop_live_stream(sync=True)
+        # Let running tasks (and queued writes) finish before the DB connections go away
+        self.tasks.cancel_all()
+        if self.tasks.wait(3000) and self.db_manager:
+            self.db_manager.close_thread_connections()
+        super().closeEvent(event)
 
-        for i in range(len(display_df)):
-            for j, col in enumerate(display_df.columns):
-                val = display_df.iloc[i, j]
-                val_str = str(val).strip() if val is not None else ""
-                
-                if col in ['ECG_Signal', 'ECG Signal']:
-                    if "," in val_str:
-                        points = len(val_str.split(','))
-                        first_num = val_str.split(',')[0]
-                        display_text = f"{points} pts [{first_num}...]"
-                    else:
-                        display_text = "No Signal"
-                
-                elif col in ['Image_Data', 'Image Data', 'Original_Image_Data']:
-                    val_str = str(val).strip()
-                    
-                    if val_str in ["Original Image Saved", "Processed Image Saved", "No Image"]:
-                        display_text = val_str
-                    
-                    elif val_str not in ["", "None", "nan", "NULL"]:
-                        display_text = "Image Stored"
-                    
-                    else:
-                        display_text = "No Image"
-
-                elif col == 'ECG_FFT_Magnitude':
-                    if "," in val_str and len(val_str) > 10:
-                        display_text = "FFT Computed"
-                    else:
-                        display_text = "No FFT Data"
+    def populate_table(self, df):
+        if not hasattr(self, 'table_view'):
+            return
 
-                elif col == 'Correlation_Data':
-                    if val_str and val_str.lower() != "nan" and val_str != "None":
-                        display_text = val_str
-                    else:
-                        display_text = "N/A"
-                
-                else:
-                    display_text = val_str
+        # The model formats cells lazily; only the visible rows are ever rendered
+        self.table_model.set_dataframe(df)
 
-                item = QTableWidgetItem(display_text)
-                
-                center_cols = [
-                    'ECG_Signal', 'ECG Signal', 
-                    'Image_Data', 'Image Data', 
-                    'ECG_FFT_Magnitude', 
-                    'Correlation_Data'
-                ]
-                if col in center_cols:
-                    item.setTextAlignment(Qt.AlignCenter)
-                
-                self.table_widget.setItem(i, j, item)
-
-        header = self.table_widget.horizontalHeader()
-        for i, col_name in enumerate(display_df.columns):
-            status_keywords = ["Signal", "Image", "FFT", "Correlation"]
-            if any(key in col_name for key in status_keywords):
-                self.table_widget.setColumnWidth(i, 150)
+        header = self.table_view.horizontalHeader()
+        for i in range(self.table_model.columnCount()):
+            if self.table_model.headerData(i, Qt.Horizontal) in STATUS_COLUMNS:
+                self.table_view.setColumnWidth(i, 150)
             else:
-                header.setSectionResizeMode(i, QHeaderView.ResizeToContents)
+                self.table_view.resizeColumnToContents(i)
         
-        self.table_widget.setToolTip(
+        self.table_view.setToolTip(
             "Scrollable view of the loaded dataset.\n"
             "Status labels are shown for Signals, Images, and FFT.\n"
             "Actual results are shown for Correlation analysis."
@@ -220,8 +233,15 @@ class HealthcareApp(QMainWindow):
         self.load_csv_btn.setObjectName("LoadCSVButton")
         self.load_csv_btn.setToolTip("Browse and load data from a local CSV file.")
         self.load_csv_btn.clicked.connect(self.load_csv)
+
+        self.cancel_import_btn = QPushButton("Cancel Import")
+        self.cancel_import_btn.setObjectName("CancelImportButton")
+        self.cancel_import_btn.setToolTip("Stop the running import after the current chunk is committed.")
+        self.cancel_import_btn.setEnabled(False)
+        self.cancel_import_btn.clicked.connect(self.cancel_csv_import)
         
         source_layout.addWidget(self.load_csv_btn)
+        source_layout.addWidget(self.cancel_import_btn)
         source_layout.addStretch()
         layout.addWidget(source_group)
 
@@ -366,9 +386,17 @@ class HealthcareApp(QMainWindow):
         layout.addWidget(db_ops_group)
 
         layout.addWidget(QLabel("Loaded Dataset / Database View:"))
-        self.table_widget = QTableWidget()
-        self.table_widget.setMinimumHeight(450)
-        layout.addWidget(self.table_widget)
+        self.table_model = PatientTableModel(self)
+        self.table_view = QTableView()
+        self.table_view.setModel(self.table_model)
+        self.table_view.setMinimumHeight(450)
+        self.table_view.setWordWrap(False)
+        # Fixed row heights let the view skip measuring rows while scrolling
+        self.table_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table_view.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        # Size columns from a sample of rows rather than every loaded row
+        self.table_view.horizontalHeader().setResizeContentsPrecision(100)
+        layout.addWidget(self.table_view)
         self.populate_table(self.df) 
         self.status_label = QLabel("Ready.")
         layout.addWidget(self.status_label)
@@ -403,19 +431,49 @@ class HealthcareApp(QMainWindow):
         file_path, _ = QFileDialog.getOpenFileName(self, "Select CSV", "", "CSV Files (*.csv)")
         if file_path:
             try:
-                new_df = pd.read_csv(file_path)
-                
                 if self.db_manager:
-                    self.db_manager.insert_patient_data(new_df)
-                    self.current_page = 0
-                    self.db_retrieve_data() # This refreshes the table view (canvas)
-                    QMessageBox.information(self, "Success", f"Data from {os.path.basename(file_path)} saved and table updated.")
+                    # Stream the file into the DB in the background, one transaction per chunk
+                    self.import_thread = CsvImportThread(self.db_manager.db_name, file_path)
+                    self.import_thread.progress.connect(self._on_csv_import_progress)
+                    self.import_thread.finished_import.connect(
+                        lambda stats, name=os.path.basename(file_path): self._on_csv_import_finished(stats, name)
+                    )
+                    self.load_csv_btn.setEnabled(False)
+                    self.cancel_import_btn.setEnabled(True)
+                    self.status_label.setText(f"Importing {os.path.basename(file_path)}...")
+                    self.import_thread.start()
                 else:
+                    new_df = pd.read_csv(file_path)
                     self.df = new_df
                     self.populate_table(self.df)
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to load: {e}")
 
+    def cancel_csv_import(self):
+        if getattr(self, 'import_thread', None) is not None and self.import_thread.isRunning():
+            self.import_thread.cancel()
+            self.cancel_import_btn.setEnabled(False)
+            self.status_label.setText("Cancelling import after the current chunk...")
+
+    def _on_csv_import_progress(self, stats):
+        percent = 100.0 * stats['bytes'] / stats['total_bytes'] if stats['total_bytes'] else 0.0
+        self.status_label.setText(
+            f"Importing: {stats['rows']:,} rows ({percent:.0f}%) at {stats['rows_per_sec']:,.0f} rows/sec"
+        )
+
+    def _on_csv_import_finished(self, stats, file_name):
+        self.load_csv_btn.setEnabled(True)
+        self.cancel_import_btn.setEnabled(False)
+        self.current_page = 0
+        self.db_retrieve_data() # This refreshes the table view (canvas)
+
+        if stats['error']:
+            QMessageBox.critical(self, "Error", f"Import of {file_name} stopped after {stats['rows']:,} rows: {stats['error']}")
+        elif stats['cancelled']:
+            QMessageBox.information(self, "Import Cancelled", f"Import of {file_name} cancelled after {stats['rows']:,} rows.")
+        else:
+            QMessageBox.information(self, "Success", f"Data from {file_name} saved and table updated ({stats['rows']:,} rows).")
+
     def _update_analysis_dropdowns(self):
         """Refreshes the dropdown menus while filtering out non-analytical columns like Patient ID."""
         if self.df is None or self.df.empty:
@@ -538,33 +596,27 @@ class HealthcareApp(QMainWindow):
     def db_retrieve_data(self):
         if not self._check_db_manager(): return
         try:
-            offset = self.current_page * self.rows_per_page
-            
-            # 1. Fetch fresh data from DB (actual BLOB data is retrieved here)
-            retrieved_df = self.db_manager.get_patient_data(limit=self.rows_per_page, offset=offset) 
+            if self.current_page == 0:
+                self.page_anchor = None
+
+            # 1. Fetch fresh data from DB (image columns hold content-hash references, not pixels)
+            # Pages are seeked from the anchor key, so deep pages cost the same as page 1.
+            direction, key = self.page_anchor or ('after', None)
+            retrieved_df, self.page_cursors = self.db_manager.get_patient_page(
+                **{direction: key}, limit=self.rows_per_page
+            )
+            if retrieved_df.empty and self.current_page > 0:
+                # The anchored page was deleted out from under us; start over
+                self.current_page = 0
+                return self.db_retrieve_data()
             
             # 2. Update internal data states
             self.df = retrieved_df.copy()
             self.filtered_df = self.df.copy()
             
-            # 3. Create a DISPLAY version of the DataFrame for the table UI
-            # We use a copy so we don't destroy the actual image bytes in self.df
-            display_df = self.df.copy()
-
-            # Mask 'Original_Image_Data' column with friendly text
-    # Friendly text for Images (Matches your request)
-            if 'Original_Image_Data' in display_df.columns:
-                display_df['Original_Image_Data'] = display_df['Original_Image_Data'].apply(
-                    lambda x: "Original Image Saved" if x is not None and str(x).strip() not in ["", "None", "nan"] else "No Image"
-                )
-            
-            if 'Image_Data' in display_df.columns:
-                display_df['Image_Data'] = display_df['Image_Data'].apply(
-                    lambda x: "Processed Image Saved" if x is not None and str(x).strip() not in ["", "None", "nan"] else "No Image"
-                )
-
-            # 4. Clear and Re-populate the table widget using the MASKED data
-            self.populate_table(display_df)
+            # 3. Hand the page to the table model; image/signal status labels are
+            # computed by the model, so self.df keeps the raw references
+            self.populate_table(self.df)
             
             # Update UI components
             self._update_viz_dropdowns()
@@ -575,8 +627,8 @@ class HealthcareApp(QMainWindow):
             total_pages = (total_records // self.rows_per_page) + (1 if total_records % self.rows_per_page > 0 else 0)
             self.page_label.setText(f"Page {self.current_page + 1} of {max(1, total_pages)}")
             
-            self.prev_btn.setEnabled(self.current_page > 0)
-            self.next_btn.setEnabled(offset + len(retrieved_df) < total_records)
+            self.prev_btn.setEnabled(self.current_page > 0 and self.page_cursors['has_prev'])
+            self.next_btn.setEnabled(self.page_cursors['has_next'])
             
             self.status_label.setText(f"Table Refreshed: Showing {len(retrieved_df)} records.")
             
@@ -624,7 +676,7 @@ class HealthcareApp(QMainWindow):
                 "EEG_Signal": self.eeg_input.text().strip(),
                 "Date_Recorded": record_date,
                 "Image_Data": image_blob ,
-                "Original_Image_Data": image_blob # This maps to the BLOB column
+                "Original_Image_Data": image_blob # Deduplicated against Image_Data in the image store
             }
 
             # 5. Insert via specialized manual record method
@@ -824,8 +876,18 @@ class HealthcareApp(QMainWindow):
         self.ts_analysis_column.setObjectName("AnalysisTSCombo")
         self.ts_raw_checkbox = QCheckBox("Show Raw")
         self.ts_raw_checkbox.setChecked(True)
+        self.ma_window = QSpinBox()
+        self.ma_window.setRange(2, 30)
+        self.ma_window.setValue(5)
+        self.ma_window.setPrefix("MA window: ")
+        self.ma_btn = QPushButton("Plot Trend")
+        self.ma_btn.setObjectName("AnalysisTrendButton")
+        self.ma_btn.setToolTip("Moving-average trend of the selected patient over the cohort's percentile bands.")
+        self.ma_btn.clicked.connect(self.run_ma)
         ts_controls.addWidget(self.ts_analysis_column)
         ts_controls.addWidget(self.ts_raw_checkbox)
+        ts_controls.addWidget(self.ma_window)
+        ts_controls.addWidget(self.ma_btn)
         filtering_group.addLayout(ts_controls)
         
         self.apply_filter_btn = QPushButton("Apply & Plot")
@@ -880,8 +942,7 @@ class HealthcareApp(QMainWindow):
         main_layout.addLayout(controls_group)
 
         # Updated: Reduce height of the canvas and its container
-        self.analysis_figure = Figure(figsize=(10, 6))
-        self.analysis_canvas = FigureCanvas(self.analysis_figure)
+        self.analysis_figure, self.analysis_canvas = self._new_figure_canvas((10, 6))
         self.analysis_canvas.setFixedHeight(500) 
 
         analysis_scroll = QScrollArea()
@@ -912,9 +973,11 @@ class HealthcareApp(QMainWindow):
         if selected_id and hasattr(self, 'current_patient_analysis_df') and not self.current_patient_analysis_df.empty:
             target_df = self.current_patient_analysis_df.copy()
             patient_title = f" (Patient: {selected_id})"
+            cohort_fences = False
         elif self.df is not None and not self.df.empty:
             target_df = self.df.copy()
             patient_title = " (Global Dataset)"
+            cohort_fences = True
         else:
             QMessageBox.warning(self, "No Data", "Please select a patient or load data.")
             return
@@ -928,104 +991,84 @@ class HealthcareApp(QMainWindow):
                 QMessageBox.warning(self, "Column Error", f"Column '{col}' not found in data.")
                 return
 
-        try:
-            target_df[col] = pd.to_numeric(target_df[col], errors='coerce')
-            target_df = target_df.dropna(subset=[col])
-            
-            factor = self.outlier_slider.value() / 10.0
-            Q1 = target_df[col].quantile(0.25)
-            Q3 = target_df[col].quantile(0.75)
-            IQR = Q3 - Q1
-            
-            lower_bound = Q1 - (factor * IQR)
-            upper_bound = Q3 + (factor * IQR)
-            
-            self.filtered_df = target_df[
-                (target_df[col] >= lower_bound) & 
-                (target_df[col] <= upper_bound)
-            ].copy()
-            self.analysis_ax.clear()
-            
-            if hasattr(self, 'ts_raw_checkbox') and self.ts_raw_checkbox.isChecked():
-                self.analysis_ax.plot(
-                    target_df[col].values, 
-                    color='#BDC3C7', 
-                    alpha=0.4, 
-                    label='Full History (Raw)', 
-                    marker='o', 
-                    markersize=3,
-                    linewidth=1
-                )
-            
-            if not self.filtered_df.empty:
-                self.analysis_ax.plot(
-                    self.filtered_df[col].values, 
-                    color='#3498DB', 
-                    linewidth=2.0, 
-                    label=f'Filtered Data (IQR factor: {factor})',
-                    marker='s',
-                    markersize=4
-                )
-            
-            self.analysis_ax.set_title(f"Health Trend: {col.replace('_', ' ')}{patient_title}")
-            self.analysis_ax.set_xlabel("Record Index (Chronological)")
-            self.analysis_ax.set_ylabel(col.replace('_', ' '))
-            self.analysis_ax.legend(loc='upper right')
-            self.analysis_ax.grid(True, linestyle='--', alpha=0.5)
-            
-            self.analysis_canvas.draw_idle()
-            
-            removed = len(target_df) - len(self.filtered_df)
-            status_msg = f"Displaying {len(self.filtered_df)} records. Outliers removed: {removed}"
-            self.analysis_status_label.setText(status_msg)
-
-        except Exception as e:
-            QMessageBox.critical(self, "Analysis Error", f"An error occurred during computation: {str(e)}")
+        factor = self.outlier_slider.value() / 10.0
+        # Shares the analysis canvas with the correlation plots, so it shares their key too
+        self._run_task('analysis_plot', self._compute_iqr_filter, self._render_iqr_filter,
+                       "Analysis Error", "An error occurred during computation",
+                       target_df, col, factor, patient_title, cohort_fences)
 
-    def get_iqr_filtered_df(self):
-        if self.df is None or self.df.empty:
-            return pd.DataFrame()
+    def _compute_iqr_filter(self, token, target_df, col, factor, patient_title, cohort_fences=False):
+        """Background step: drops rows outside the IQR fence for the trend plot."""
+        target_df[col] = pd.to_numeric(target_df[col], errors='coerce')
+        target_df = target_df.dropna(subset=[col])
+        
+        quartiles = None
+        if cohort_fences and col in NUMERIC_METRIC_COLUMNS:
+            # Cohort quartiles from the metric's quantile sketch: no rescan per slider step
+            quartiles = self.db_manager.for_thread().get_metric_quantiles([col])[col][:, None]
+        
+        filtered_df = target_df[iqr_outlier_mask(target_df[col].to_numpy(dtype=np.float64), factor,
+                                                 quartiles=quartiles)].copy()
+        return target_df, filtered_df, col, factor, patient_title
 
-        factor = self.iqr_slider.value() / 10.0
+    def _render_iqr_filter(self, result):
+        target_df, self.filtered_df, col, factor, patient_title = result
+        self.analysis_ax.clear()
         
-        numeric_df = self.df.select_dtypes(include=[np.number]).copy()
+        if hasattr(self, 'ts_raw_checkbox') and self.ts_raw_checkbox.isChecked():
+            self.analysis_ax.plot(
+                target_df[col].values, 
+                color='#BDC3C7', 
+                alpha=0.4, 
+                label='Full History (Raw)', 
+                marker='o', 
+                markersize=3,
+                linewidth=1
+            )
         
-        filtered = numeric_df.copy()
-        for col in numeric_df.columns:
-            if any(id_name in col.lower() for id_name in ['id', 'report']):
-                continue
-                
-            q1 = numeric_df[col].quantile(0.25)
-            q3 = numeric_df[col].quantile(0.75)
-            iqr = q3 - q1
-            
-            lower = q1 - (factor * iqr)
-            upper = q3 + (factor * iqr)
-            
-            # Keep rows within bounds for this specific column
-            filtered = filtered[(filtered[col] >= lower) & (filtered[col] <= upper)]
-            
-        return filtered    
-            
+        if not self.filtered_df.empty:
+            self.analysis_ax.plot(
+                self.filtered_df[col].values, 
+                color='#3498DB', 
+                linewidth=2.0, 
+                label=f'Filtered Data (IQR factor: {factor})',
+                marker='s',
+                markersize=4
+            )
+        
+        self.analysis_ax.set_title(f"Health Trend: {col.replace('_', ' ')}{patient_title}")
+        self.analysis_ax.set_xlabel("Record Index (Chronological)")
+        self.analysis_ax.set_ylabel(col.replace('_', ' '))
+        self.analysis_ax.legend(loc='upper right')
+        self.analysis_ax.grid(True, linestyle='--', alpha=0.5)
+        
+        self.analysis_canvas.draw_idle()
+        
+        removed = len(target_df) - len(self.filtered_df)
+        status_msg = f"Displaying {len(self.filtered_df)} records. Outliers removed: {removed}"
+        self.analysis_status_label.setText(status_msg)
+
     def update_analysis_for_patient(self):
         selected_id = self.analysis_patient_id.currentText().strip()
         if not selected_id or not selected_id.isdigit():
             return
+        self._run_task('analysis_patient', self._load_analysis_patient, self._render_analysis_patient,
+                       "Analysis Error", "Failed to load patient records", int(selected_id),
+                       on_error=lambda e: print(f"Error updating analysis for patient: {e}"))
+
+    def _load_analysis_patient(self, token, patient_id):
+        return patient_id, self.db_manager.for_thread().get_all_records_for_patient(patient_id)
+
+    def _render_analysis_patient(self, result):
+        patient_id, patient_history = result
+        if patient_history.empty:
+            self.analysis_status_label.setText(f"No records found for Patient {patient_id}")
+            self.current_patient_analysis_df = pd.DataFrame()
+            return
 
-        try:
-            patient_history = self.db_manager.get_all_records_for_patient(int(selected_id))
-            
-            if patient_history.empty:
-                self.analysis_status_label.setText(f"No records found for Patient {selected_id}")
-                self.current_patient_analysis_df = pd.DataFrame() 
-                return
+        self.current_patient_analysis_df = patient_history
+        self.analysis_status_label.setText(f"Loaded {len(patient_history)} records for Patient {patient_id}")
 
-            self.current_patient_analysis_df = patient_history
-            self.analysis_status_label.setText(f"Loaded {len(patient_history)} records for Patient {selected_id}")
-            
-        except Exception as e:
-            print(f"Error updating analysis for patient: {e}")    
-    
     def save_fft_logic(self, fft_magnitudes):
         patient_id = self.spectrum_patient_id.currentText().strip()
         
@@ -1033,13 +1076,19 @@ class HealthcareApp(QMainWindow):
             QMessageBox.warning(self, "Save Error", "Please enter a valid Patient ID first.")
             return
 
-        fft_string = ",".join(map(str, fft_magnitudes))
-        
         if self.db_manager:
-            success = self.db_manager.save_new_fft_record(int(patient_id), fft_string)
+            # Mark the cached spectrum of the current segment as history instead of copying it
+            signal_hash, start, end = getattr(self, 'current_fft_key', None) or (None, 0, None)
+            source = getattr(self, 'current_signal_source', (None, 'ECG_Signal', None))
+            success = self.db_manager.save_new_fft_record(
+                int(patient_id), fft_magnitudes,
+                signal_type='EEG' if str(source[1]).startswith('EEG') else 'ECG',
+                sampling_rate=getattr(self, 'current_sampling_rate', 1000.0),
+                signal_hash=signal_hash, seg_start=start, seg_end=end
+            )
             
             if success:
-                QMessageBox.information(self, "Success", "FFT record saved successfully as a new entry!")
+                QMessageBox.information(self, "Success", "FFT saved to the patient's FFT history.")
                 if hasattr(self, 'load_patient_fft_list'):
                     self.load_patient_fft_list() 
             else:
@@ -1093,78 +1142,113 @@ class HealthcareApp(QMainWindow):
             return
 
         selected_id = self.analysis_patient_id.currentText().strip()
-        
+        factor = self.outlier_slider.value() / 10.0 if hasattr(self, 'outlier_slider') else None
+        save_to_db = hasattr(self, 'save_corr_db_radio') and self.save_corr_db_radio.isChecked()
+
+        # Latest request wins, so dragging the outlier slider only renders the final value
+        source_df = self._analysis_source_snapshot(selected_id, [col1, col2])
+        self._run_task('analysis_plot', self._compute_correlation, self._render_correlation,
+                       "Error", "Correlation analysis failed",
+                       col1, col2, selected_id, source_df, factor)
+
+        # The save has its own key: the trend plot shares 'analysis_plot' and would cancel it
+        if save_to_db:
+            if not selected_id.isdigit():
+                QMessageBox.warning(self, "Selection Required", "Select a Patient ID to save.")
+                return
+            self._run_task('analysis_correlation_save', self._save_correlation, self._render_correlation_save,
+                           "Database Error", "Failed to save the correlation",
+                           col1, col2, selected_id, source_df, factor)
+
+    def _analysis_source_snapshot(self, selected_id, columns):
+        """Copy of the selected on-screen columns for global analysis, so workers never touch self.df."""
         if selected_id:
-            working_df = self.db_manager.get_all_records_for_patient(selected_id)
+            return None
+        source = self.filtered_df if (self.filtered_df is not None and not self.filtered_df.empty) else self.df
+        return source[list(dict.fromkeys(columns))].copy()
+
+    def _load_analysis_scope(self, selected_id, source_df):
+        """Background helper: patient history from the DB, or the global snapshot."""
+        if selected_id:
+            source_df = self.db_manager.for_thread().get_all_records_for_patient(selected_id)
             analysis_scope = f"Patient {selected_id}"
         else:
-            working_df = self.filtered_df if (self.filtered_df is not None and not self.filtered_df.empty) else self.df
             analysis_scope = "Global Dataset"
 
-        if working_df is None or working_df.empty:
-            QMessageBox.warning(self, "No Data", f"No records found in database for {analysis_scope}.")
-            return
+        if source_df is None or source_df.empty:
+            raise TaskWarning("No Data", f"No records found in database for {analysis_scope}.")
+        return source_df, analysis_scope
+
+    def _compute_correlation(self, token, col1, col2, selected_id, source_df, factor):
+        """Background step: outlier filtering, Pearson r and trend line."""
+        working_df, analysis_scope = self._load_analysis_scope(selected_id, source_df)
+        token.raise_if_cancelled()
+
+        working_df[col1] = pd.to_numeric(working_df[col1], errors='coerce')
+        working_df[col2] = pd.to_numeric(working_df[col2], errors='coerce')
+        valid_data = working_df[[col1, col2]].dropna().copy()
+        
+        if len(valid_data) < 2:
+            raise TaskWarning("Insufficient Data",
+                              f"{analysis_scope} has {len(valid_data)} valid points. At least 2 are required.")
+
+        cohort_columns = not selected_id and col1 in NUMERIC_METRIC_COLUMNS and col2 in NUMERIC_METRIC_COLUMNS
+        if factor is not None:
+            quartiles = None
+            if cohort_columns:
+                # Global scope: cohort quartiles from the quantile sketches instead of exact ones
+                sketched = self.db_manager.for_thread().get_metric_quantiles([col1, col2])
+                quartiles = np.column_stack((sketched[col1], sketched[col2]))
+            # Both fences in one mask (positional, so col1 == col2 works too)
+            valid_data = valid_data[iqr_outlier_mask(valid_data.to_numpy(dtype=np.float64), factor,
+                                                     quartiles=quartiles)]
+
+        x_data = valid_data.iloc[:, 0]
+        y_data = valid_data.iloc[:, 1]
+        corr_value = x_data.corr(y_data)
+
+        trend = None
+        if len(valid_data) > 1 and not np.isnan(corr_value):
+            trend = np.polyfit(x_data, y_data, 1)
+
+        return {
+            'col1': col1, 'col2': col2, 'scope': analysis_scope,
+            'x': x_data, 'y': y_data, 'corr': corr_value, 'trend': trend
+        }
+
+    def _save_correlation(self, token, col1, col2, selected_id, source_df, factor):
+        """Background step: recomputes the patient's Pearson r and writes it to the latest report."""
+        corr_value = self._compute_correlation(token, col1, col2, selected_id, source_df, factor)['corr']
+        if pd.isna(corr_value):
+            raise TaskWarning("Calculation Error", "Correlation is NaN.")
+        token.raise_if_cancelled()
+        corr_text = f"Corr: {corr_value:.2f}"
+        if not self.db_manager.for_thread().update_correlation_data(int(selected_id), corr_text):
+            raise TaskWarning("Database Error", f"Could not save the correlation for Patient {selected_id}.")
+        return corr_text, selected_id
+
+    def _render_correlation_save(self, result):
+        corr_text, selected_id = result
+        QMessageBox.information(self, "Success", f"Saved '{corr_text}' for Patient {selected_id}!")
+        self.db_retrieve_data()
 
-        try:
-            working_df[col1] = pd.to_numeric(working_df[col1], errors='coerce')
-            working_df[col2] = pd.to_numeric(working_df[col2], errors='coerce')
-            valid_data = working_df[[col1, col2]].dropna().copy()
-            
-            if len(valid_data) < 2:
-                QMessageBox.warning(self, "Insufficient Data", 
-                                  f"{analysis_scope} has {len(valid_data)} valid points. At least 2 are required.")
-                return
+    def _render_correlation(self, result):
+        col1, col2 = result['col1'], result['col2']
+        x_data, y_data = result['x'], result['y']
 
-            if hasattr(self, 'outlier_slider'):
-                factor = self.outlier_slider.value() / 10.0
-                for column_name in [col1, col2]:
-                    series = valid_data[column_name]
-                    if isinstance(series, pd.DataFrame): 
-                        series = series.iloc[:, 0]
-                        
-                    Q1 = series.quantile(0.25)
-                    Q3 = series.quantile(0.75)
-                    IQR = Q3 - Q1
-                    valid_data = valid_data[
-                        (valid_data[column_name] >= Q1 - factor * IQR) & 
-                        (valid_data[column_name] <= Q3 + factor * IQR)
-                    ]
-
-            self.analysis_ax.clear()
-            
-            x_data = valid_data.iloc[:, 0]
-            y_data = valid_data.iloc[:, 1]
-            
-            self.analysis_ax.scatter(x_data, y_data, color='#2ECC71', s=50, alpha=0.8)
-            
-            corr_value = x_data.corr(y_data)
+        self.analysis_ax.clear()
+        self.analysis_ax.scatter(x_data, y_data, color='#2ECC71', s=50, alpha=0.8)
 
-            if len(valid_data) > 1 and not np.isnan(corr_value):
-                m, b = np.polyfit(x_data, y_data, 1)
-                self.analysis_ax.plot(x_data, m*x_data + b, color='#E74C3C', linestyle='--', linewidth=1.5)
+        if result['trend'] is not None:
+            m, b = result['trend']
+            self.analysis_ax.plot(x_data, m*x_data + b, color='#E74C3C', linestyle='--', linewidth=1.5)
 
-            self.analysis_ax.set_title(f'{analysis_scope}: {col1} vs {col2}\n(Pearson Corr = {corr_value:.2f})', 
-                                      fontsize=11, fontweight='bold')
-            self.analysis_ax.set_xlabel(col1)
-            self.analysis_ax.set_ylabel(col2)
-            self.analysis_ax.grid(True, linestyle=':', alpha=0.7)
-            self.analysis_canvas.draw_idle()
-            
-            if hasattr(self, 'save_corr_db_radio') and self.save_corr_db_radio.isChecked():
-                if selected_id and selected_id.isdigit():
-                    if pd.isna(corr_value):
-                        QMessageBox.warning(self, "Calculation Error", "Correlation is NaN.")
-                        return
-                    corr_text = f"Corr: {corr_value:.2f}"
-                    success = self.db_manager.update_correlation_data(int(selected_id), corr_text)
-                    if success:
-                        QMessageBox.information(self, "Success", f"Saved '{corr_text}' for Patient {selected_id}!")
-                        self.db_retrieve_data() 
-                else:
-                    QMessageBox.warning(self, "Selection Required", "Select a Patient ID to save.")
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Correlation analysis failed: {str(e)}")
+        self.analysis_ax.set_title(f"{result['scope']}: {col1} vs {col2}\n(Pearson Corr = {result['corr']:.2f})", 
+                                  fontsize=11, fontweight='bold')
+        self.analysis_ax.set_xlabel(col1)
+        self.analysis_ax.set_ylabel(col2)
+        self.analysis_ax.grid(True, linestyle=':', alpha=0.7)
+        self.analysis_canvas.draw_idle()
 
     def show_heatmap(self):
         if self.df is None or self.df.empty:
@@ -1179,33 +1263,71 @@ class HealthcareApp(QMainWindow):
             return
 
         selected_id = self.analysis_patient_id.currentText().strip()
-        
-        if selected_id:
-            source_df = self.db_manager.get_all_records_for_patient(selected_id)
-            analysis_scope = f"Patient {selected_id}"
-        else:
-            source_df = self.filtered_df if (self.filtered_df is not None and not self.filtered_df.empty) else self.df
-            analysis_scope = "Global Dataset"
-
-        if source_df is None or source_df.empty:
-            QMessageBox.warning(self, "No Data", f"No records found in database for {analysis_scope}.")
-            return
-
-        try:
-            source_df[col1] = pd.to_numeric(source_df[col1], errors='coerce')
-            source_df[col2] = pd.to_numeric(source_df[col2], errors='coerce')
-            
-            self.analysis_canvas.figure.clear()
-            self.analysis_ax = self.analysis_canvas.figure.add_subplot(111)
-
-            plot_df = source_df[[col1, col2]].dropna()
-
-            if len(plot_df) < 2:
-                QMessageBox.warning(self, "Insufficient History", 
-                                  f"{analysis_scope} only has {len(plot_df)} valid records. "
-                                  "At least 2 records are required for this analysis.")
-                return
+        self._run_task('analysis_plot', self._compute_heatmap, self._render_heatmap,
+                       "Error", "Heatmap failed",
+                       col1, col2, selected_id, self._analysis_source_snapshot(selected_id, [col1, col2]))
+
+    def _compute_heatmap(self, token, col1, col2, selected_id, source_df):
+        """Background step: numeric coercion, Pearson r and the bootstrapped trend band."""
+        if not selected_id and col1 in NUMERIC_METRIC_COLUMNS and col2 in NUMERIC_METRIC_COLUMNS:
+            return self._compute_global_heatmap(token, col1, col2)
+        source_df, analysis_scope = self._load_analysis_scope(selected_id, source_df)
+        token.raise_if_cancelled()
+
+        source_df[col1] = pd.to_numeric(source_df[col1], errors='coerce')
+        source_df[col2] = pd.to_numeric(source_df[col2], errors='coerce')
+        plot_df = source_df[[col1, col2]].dropna()
+
+        if len(plot_df) < 2:
+            raise TaskWarning("Insufficient History",
+                              f"{analysis_scope} only has {len(plot_df)} valid records. "
+                              "At least 2 records are required for this analysis.")
+
+        token.raise_if_cancelled()
+        return {
+            'col1': col1, 'col2': col2, 'scope': analysis_scope, 'data': plot_df,
+            'corr': plot_df[col1].corr(plot_df[col2]),
+            'trend': linear_fit_with_ci(plot_df[col1], plot_df[col2])
+        }
+
+    def _compute_global_heatmap(self, token, col1, col2):
+        """
+        Global scope over the whole table: density bins, r and the trend band all come
+        from SQLite aggregates, so no rows are loaded whatever the table size.
+        """
+        db = self.db_manager.for_thread()
+        moments = db.get_metric_comoments([col1, col2])
+        n = moments['n'][0, 1]
+        if n < 2:
+            raise TaskWarning("Insufficient History",
+                              f"Global Dataset only has {int(n)} valid records. "
+                              "At least 2 records are required for this analysis.")
+        token.raise_if_cancelled()
+        counts, (x_edges, y_edges) = db.get_metric_histogram2d(col1, col2, bins=10 if n < 10 else 18)
+
+        mean_x, mean_y = moments['mean_x'][0, 1], moments['mean_y'][0, 1]
+        var_x, var_y, cov = moments['var_x'][0, 1], moments['var_y'][0, 1], moments['cov'][0, 1]
+        return {
+            'col1': col1, 'col2': col2, 'scope': f"Global Dataset ({int(n)} records)",
+            'bins': (counts, x_edges, y_edges),
+            'corr': cov / np.sqrt(var_x * var_y),
+            'trend': linear_fit_from_moments(n, mean_x, mean_y, var_x, var_y, cov, x_edges[0], x_edges[-1])
+        }
+
+    def _render_heatmap(self, result):
+        col1, col2 = result['col1'], result['col2']
+
+        self.analysis_canvas.figure.clear()
+        self.analysis_ax = self.analysis_canvas.figure.add_subplot(111)
 
+        if 'bins' in result:
+            # Pre-binned global counts; empty bins stay blank like hexbin's mincnt=1
+            counts, x_edges, y_edges = result['bins']
+            hb = self.analysis_ax.pcolormesh(
+                x_edges, y_edges, np.ma.masked_equal(counts.T, 0), cmap='YlOrRd', alpha=0.8
+            )
+        else:
+            plot_df = result['data']
             grid_size = 10 if len(plot_df) < 10 else 18
             
             hb = self.analysis_ax.hexbin(
@@ -1216,35 +1338,25 @@ class HealthcareApp(QMainWindow):
                 mincnt=1,
                 alpha=0.8
             )
-            
-            cb = self.analysis_canvas.figure.colorbar(hb, ax=self.analysis_ax)
-            cb.set_label('Record Density (Frequency)')
-
-            sns.regplot(
-                x=col1, 
-                y=col2, 
-                data=plot_df, 
-                ax=self.analysis_ax, 
-                scatter=False,  
-                color='#2980B9', 
-                line_kws={'linewidth': 2.5, 'label': 'Linear Trend'}
-            )
-
-            corr_val = plot_df[col1].corr(plot_df[col2])
+        
+        cb = self.analysis_canvas.figure.colorbar(hb, ax=self.analysis_ax)
+        cb.set_label('Record Density (Frequency)')
 
-            self.analysis_ax.set_title(f"{analysis_scope}: {col1} vs {col2}\nCorrelation (r) = {corr_val:.2f}", 
-                                      fontsize=11, fontweight='bold')
-            self.analysis_ax.set_xlabel(col1, fontweight='bold')
-            self.analysis_ax.set_ylabel(col2, fontweight='bold')
-            self.analysis_ax.legend()
-            self.analysis_ax.grid(True, linestyle=':', alpha=0.5)
+        # Linear trend with its 95% bootstrap band (same styling sns.regplot used)
+        x_grid, y_hat, ci_low, ci_high = result['trend']
+        self.analysis_ax.plot(x_grid, y_hat, color='#2980B9', linewidth=2.5, label='Linear Trend')
+        self.analysis_ax.fill_between(x_grid, ci_low, ci_high, facecolor='#2980B9', alpha=0.15)
 
-            self.analysis_canvas.figure.tight_layout()
-            self.analysis_canvas.draw()
-            self.analysis_status_label.setText(f"Density Heatmap generated for {analysis_scope}.")
+        self.analysis_ax.set_title(f"{result['scope']}: {col1} vs {col2}\nCorrelation (r) = {result['corr']:.2f}", 
+                                  fontsize=11, fontweight='bold')
+        self.analysis_ax.set_xlabel(col1, fontweight='bold')
+        self.analysis_ax.set_ylabel(col2, fontweight='bold')
+        self.analysis_ax.legend()
+        self.analysis_ax.grid(True, linestyle=':', alpha=0.5)
 
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Heatmap failed: {str(e)}")
+        self.analysis_canvas.figure.tight_layout()
+        self.analysis_canvas.draw()
+        self.analysis_status_label.setText(f"Density Heatmap generated for {result['scope']}.")
 
     def create_spectrum_panel(self):
         panel = QWidget()
@@ -1317,12 +1429,43 @@ class HealthcareApp(QMainWindow):
         # --- Raw Signal Display ---
         raw_signal_group = QGroupBox("Raw Signal Display")
         raw_signal_layout = QVBoxLayout(raw_signal_group)
-        self.raw_signal_figure = Figure(figsize=(12, 4))
-        self.raw_signal_canvas = FigureCanvas(self.raw_signal_figure)
+        self.raw_signal_figure, self.raw_signal_canvas = self._new_figure_canvas((12, 4))
         self.raw_signal_canvas.setFixedHeight(300)
         raw_signal_layout.addWidget(self.raw_signal_canvas)
         self.raw_signal_ax = self.raw_signal_figure.add_subplot(111)
         main_layout.addWidget(raw_signal_group)
+        # Slider drags are coalesced into one zoom (and re-decimation) per 40 ms
+        self.raw_zoom_timer = QTimer(self)
+        self.raw_zoom_timer.setSingleShot(True)
+        self.raw_zoom_timer.setInterval(40)
+        self.raw_zoom_timer.timeout.connect(self._zoom_raw_to_segment)
+
+        # --- Live ECG Monitor ---
+        live_group = QGroupBox("Live ECG Monitor")
+        live_layout = QVBoxLayout(live_group)
+        live_controls = QHBoxLayout()
+        self.live_start_btn = QPushButton("Start Replay Stream")
+        self.live_start_btn.clicked.connect(self.start_live_stream)
+        self.live_stop_btn = QPushButton("Stop Stream")
+        self.live_stop_btn.clicked.connect(self.stop_live_stream)
+        self.live_stop_btn.setEnabled(False)
+        self.live_hr_label = QLabel("HR: -- bpm")
+        self.live_status_label = QLabel("Stream idle.")
+        live_controls.addWidget(self.live_start_btn)
+        live_controls.addWidget(self.live_stop_btn)
+        live_controls.addWidget(self.live_hr_label)
+        live_controls.addStretch()
+        live_controls.addWidget(self.live_status_label)
+        live_layout.addLayout(live_controls)
+
+        self.live_figure, self.live_canvas = self._new_figure_canvas((12, 3))
+        self.live_canvas.setFixedHeight(250)
+        live_layout.addWidget(self.live_canvas)
+        self.live_ax = self.live_figure.add_subplot(111)
+        self.live_background = None
+        self.live_thread = None
+        self.live_canvas.mpl_connect('draw_event', self._capture_live_background)
+        main_layout.addWidget(live_group)
 
         # --- FFT Spectrum Analysis ---
         fft_controls_group = QGroupBox("FFT Spectrum Analysis")
@@ -1339,6 +1482,7 @@ class HealthcareApp(QMainWindow):
         self.segment_start_slider.setValue(0)
         self.segment_start_label = QLabel("0")
         self.segment_start_slider.valueChanged.connect(lambda v: self.segment_start_label.setText(str(v)))
+        self.segment_start_slider.valueChanged.connect(lambda v: self.raw_zoom_timer.start())
         start_segment_layout.addWidget(self.segment_start_slider)
         start_segment_layout.addWidget(self.segment_start_label)
         segment_controls.addLayout(start_segment_layout)
@@ -1351,6 +1495,7 @@ class HealthcareApp(QMainWindow):
         self.segment_end_slider.setValue(1000)
         self.segment_end_label = QLabel("1000")
         self.segment_end_slider.valueChanged.connect(lambda v: self.segment_end_label.setText(str(v)))
+        self.segment_end_slider.valueChanged.connect(lambda v: self.raw_zoom_timer.start())
         end_segment_layout.addWidget(self.segment_end_slider)
         end_segment_layout.addWidget(self.segment_end_label)
         segment_controls.addLayout(end_segment_layout)
@@ -1363,12 +1508,21 @@ class HealthcareApp(QMainWindow):
         self.fft_btn.setObjectName("ComputeFFTButton")
         self.fft_btn.clicked.connect(self.plot_fft)
         
+        self.spectral_method_combo = QComboBox()
+        self.spectral_method_combo.addItems([SPECTRAL_FFT, SPECTRAL_WELCH, SPECTRAL_STFT])
+        
         from PyQt5.QtWidgets import QRadioButton
         self.save_fft_radio = QRadioButton("Save FFT to Database")
+        fft_button_layout.addWidget(QLabel("Method:"))
+        fft_button_layout.addWidget(self.spectral_method_combo)
         fft_button_layout.addWidget(self.fft_btn)
         fft_button_layout.addWidget(self.save_fft_radio)
         fft_button_layout.addStretch()
         fft_controls_layout.addLayout(fft_button_layout)
+
+        self.band_power_label = QLabel("Band power: compute a spectrum to see the band breakdown.")
+        self.band_power_label.setWordWrap(True)
+        fft_controls_layout.addWidget(self.band_power_label)
         
         main_layout.addWidget(fft_controls_group)
 
@@ -1408,8 +1562,7 @@ class HealthcareApp(QMainWindow):
         # --- FFT Power Spectrum Display ---
         fft_display_group = QGroupBox("FFT Power Spectrum")
         fft_display_layout = QVBoxLayout(fft_display_group)
-        self.spectrum_figure = Figure(figsize=(12, 5))
-        self.spectrum_canvas = FigureCanvas(self.spectrum_figure)
+        self.spectrum_figure, self.spectrum_canvas = self._new_figure_canvas((12, 5))
         self.spectrum_canvas.setMinimumHeight(350)
         fft_display_layout.addWidget(self.spectrum_canvas)
         self.spectrum_ax = self.spectrum_figure.add_subplot(111)
@@ -1431,39 +1584,49 @@ class HealthcareApp(QMainWindow):
         if not patient_id_text or not patient_id_text.isdigit():
             self.past_fft_dropdown.clear()
             return
+        self._run_task('fft_history_list', self._load_fft_history, self._render_fft_history_list,
+                       "FFT History Error", "Failed to load FFT history", int(patient_id_text),
+                       on_error=lambda e: print(f"Error loading FFT dropdown: {e}"))
+
+    def _load_fft_history(self, token, patient_id):
+        """Background step: (label, stored spectrum) pairs from the patient's records and FFT history."""
+        db = self.db_manager.for_thread()
+        # Query DB for all health records for this patient
+        df_patient = db.get_all_records_for_patient(patient_id)
+        if df_patient is None or df_patient.empty:
+            return None
+        token.raise_if_cancelled()
+
+        entries = []
+        for _, row in df_patient.iterrows():
+            fft_val = row.get('ECG_FFT_Magnitude')
+            
+            # Ensure there is actually a spectrum stored
+            if signal_length(fft_val) > 1:
+                report_id = row.get('report_id', 'N/A')
+                date_str = row.get('Date_Recorded', 'Unknown Date')
+                entries.append((f"Report {report_id} - {date_str}", fft_val))
+        
+        # Spectra saved since FFT history moved out of the metrics table
+        history = db.get_fft_history(patient_id)
+        for _, entry in history.iterrows():
+            label = f"FFT {entry['result_id']} ({entry['signal_type'] or 'ECG'}) - {entry['created_at']}"
+            entries.append((label, entry['result']))
+        return entries
+
+    def _render_fft_history_list(self, entries):
+        self.past_fft_dropdown.blockSignals(True)
+        self.past_fft_dropdown.clear()
+        self.patient_fft_history_data = dict(entries or []) # Cache for stored spectrum values
+
+        if entries is None:
+            self.past_fft_dropdown.addItem("No patient history")
+        elif not entries:
+            self.past_fft_dropdown.addItem("No FFT records found")
+        else:
+            self.past_fft_dropdown.addItems([label for label, _ in entries])
 
-        try:
-            # Query DB for all health records for this patient
-            df_patient = self.db_manager.get_all_records_for_patient(int(patient_id_text))
-            
-            self.past_fft_dropdown.blockSignals(True)
-            self.past_fft_dropdown.clear()
-            self.patient_fft_history_data = {} # Cache for actual data strings
-
-            if df_patient is not None and not df_patient.empty:
-                valid_count = 0
-                for _, row in df_patient.iterrows():
-                    fft_val = row.get('ECG_FFT_Magnitude')
-                    
-                    # Ensure there is actually a string of numbers stored
-                    if fft_val and str(fft_val).lower() != 'none' and len(str(fft_val)) > 2:
-                        report_id = row.get('report_id', 'N/A')
-                        date_str = row.get('Date_Recorded', 'Unknown Date')
-                        label = f"Report {report_id} - {date_str}"
-                        
-                        self.past_fft_dropdown.addItem(label)
-                        self.patient_fft_history_data[label] = str(fft_val)
-                        valid_count += 1
-                
-                if valid_count == 0:
-                    self.past_fft_dropdown.addItem("No FFT records found")
-            else:
-                self.past_fft_dropdown.addItem("No patient history")
-
-            self.past_fft_dropdown.blockSignals(False)
-
-        except Exception as e:
-            print(f"Error loading FFT dropdown: {e}")
+        self.past_fft_dropdown.blockSignals(False)
 
     def display_selected_fft(self):
         """Plots the FFT data selected from the history dropdown on the canvas."""
@@ -1473,30 +1636,30 @@ class HealthcareApp(QMainWindow):
             QMessageBox.warning(self, "No Data", "Please select a record from the dropdown first.")
             return
 
-        fft_string = self.patient_fft_history_data[selected_label]
-        
-        try:
-            # Convert the comma-separated text back into a numeric array
-            magnitudes = np.fromstring(fft_string, sep=',')
-            
-            if magnitudes.size == 0:
-                raise ValueError("Stored data is empty or invalid.")
-
-            # Update the FFT Power Spectrum Display
-            self.spectrum_ax.clear()
-            # Plotting in a distinct color to differentiate from live computed FFT
-            self.spectrum_ax.plot(magnitudes, color='#d35400', linewidth=1.5)
-            self.spectrum_ax.set_title(f"Historical Record: {selected_label}")
-            self.spectrum_ax.set_xlabel("Frequency Bin")
-            self.spectrum_ax.set_ylabel("Power / Magnitude")
-            self.spectrum_ax.grid(True, linestyle=':', alpha=0.6)
-            self.spectrum_canvas.draw()  # Force the update
-            from PyQt5.QtWidgets import QApplication
-            QApplication.processEvents()
-            self.spectrum_canvas.draw()
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Plot Error", f"Failed to parse historical data: {e}")
+        self._run_task('fft_history_plot', self._decode_stored_fft, self._render_stored_fft,
+                       "Plot Error", "Failed to parse historical data",
+                       selected_label, self.patient_fft_history_data[selected_label])
+
+    def _decode_stored_fft(self, token, selected_label, fft_value):
+        # Decode the stored spectrum (binary BLOB or legacy text) into a numeric array
+        magnitudes = to_signal_array(fft_value)
+        
+        if magnitudes is None or magnitudes.size == 0:
+            raise ValueError("Stored data is empty or invalid.")
+        return selected_label, pyramid_for(('fft_history', selected_label), magnitudes)
+
+    def _render_stored_fft(self, result):
+        selected_label, pyramid = result
+        # Update the FFT Power Spectrum Display
+        self.spectrum_ax.clear()
+        # Plotting in a distinct color to differentiate from live computed FFT
+        self._plot_decimated(self.spectrum_ax, self.spectrum_canvas, pyramid,
+                             color='#d35400', linewidth=1.5)
+        self.spectrum_ax.set_title(f"Historical Record: {selected_label}")
+        self.spectrum_ax.set_xlabel("Frequency Bin")
+        self.spectrum_ax.set_ylabel("Power / Magnitude")
+        self.spectrum_ax.grid(True, linestyle=':', alpha=0.6)
+        self.spectrum_canvas.draw_idle()
 
     def _update_spectrum_for_patient(self):
         """
@@ -1543,19 +1706,25 @@ class HealthcareApp(QMainWindow):
         if patient_data.empty:
             return None
             
-        # Extract signal string from the most recent record
-        signal_str = str(patient_data.iloc[-1][col_name])
+        # Extract the stored signal from the most recent record
         try:
-            # Parse CSV string into numeric array
-            return np.array([float(x) for x in signal_str.split(',') if x.strip()])
+            return self._stored_signal(patient_data.iloc[-1], col_name)[0]
         except Exception:
             return None
 
+    def _stored_signal(self, record, col, db=None):
+        """(samples, sampling rate) of a record's signal; chunked recordings are read from the DB."""
+        value = record.get(col)
+        if is_chunked_signal(value):
+            return (db or self.db_manager).read_signal(int(record['report_id']), col)
+        return to_signal_array(value), signal_sampling_rate(value)
+
     def plot_raw_signal(self):
         """
         Fetches and plots the raw ECG/EEG signal.
         FIX: Queries the Database Manager directly to avoid pagination issues 
              and establishes a handshake for the FFT function.
+        The query and decode run on a worker (_load_raw_signal); _render_raw_signal draws.
         """
         # 1. Get the selected Patient ID from the dropdown/input
         selected_patient_id = self.spectrum_patient_id.currentText().strip()
@@ -1569,146 +1738,424 @@ class HealthcareApp(QMainWindow):
             QMessageBox.warning(self, "Invalid Selection", "Please select a valid Biomedical Signal column.")
             return
 
-        try:
-            # 3. Query the DATABASE directly instead of the paginated self.df
-            # This ensures all IDs (like 1, 12, etc.) are found regardless of the current table page.
-            patient_data = self.db_manager.get_all_records_for_patient(selected_patient_id)
-            
-            if patient_data is None or patient_data.empty:
-                QMessageBox.warning(self, "No Patient Found", f"No records found in database for Patient ID: {selected_patient_id}")
-                return
+        self._run_task('raw_signal', self._load_raw_signal, self._render_raw_signal,
+                       "Plotting Error", "An error occurred while fetching signal",
+                       selected_patient_id, col)
+
+    def _load_raw_signal(self, token, selected_patient_id, col):
+        """Background step: reads the patient's newest record and decodes the signal."""
+        # 3. Query the DATABASE directly instead of the paginated self.df
+        # This ensures all IDs (like 1, 12, etc.) are found regardless of the current table page.
+        patient_data = self.db_manager.for_thread().get_all_records_for_patient(selected_patient_id)
+        
+        if patient_data is None or patient_data.empty:
+            raise TaskWarning("No Patient Found", f"No records found in database for Patient ID: {selected_patient_id}")
+        token.raise_if_cancelled()
+
+        # 4. Get the signal data from the most recent record
+        raw_signal_data = patient_data.iloc[-1].get(col)
+        report_id = patient_data.iloc[-1].get('report_id')
+
+        # 4b. Long chunked recordings: draw the stored overview, segments are read on demand
+        if is_chunked_signal(raw_signal_data):
+            signal_hash, overview_x, overview_y = self.db_manager.for_thread().get_chunked_signal_info(int(report_id), col)
+            pyramid = pyramid_for((signal_hash, 'overview'), overview_y, overview_x)
+            return (selected_patient_id, col, None, signal_length(raw_signal_data),
+                    signal_sampling_rate(raw_signal_data), signal_hash, report_id, pyramid)
+
+        # 5. Decode the stored signal (binary BLOB, legacy CSV text or array-like)
+        signal = to_signal_array(raw_signal_data)
+
+        if signal is None:
+            raise TaskWarning("No Signal", f"The database record for Patient {selected_patient_id} has no data in column: {col}")
+
+        if len(signal) == 0:
+            raise TaskWarning("Empty Signal", f"The signal for patient {selected_patient_id} contains no data points.")
+
+        # 6. Content hash keys this signal's cached FFTs in derived_results
+        sampling_rate = signal_sampling_rate(raw_signal_data)
+        signal_hash = hash_signal(signal, sampling_rate)
+
+        # 7. Multi-resolution envelope for plotting, built off the UI thread and cached per signal
+        pyramid = pyramid_for(signal_hash, signal)
+        return selected_patient_id, col, signal, len(signal), sampling_rate, signal_hash, report_id, pyramid
+
+    def _render_raw_signal(self, result):
+        selected_patient_id, col, signal, n_samples, sampling_rate, signal_hash, report_id, pyramid = result
+
+        # --- THE CRITICAL HANDSHAKE ---
+        # Store the signal globally for the plot_fft function to access
+        # (None for chunked recordings: plot_fft then reads just the segment)
+        self.current_raw_signal = signal 
+        self.current_signal_length = n_samples
+        self.current_sampling_rate = sampling_rate
+        self.current_signal_hash = signal_hash
+        self.current_signal_source = (selected_patient_id, col, report_id)
+        self.current_fft_key = None
+        self.raw_overview_pyramid = pyramid
+        self.raw_detail_range = None
+
+        # 6. UI Plotting
+        self._draw_raw_signal(pyramid, 0, n_samples)
+        
+        # 7. Update Sliders based on the length of the newly loaded signal
+        max_samples = n_samples
+        self.segment_start_slider.setRange(0, max_samples - 2)
+        self.segment_end_slider.setRange(2, max_samples)
+        
+        # Set default view to show a reasonable starting window
+        default_end = min(2000, max_samples)
+        self.segment_start_slider.setValue(0)
+        self.segment_end_slider.setValue(default_end)
+        
+        # Update labels to show the current slider values
+        if hasattr(self, 'segment_start_label'):
+            self.segment_start_label.setText("0")
+        if hasattr(self, 'segment_end_label'):
+            self.segment_end_label.setText(str(default_end))
+        # Keep the full-signal overview until the user moves a slider
+        self.raw_zoom_timer.stop()
 
-            # 4. Get the signal data from the most recent record
-            raw_signal_data = patient_data.iloc[-1].get(col)
+    def _draw_raw_signal(self, pyramid, start, end):
+        """Redraws the raw-signal axes from a pyramid, showing samples [start, end)."""
+        selected_patient_id, col, _ = self.current_signal_source
+        self.raw_signal_ax.clear()
+        
+        # Use a thinner line (0.8) for clarity in high-frequency medical signals.
+        # Only ~2 points per pixel are drawn; zooming re-decimates the visible range.
+        self._plot_decimated(self.raw_signal_ax, self.raw_signal_canvas, pyramid, color='#27AE60', linewidth=0.8)
+        
+        # Set the X-limit to match the data length so it fills the screen properly
+        self.raw_signal_ax.set_xlim(start, end)
+        
+        self.raw_signal_ax.set_title(f"Patient {selected_patient_id}: Raw {col} Signal", fontsize=12, fontweight='bold')
+        self.raw_signal_ax.set_xlabel("Sample Index", fontsize=10)
+        self.raw_signal_ax.set_ylabel("Amplitude", fontsize=10)
+        self.raw_signal_ax.grid(True, linestyle=':', alpha=0.6)
+        
+        self.raw_signal_canvas.figure.tight_layout()
+        self.raw_signal_canvas.draw()
 
-            if raw_signal_data is None or str(raw_signal_data).lower() == 'nan':
-                QMessageBox.warning(self, "No Signal", f"The database record for Patient {selected_patient_id} has no data in column: {col}")
+    def _zoom_raw_to_segment(self):
+        """
+        Zooms the raw view to the slider segment (the xlim callback re-decimates it).
+        For chunked recordings the stored overview serves wide segments; once it gets
+        coarser than the screen, only the segment's samples are read from the database.
+        """
+        if getattr(self, 'current_signal_hash', None) is None:
+            return
+        start, end = self.segment_start_slider.value(), self.segment_end_slider.value()
+        if end - start < 2:
+            return
+        if self.current_raw_signal is None:
+            needs_detail = (end - start) < SIGNAL_OVERVIEW_BLOCK * target_points(self.raw_signal_canvas.width()) // 2
+            if needs_detail:
+                _, col, report_id = self.current_signal_source
+                self._run_task('raw_window', self._load_raw_window, self._render_raw_window,
+                               "Plotting Error", "An error occurred while reading the signal segment",
+                               self.current_signal_hash, int(report_id), col, start, end)
+                return
+            if self.raw_detail_range is not None:
+                self.raw_detail_range = None
+                self._draw_raw_signal(self.raw_overview_pyramid, start, end)
                 return
+        self.raw_signal_ax.set_xlim(start, end)
+        self.raw_signal_canvas.draw_idle()
+
+    def _load_raw_window(self, token, signal_hash, report_id, col, start, end):
+        """Background step: reads one segment of a chunked recording and builds its pyramid."""
+        window, _ = self.db_manager.for_thread().get_signal_window(report_id, start, end, col)
+        if window is None or len(window) == 0:
+            raise TaskWarning("Empty Segment", f"No samples stored between {start} and {end}.")
+        token.raise_if_cancelled()
+        return start, end, pyramid_for((signal_hash, start, end), window, np.arange(start, end))
+
+    def _render_raw_window(self, result):
+        start, end, pyramid = result
+        self.raw_detail_range = (start, end)
+        self._draw_raw_signal(pyramid, start, end)
+
+    def _plot_decimated(self, ax, canvas, pyramid, **style):
+        """
+        Plots a SignalPyramid as a line that re-decimates itself to ~2 points per pixel
+        of the visible x-range whenever the axis is zoomed (the y-range follows the view).
+        """
+        x_values, y_values = pyramid.view(0, len(pyramid.y), target_points(canvas.width()))
+        line, = ax.plot(x_values, y_values, **style)
+        self.decimated_extents[ax] = (pyramid.x[0], pyramid.x[-1])
+
+        def redecimate(axes):
+            x_min, x_max = axes.get_xlim()
+            x_view, y_view = pyramid.view_x(x_min, x_max, target_points(canvas.width()))
+            if len(x_view) == 0:
+                return
+            line.set_data(x_view, y_view)
+            axes.relim()
+            axes.autoscale_view(scalex=False)
 
-            # 5. Handle Signal Conversion (Standardized for CSV-based strings)
-            if isinstance(raw_signal_data, str):
-                # Remove any brackets, quotes, or whitespace before splitting
-                clean_str = raw_signal_data.replace('[', '').replace(']', '').replace('"', '').replace("'", "").strip()
-                if not clean_str:
-                    raise ValueError("Signal string is empty.")
-                # Convert comma-separated string to a numeric numpy array
-                signal = np.array([float(x) for x in clean_str.split(',') if x.strip()])
-            else:
-                # If already numeric (from an array-like object)
-                signal = np.atleast_1d(raw_signal_data).astype(float)
+        # ax.clear() resets the callback registry, so each plot registers its own
+        ax.callbacks.connect('xlim_changed', redecimate)
+        return line
 
-            if len(signal) == 0:
-                QMessageBox.warning(self, "Empty Signal", f"The signal for patient {selected_patient_id} contains no data points.")
-                return
+    def start_live_stream(self):
+        """Replays the recorded ECG at 1 kHz through the streaming analyzer and live canvas."""
+        if self.live_thread is not None:
+            return
+        if not os.path.exists(LIVE_REPLAY_CSV):
+            QMessageBox.warning(self, "Missing Recording", f"Replay file not found: {LIVE_REPLAY_CSV}")
+            return
 
-            # --- THE CRITICAL HANDSHAKE ---
-            # Store the signal globally for the plot_fft function to access
-            self.current_raw_signal = signal 
+        # 1. Bounded state: display ring + analyzer windows, whatever the stream length
+        self.live_analyzer = StreamingECGAnalyzer(LIVE_SAMPLING_RATE)
+        self.live_display = RingBuffer(int(LIVE_DISPLAY_SECONDS * LIVE_SAMPLING_RATE))
+        self.live_pending_windows = []
+        self.live_saved_windows = 0
+        self.live_saved_samples = 0
+        patient_text = self.spectrum_patient_id.currentText().strip()
+        self.live_patient_id = int(patient_text) if patient_text.isdigit() else None
+        self.live_stream_id = f"replay-{QDateTime.currentDateTime().toString('yyyyMMdd-HHmmss')}"
+
+        # 2. Static axes; only the animated artists are redrawn each frame (blitting)
+        n = self.live_display.capacity
+        x = np.arange(-n, 0) / LIVE_SAMPLING_RATE
+        self.live_ax.clear()
+        self.live_line, = self.live_ax.plot(x, np.full(n, np.nan), color='#27AE60', linewidth=0.8, animated=True)
+        self.live_peaks, = self.live_ax.plot([], [], 'o', color='#E74C3C', markersize=4, animated=True)
+        self.live_ax.set_xlim(x[0], 0)
+        self.live_ax.set_ylim(0, 1)
+        self.live_ax.set_title("Live ECG (replay)", fontweight='bold')
+        self.live_ax.set_xlabel("Time (s)")
+        self.live_ax.set_ylabel("Amplitude")
+        self.live_ax.grid(True, linestyle=':', alpha=0.6)
+        self.live_figure.tight_layout()
+        self.live_canvas.draw()
+
+        # 3. Replay source and timers: frames at ~30 fps, DB writes in periodic batches
+        self.live_thread = EcgReplayThread(LIVE_REPLAY_CSV, LIVE_SAMPLING_RATE)
+        self.live_thread.samples_ready.connect(self._on_live_samples)
+        self.live_timer = QTimer(self)
+        self.live_timer.timeout.connect(self._render_live_frame)
+        self.live_flush_timer = QTimer(self)
+        self.live_flush_timer.timeout.connect(self._flush_live_windows)
+        self.live_thread.start()
+        self.live_timer.start(LIVE_FRAME_MS)
+        self.live_flush_timer.start(LIVE_FLUSH_MS)
+
+        self.live_start_btn.setEnabled(False)
+        self.live_stop_btn.setEnabled(True)
+        self.live_status_label.setText(f"Streaming {self.live_stream_id}...")
+
+    def stop_live_stream(self, sync=False):
+        """Stops the replay and stores the remaining windows (sync=True writes them before returning)."""
+        if getattr(self, 'live_thread', None) is None:
+            return
+        self.live_thread.stop()
+        self.live_thread.wait(2000)
+        self.live_thread = None
+        self.live_timer.stop()
+        self.live_flush_timer.stop()
+
+        # The partial last window is kept too
+        self.live_pending_windows.extend(self.live_analyzer.finish())
+        self._flush_live_windows(sync=sync)
+        self.live_start_btn.setEnabled(True)
+        self.live_stop_btn.setEnabled(False)
+
+    def _on_live_samples(self, samples):
+        self.live_display.extend(samples)
+        _, windows = self.live_analyzer.process(samples)
+        self.live_pending_windows.extend(windows)
+
+    def _capture_live_background(self, event):
+        self.live_background = self.live_canvas.copy_from_bbox(self.live_ax.bbox)
+
+    def _render_live_frame(self):
+        """Timer tick: scrolls the newest samples in and blits only the trace and beat markers."""
+        data = self.live_display.latest()
+        if len(data) == 0 or self.live_background is None:
+            return
+        n = self.live_display.capacity
+        y = np.full(n, np.nan, dtype=np.float32)
+        y[n - len(data):] = data
+        self.live_line.set_ydata(y)
+
+        # Beat markers: recent R-peaks that are still on screen
+        peaks = self.live_analyzer.r_peaks.latest()
+        offsets = peaks - self.live_display.total
+        offsets = offsets[offsets >= -len(data)]
+        self.live_peaks.set_data(offsets / LIVE_SAMPLING_RATE, y[n + offsets])
+
+        heart_rate = self.live_analyzer.heart_rate()
+        self.live_hr_label.setText("HR: -- bpm" if np.isnan(heart_rate) else f"HR: {heart_rate:.0f} bpm")
+
+        # Rescale (full redraw) only when the trace leaves the current range
+        low, high = float(np.nanmin(data)), float(np.nanmax(data))
+        y_low, y_high = self.live_ax.get_ylim()
+        if low < y_low or high > y_high:
+            margin = (high - low) * 0.1 or 1.0
+            self.live_ax.set_ylim(low - margin, high + margin)
+            self.live_canvas.draw()
+
+        self.live_canvas.restore_region(self.live_background)
+        self.live_ax.draw_artist(self.live_line)
+        self.live_ax.draw_artist(self.live_peaks)
+        self.live_canvas.blit(self.live_ax.bbox)
+
+    def _flush_live_windows(self, sync=False):
+        """
+        Hands the completed windows to a worker that stores them in one transaction.
+        sync=True stores them on the calling thread instead (shutdown, when tasks are cancelled).
+        """
+        if not self.live_pending_windows:
+            return
+        windows, self.live_pending_windows = self.live_pending_windows, []
+        if sync:
+            self.db_manager.save_stream_windows(self.live_stream_id, self.live_patient_id, windows,
+                                                sampling_rate=LIVE_SAMPLING_RATE)
+            return
+        self._run_task(None, self._store_live_windows, self._on_live_windows_stored,
+                       "Stream Error", "Failed to store live ECG windows",
+                       self.live_stream_id, self.live_patient_id, windows)
 
-            # 6. UI Plotting
-            self.raw_signal_ax.clear()
-            
-            # Use a thinner line (0.8) for clarity in high-frequency medical signals
-            self.raw_signal_ax.plot(signal, color='#27AE60', linewidth=0.8)
-            
-            # Set the X-limit to match the data length so it fills the screen properly
-            self.raw_signal_ax.set_xlim(0, len(signal))
-            
-            self.raw_signal_ax.set_title(f"Patient {selected_patient_id}: Raw {col} Signal", fontsize=12, fontweight='bold')
-            self.raw_signal_ax.set_xlabel("Sample Index", fontsize=10)
-            self.raw_signal_ax.set_ylabel("Amplitude", fontsize=10)
-            self.raw_signal_ax.grid(True, linestyle=':', alpha=0.6)
-            
-            self.raw_signal_canvas.figure.tight_layout()
-            self.raw_signal_canvas.draw()
-            
-            # 7. Update Sliders based on the length of the newly loaded signal
-            max_samples = len(signal)
-            self.segment_start_slider.setRange(0, max_samples - 2)
-            self.segment_end_slider.setRange(2, max_samples)
-            
-            # Set default view to show a reasonable starting window
-            default_end = min(2000, max_samples)
-            self.segment_start_slider.setValue(0)
-            self.segment_end_slider.setValue(default_end)
-            
-            # Update labels to show the current slider values
-            if hasattr(self, 'segment_start_label'):
-                self.segment_start_label.setText("0")
-            if hasattr(self, 'segment_end_label'):
-                self.segment_end_label.setText(str(default_end))
+    def _store_live_windows(self, token, stream_id, patient_id, windows):
+        saved = self.db_manager.for_thread().save_stream_windows(
+            stream_id, patient_id, windows, sampling_rate=LIVE_SAMPLING_RATE
+        )
+        samples = sum(len(window['samples']) for window in windows) if saved else 0
+        return stream_id, saved, samples
 
-        except Exception as e:
-            QMessageBox.critical(self, "Plotting Error", f"An error occurred while fetching signal: {str(e)}")
+    def _on_live_windows_stored(self, result):
+        stream_id, saved, samples = result
+        self.live_saved_windows += saved
+        self.live_saved_samples += samples
+        seconds = self.live_saved_samples / LIVE_SAMPLING_RATE
+        self.live_status_label.setText(f"{stream_id}: {seconds:.1f} s stored in {self.live_saved_windows} windows")
 
     def plot_fft(self):
         """
         Computes and plots FFT. 
         All manual zoom/limit logic has been removed to prevent blank graphs.
+        The segment read and spectra run on a worker (_compute_spectrum); _render_spectrum draws.
         """
         # 1. Check if signal was loaded
-        if not hasattr(self, 'current_raw_signal') or self.current_raw_signal is None:
+        if getattr(self, 'current_signal_hash', None) is None:
             QMessageBox.warning(self, "No Signal", "Please click 'Load Signal' first.")
             return
 
-        try:
-            # 2. Extract Segment from Sliders
-            start = self.segment_start_slider.value()
-            end = self.segment_end_slider.value()
-            signal_segment = self.current_raw_signal[start:end]
-
-            if len(signal_segment) < 10: 
-                QMessageBox.warning(self, "Range Error", "Segment too short.")
-                return
-
-            # 3. Compute FFT
+        # 2. Extract Segment from Sliders (chunked recordings read only these samples)
+        start = self.segment_start_slider.value()
+        end = self.segment_end_slider.value()
+        self._run_task('spectrum', self._compute_spectrum, self._render_spectrum,
+                       "FFT Error", "Calculation failed",
+                       self.current_raw_signal, getattr(self, 'current_signal_source', (None, None, None)),
+                       self.current_signal_hash, getattr(self, 'current_sampling_rate', 1000.0),
+                       start, end, self.spectral_method_combo.currentText())
+
+    def _compute_spectrum(self, token, signal, source, signal_hash, sampling_rate, start, end, method):
+        """Background step: reads the segment and computes (or fetches the cached) spectra."""
+        db = self.db_manager.for_thread()
+        patient_id, col, report_id = source
+        if signal is not None:
+            signal_segment = signal[start:end]
+        else:
+            signal_segment, _ = db.get_signal_window(int(report_id), start, end, col)
+
+        if signal_segment is None or len(signal_segment) < 10: 
+            raise TaskWarning("Range Error", "Segment too short.")
+        token.raise_if_cancelled()
+
+        # 3. Welch PSD of the segment (cached): plotted in Welch mode, always used for band power
+        n_valid = int(np.count_nonzero(~np.isnan(signal_segment)))
+        nperseg = default_nperseg(n_valid, sampling_rate)
+        psd, _ = cached_spectrum(
+            db, signal_hash, start, end, WELCH_PSD, {'nperseg': nperseg, 'overlap': 0.5},
+            lambda: welch_psd(signal_segment, sampling_rate, nperseg=nperseg)[1],
+            sampling_rate=sampling_rate, patient_id=patient_id, report_id=report_id
+        )
+        psd_freq = welch_frequencies(nperseg, sampling_rate)
+        token.raise_if_cancelled()
+
+        # 4. What the selected method plots
+        fft_values = None
+        if method == SPECTRAL_WELCH:
+            plot_data = pyramid_for((signal_hash, start, end, WELCH_PSD, nperseg), psd, psd_freq)
+        elif method == SPECTRAL_STFT:
+            plot_data = stft_spectrogram(signal_segment, sampling_rate)
+        else:
+            # Single-window FFT, or reuse the spectrum cached for this exact signal segment
             from data_analyzer import get_fft_analysis
-            freq, fft_values = get_fft_analysis(pd.Series(signal_segment))
+            fft_values, _ = cached_spectrum(
+                db, signal_hash, start, end, FFT_MAGNITUDE, {},
+                lambda: get_fft_analysis(pd.Series(signal_segment), sampling_rate)[1],
+                sampling_rate=sampling_rate, patient_id=patient_id, report_id=report_id
+            )
+            if fft_values is None or fft_values.size == 0:
+                return None
+            freq = np.fft.rfftfreq(n_valid, d=1.0 / sampling_rate)
+            plot_data = pyramid_for((signal_hash, start, end, FFT_MAGNITUDE, sampling_rate), fft_values, freq)
 
-            if freq is None or fft_values is None:
-                return
+        # 5. Band power summary for the signal type
+        bands = EEG_BANDS if str(col).startswith('EEG') else ECG_BANDS
+        powers = band_powers(psd_freq, psd, bands)
+        return method, plot_data, fft_values, nperseg, powers, (signal_hash, start, end), sampling_rate
 
-            # 4. Plotting with Absolute Auto-Scaling
-            self.spectrum_ax.clear()
-            
-            # Plot the data
-            self.spectrum_ax.plot(freq, fft_values, color='#E74C3C', linewidth=1.2)
-            
-            # Remove all constraints: Let Matplotlib decide the limits based on the data
+    def _render_spectrum(self, result):
+        if result is None:
+            return
+        method, plot_data, fft_values, nperseg, powers, fft_key, sampling_rate = result
+        start = fft_key[1]
+
+        # Plotting with Absolute Auto-Scaling
+        self.spectrum_ax.clear()
+        if method == SPECTRAL_WELCH:
+            self._plot_decimated(self.spectrum_ax, self.spectrum_canvas, plot_data,
+                                 color='#8E44AD', linewidth=1.2)
+            self.spectrum_ax.set_yscale('log')
+            self.spectrum_ax.set_title(f"Welch PSD ({nperseg}-sample windows, 50% overlap)", fontweight='bold')
+            self.spectrum_ax.set_ylabel("Power Spectral Density (V²/Hz)")
+        elif method == SPECTRAL_STFT:
+            freqs, times, power = plot_data
+            self.spectrum_ax.pcolormesh(times + start / sampling_rate, freqs, 10 * np.log10(power + 1e-20),
+                                        shading='auto', cmap='viridis')
+            self.spectrum_ax.set_title("STFT Spectrogram (dB)", fontweight='bold')
+            self.spectrum_ax.set_xlabel("Time (s)")
+            self.spectrum_ax.set_ylabel("Frequency (Hz)")
+        else:
+            self.current_fft_key = fft_key
+            self._plot_decimated(self.spectrum_ax, self.spectrum_canvas, plot_data,
+                                 color='#E74C3C', linewidth=1.2)
+            self.spectrum_ax.set_title("FFT Power Spectrum", fontweight='bold')
+            self.spectrum_ax.set_ylabel("Magnitude")
+
+        # Remove all constraints: Let Matplotlib decide the limits based on the data
+        # (pcolormesh already spans the spectrogram; relim() only measures lines)
+        if method != SPECTRAL_STFT:
             self.spectrum_ax.relim()
             self.spectrum_ax.autoscale_view(tight=True)
-
-            # Aesthetics
-            self.spectrum_ax.set_title("FFT Power Spectrum", fontweight='bold')
             self.spectrum_ax.set_xlabel("Frequency (Hz)")
-            self.spectrum_ax.set_ylabel("Magnitude")
             self.spectrum_ax.grid(True, linestyle='--', alpha=0.5)
 
-            # 5. Force UI Refresh
-            self.spectrum_canvas.figure.tight_layout()
-            self.spectrum_canvas.draw()
+        self.band_power_label.setText(
+            f"Band power @ {sampling_rate:g} Hz: " +
+            "  |  ".join(f"{name}: {fraction:.1%}" for name, (_, fraction) in powers.items())
+        )
 
-        except Exception as e:
-            print(f"DEBUG: FFT Error - {str(e)}")
-            QMessageBox.critical(self, "FFT Error", f"Calculation failed: {str(e)}")
+        # Refresh the UI
+        self.spectrum_canvas.figure.tight_layout()
+        self.spectrum_canvas.draw_idle()
+
+        # Keep it in the patient's FFT history when requested
+        if fft_values is not None and self.save_fft_radio.isChecked():
+            self.save_fft_logic(fft_values)
 
     def save_fft_to_history(self, patient_id, fft_values):
-        """Converts FFT array to string and saves as a new record in the DB."""
+        """Saves an FFT array to the patient's FFT history in the DB."""
         try:
-            # Convert numeric array to a comma-separated string
-            fft_str = ",".join(map(str, np.round(fft_values, 4)))
-            
-            # We use a custom query to INSERT a new record instead of updating an old one
-            # This allows one patient to have multiple FFT records over time
-            sql = """
-                INSERT INTO patient_health_metrics (patient_id, Date_Recorded, ECG_FFT_Magnitude)
-                VALUES (?, DATETIME('now'), ?)
-            """
-            self.db_manager.cursor.execute(sql, (patient_id, fft_str))
-            self.db_manager.conn.commit()
-            
-            # Refresh the internal dataframe 
-            self.db_retrieve_data() 
+            # History entries live in derived_results, so saving never adds metrics rows
+            if not self.db_manager.save_new_fft_record(
+                patient_id, fft_values, sampling_rate=getattr(self, 'current_sampling_rate', 1000.0)
+            ):
+                raise RuntimeError("FFT record insert failed")
             
             # CRITICAL: Reload the dropdown so the new record appears immediately
             if hasattr(self, 'load_patient_fft_list'):
@@ -1726,18 +2173,13 @@ class HealthcareApp(QMainWindow):
             try:
                 freq_min = self.freq_min_input.value()
                 freq_max = self.freq_max_input.value()
-                amp_min = self.amp_min_input.value()
-                amp_max = self.amp_max_input.value()
                 
                 if freq_min >= freq_max:
                     QMessageBox.warning(self, "Invalid Range", "Frequency min must be less than max.")
                     return
-                if amp_min >= amp_max:
-                    QMessageBox.warning(self, "Invalid Range", "Amplitude min must be less than max.")
-                    return
                 
+                # The spectrum line re-decimates the new range and fits the amplitude axis to it
                 self.spectrum_ax.set_xlim(freq_min, freq_max)
-                self.spectrum_ax.set_ylim(amp_min, amp_max)
                 self.spectrum_canvas.draw()
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to apply zoom: {str(e)}")
@@ -1747,17 +2189,14 @@ class HealthcareApp(QMainWindow):
     def reset_fft_zoom(self):
         if hasattr(self, 'spectrum_ax') and len(self.spectrum_ax.lines) > 0:
             try:
-                self.spectrum_ax.relim()
-                self.spectrum_ax.autoscale()
+                # Back to the full spectrum range (re-decimated by the line's xlim callback)
+                self.spectrum_ax.set_xlim(self.decimated_extents[self.spectrum_ax])
                 self.spectrum_canvas.draw()
                 
                 freq_min, freq_max = self.spectrum_ax.get_xlim()
-                amp_min, amp_max = self.spectrum_ax.get_ylim()
                 
                 self.freq_min_input.setValue(freq_min)
                 self.freq_max_input.setValue(freq_max)
-                self.amp_min_input.setValue(amp_min)
-                self.amp_max_input.setValue(amp_max)
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to reset zoom: {str(e)}")
         else:
@@ -2077,27 +2516,28 @@ class HealthcareApp(QMainWindow):
             QMessageBox.warning(self, "Save Error", "No active record linked to this image. Please select an image from the list first.")
             return
 
-        try:
-            success, buffer = cv2.imencode(".png", self.processed_cv_image)
-            if not success:
-                raise ValueError("Image encoding failed")
-            
-            image_bytes = buffer.tobytes()
+        # Writes are never coalesced (key=None); the worker gets its own copy of the pixels
+        self._run_task(None, self._store_processed_image, self._on_processed_image_saved,
+                       "Error", "Failed to save image",
+                       self.processed_cv_image.copy(), self.current_report_id)
+
+    def _store_processed_image(self, token, image, report_id):
+        """Background step: PNG-encodes the image and writes it to the record."""
+        success, buffer = cv2.imencode(".png", image)
+        if not success:
+            raise ValueError("Image encoding failed")
+        return self.db_manager.for_thread().update_processed_image(report_id, buffer.tobytes())
 
-            success = self.db_manager.update_processed_image(self.current_report_id, image_bytes)
+    def _on_processed_image_saved(self, success):
+        if success:
+            if self.db_manager:
+                self.db_retrieve_data()
             
-            if success:
-                if self.db_manager:
-                    self.db_retrieve_data()
-                
-                QMessageBox.information(self, "Success", "Processed image saved to database successfully.")
-                
-                self.update_viz_image()
-            else:
-                QMessageBox.critical(self, "Error", "Failed to update database record. Ensure update_processed_image exists in DB Manager.")
-                
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to save image: {str(e)}")
+            QMessageBox.information(self, "Success", "Processed image saved to database successfully.")
+            
+            self.update_viz_image()
+        else:
+            QMessageBox.critical(self, "Error", "Failed to update database record. Ensure update_processed_image exists in DB Manager.")
 
     def reset_image_view(self):
         self.original_image_label.clear()
@@ -2239,87 +2679,160 @@ class HealthcareApp(QMainWindow):
             self.viz_image_label.setText("Please enter a Patient ID in the input box.")
             return
 
-        try:
-            records = self.db_manager.get_patient_images(int(patient_id))
-            if not records:
-                self.viz_image_label.setText(f"No images found for Patient {patient_id}.")
-                return
+        # 1. Record lookup on a worker; the record picker dialog stays on the UI thread
+        self._run_task('viz_image', self._load_viz_image_records, self._choose_viz_image_record,
+                       None, None, int(patient_id), on_error=self._show_viz_image_error)
 
-            if len(records) > 1:
-                options = [f"Record {r[0]} (Latest)" if i == len(records)-1 else f"Record {r[0]}" 
-                           for i, r in enumerate(records)]
-                
-                item, ok = QInputDialog.getItem(self, "Select Image", 
-                                                f"Multiple images found for Patient {patient_id}:", 
-                                                options, len(options)-1, False)
-                if ok and item:
-                    selected_index = options.index(item)
-                    target_report_id = records[selected_index][0]
-                else:
-                    target_report_id = records[-1][0]
-            else:
-                target_report_id = records[-1][0]
-            orig_blob, proc_blob = self.db_manager.get_both_images(target_report_id)
-            
-            if orig_blob and proc_blob:
-                orig_img = cv2.imdecode(np.frombuffer(orig_blob, np.uint8), cv2.IMREAD_COLOR)
-                proc_img = cv2.imdecode(np.frombuffer(proc_blob, np.uint8), cv2.IMREAD_COLOR)
+    def _load_viz_image_records(self, token, patient_id):
+        return patient_id, self.db_manager.for_thread().get_patient_images(patient_id)
 
-                if orig_img is not None and proc_img is not None:
-                    if len(proc_img.shape) == 2:
-                        proc_img = cv2.cvtColor(proc_img, cv2.COLOR_GRAY2BGR)
-
-                    h1, w1 = orig_img.shape[:2]
-                    h2, w2 = proc_img.shape[:2]
-                    if h1 != h2:
-                        proc_img = cv2.resize(proc_img, (int(w2 * h1 / h2), h1))
+    def _choose_viz_image_record(self, result):
+        patient_id, records = result
+        if not records:
+            self.viz_image_label.setText(f"No images found for Patient {patient_id}.")
+            return
 
-                    combined = np.hstack((orig_img, proc_img))
-                    
-                    h, w, ch = combined.shape
-                    qimg = QImage(combined.data, w, h, w * ch, QImage.Format_RGB888).rgbSwapped()
-                    
-                    self.viz_image_label.setPixmap(QPixmap.fromImage(qimg).scaled(
-                        self.viz_image_label.width(), 
-                        self.viz_image_label.height(), 
-                        Qt.KeepAspectRatio))
-                    
-                    self.status_label.setText(f"Viewing Record ID: {target_report_id} for Patient {patient_id}")
-                else:
-                    self.viz_image_label.setText("Error: Could not decode images.")
+        if len(records) > 1:
+            options = [f"Record {r[0]} (Latest)" if i == len(records)-1 else f"Record {r[0]}" 
+                       for i, r in enumerate(records)]
+            
+            item, ok = QInputDialog.getItem(self, "Select Image", 
+                                            f"Multiple images found for Patient {patient_id}:", 
+                                            options, len(options)-1, False)
+            if ok and item:
+                selected_index = options.index(item)
+                target_report_id = records[selected_index][0]
             else:
-                self.viz_image_label.setText(f"Missing data for Record {target_report_id}.")
-                
-        except Exception as e:
-            print(f"Viz Update Error: {e}")
-            self.viz_image_label.setText(f"Error: {str(e)}")
+                target_report_id = records[-1][0]
+        else:
+            target_report_id = records[-1][0]
+
+        # 2. Fetch, decode and compose the side-by-side image on a worker
+        self._run_task('viz_image', self._compose_viz_image, self._render_viz_image,
+                       None, None, patient_id, target_report_id, on_error=self._show_viz_image_error)
+
+    def _compose_viz_image(self, token, patient_id, target_report_id):
+        """Background step: decodes both images and stitches them into one QImage."""
+        orig_blob, proc_blob = self.db_manager.for_thread().get_both_images(target_report_id)
+        if not (orig_blob and proc_blob):
+            raise TaskWarning("Missing Data", f"Missing data for Record {target_report_id}.")
+
+        orig_img = cv2.imdecode(np.frombuffer(orig_blob, np.uint8), cv2.IMREAD_COLOR)
+        proc_img = cv2.imdecode(np.frombuffer(proc_blob, np.uint8), cv2.IMREAD_COLOR)
+        if orig_img is None or proc_img is None:
+            raise TaskWarning("Decode Error", "Error: Could not decode images.")
+        token.raise_if_cancelled()
+
+        if len(proc_img.shape) == 2:
+            proc_img = cv2.cvtColor(proc_img, cv2.COLOR_GRAY2BGR)
+
+        h1, w1 = orig_img.shape[:2]
+        h2, w2 = proc_img.shape[:2]
+        if h1 != h2:
+            proc_img = cv2.resize(proc_img, (int(w2 * h1 / h2), h1))
+
+        combined = np.hstack((orig_img, proc_img))
+        
+        # QImage (unlike QPixmap) may be built off the GUI thread; rgbSwapped() returns
+        # a copy that owns its pixels, so it outlives the numpy buffer
+        h, w, ch = combined.shape
+        qimg = QImage(combined.data, w, h, w * ch, QImage.Format_RGB888).rgbSwapped()
+        return patient_id, target_report_id, qimg
+
+    def _render_viz_image(self, result):
+        patient_id, target_report_id, qimg = result
+        self.viz_image_label.setPixmap(QPixmap.fromImage(qimg).scaled(
+            self.viz_image_label.width(), 
+            self.viz_image_label.height(), 
+            Qt.KeepAspectRatio))
+        
+        self.status_label.setText(f"Viewing Record ID: {target_report_id} for Patient {patient_id}")
+
+    def _show_viz_image_error(self, error):
+        if not isinstance(error, TaskWarning):
+            print(f"Viz Update Error: {error}")
+            error = f"Error: {error}"
+        self.viz_image_label.setText(str(error))
 
     def run_ma(self):
-        col = self.ts_analysis_column.currentText()
-        win = self.ma_window.value()
-        
-        target_df = getattr(self, 'current_patient_analysis_df', self.df)
-        
-        if target_df is None or target_df.empty or col not in target_df.columns:
-            self.analysis_status_label.setText("Error: No data available for plotting.")
-            return
+        col = self.ts_analysis_column.currentText().replace(' ', '_')
+        selected_id = self.analysis_patient_id.currentText().strip()
+        # No patient selected: the cohort's distribution on its own
+        patient_id = int(selected_id) if selected_id.isdigit() else None
+        self._run_task('analysis_plot', self._compute_metric_trend, self._render_ma,
+                       "Analysis Error", "Failed to compute the trend",
+                       patient_id, col, self.ma_window.value(), True)
 
-        from data_analyzer import apply_moving_average
-        self.filtered_df = apply_moving_average(target_df, col, win)
-        
+    def _compute_metric_trend(self, token, patient_id, metric, window, with_cohort):
+        """
+        Background step: a patient's series and moving average from the stored time series,
+        and/or the cohort's percentile bands (cached) over the same periods.
+        """
+        if metric not in NUMERIC_METRIC_COLUMNS:
+            raise TaskWarning("Column Error", f"'{metric.replace('_', ' ')}' has no stored time series.")
+        db = self.db_manager.for_thread()
+
+        series = None
+        if patient_id is not None:
+            series = db.get_metric_series(metric, patient_id, window=window)
+            if series.empty:
+                raise TaskWarning("No Data", f"No dated {metric.replace('_', ' ')} records for Patient {patient_id}.")
+
+        bands = None
+        if with_cohort:
+            bands = db.get_cohort_bands(metric)
+            if series is not None:
+                # Only the periods the patient's history spans
+                first = np.datetime64(series['timestamp'].iloc[0], DEFAULT_BAND_FREQ)
+                bands = bands[(bands.index >= first) & (bands.index <= series['timestamp'].iloc[-1])]
+            if series is None and bands.empty:
+                raise TaskWarning("No Data", f"No dated {metric.replace('_', ' ')} records stored.")
+        return patient_id, metric, window, series, bands
+
+    def _draw_metric_trend(self, ax, result, show_raw=True):
+        patient_id, metric, window, series, bands = result
+        label = metric.replace('_', ' ')
+        if bands is not None and not bands.empty:
+            # Each period's band spans from its start to the next period's start
+            last = np.datetime64(bands.index[-1], DEFAULT_BAND_FREQ) + 1
+            edges = np.append(bands.index.values, last.astype('datetime64[ns]'))
+
+            def band(column):
+                return np.append(bands[column].values, bands[column].values[-1])
+
+            ax.fill_between(edges, band('p5'), band('p95'), step='post', color='#D5DBDB', alpha=0.6,
+                            label='Cohort 5th-95th pct')
+            ax.fill_between(edges, band('p25'), band('p75'), step='post', color='#AAB7B8', alpha=0.6,
+                            label='Cohort 25th-75th pct')
+            ax.step(edges, band('p50'), where='post', color='#7F8C8D', linestyle='--', linewidth=1.5,
+                    label='Cohort median')
+
+        if series is not None:
+            if show_raw:
+                ax.plot(series['timestamp'], series['value'], marker='o', color='#27AE60', linewidth=1,
+                        alpha=0.7, label=f"{label} (Patient {patient_id})")
+            if 'trend' in series.columns:
+                ax.plot(series['timestamp'], series['trend'], color='#3498DB', linewidth=2,
+                        label=f"Trend ({window}pt MA)")
+
+        ax.set_xlabel("Date Recorded")
+        ax.set_ylabel(label)
+        ax.grid(True, linestyle='--', alpha=0.5)
+        ax.legend(loc='upper right', fontsize=8)
+
+    def _render_ma(self, result):
+        patient_id, metric, window, series, bands = result
         self.analysis_ax.clear()
-        
-        if self.ts_raw_checkbox.isChecked():
-            self.analysis_ax.plot(target_df[col].values, label="Raw History", alpha=0.4, color='gray', marker='o')
-        
-        self.analysis_ax.plot(self.filtered_df[f'{col}_smoothed'].values, 
-                            label=f"Trend ({win}pt MA)", color='#3498DB', linewidth=2)
-        
-        self.analysis_ax.legend()
-        self.analysis_ax.set_title(f"Patient {self.analysis_patient_id.currentText()} - {col} Trend")
-        self.analysis_ax.set_xlabel("Time (Record Sequence)")
-        self.analysis_ax.set_ylabel(col)
-        self.analysis_canvas.draw()
+        self._draw_metric_trend(self.analysis_ax, result, show_raw=self.ts_raw_checkbox.isChecked())
+        scope = f"Patient {patient_id}" if patient_id is not None else "Cohort"
+        self.analysis_ax.set_title(f"{scope} - {metric.replace('_', ' ')} Trend")
+        self.analysis_figure.autofmt_xdate()
+        self.analysis_canvas.draw_idle()
+
+        if series is not None:
+            self.analysis_status_label.setText(f"Trend of {len(series)} records for Patient {patient_id}.")
+        else:
+            self.analysis_status_label.setText(f"Cohort bands over {int(bands['patients'].max())} patients per period.")
 
     def run_threshold_filter(self):
         col = self.ts_analysis_column.currentText()
@@ -2390,8 +2903,19 @@ class HealthcareApp(QMainWindow):
         self.ts_plot_btn.setObjectName("TimeSeriesButton")
         self.ts_plot_btn.clicked.connect(self.plot_timeseries_viz_bridge)
         
+        self.ts_window_spin = QSpinBox()
+        self.ts_window_spin.setRange(1, 30)
+        self.ts_window_spin.setValue(3)
+        self.ts_window_spin.setPrefix("Trend window: ")
+        self.ts_window_spin.setSpecialValueText("Trend: off")
+        self.ts_cohort_checkbox = QCheckBox("Cohort band")
+        self.ts_cohort_checkbox.setChecked(True)
+        self.ts_cohort_checkbox.setToolTip("Overlay the population's percentile bands for this metric.")
+
         controls_group_layout.addWidget(QLabel("Time-Series:"), 2, 0)
-        controls_group_layout.addWidget(self.ts_column_combo, 2, 1, 1, 3)
+        controls_group_layout.addWidget(self.ts_column_combo, 2, 1)
+        controls_group_layout.addWidget(self.ts_window_spin, 2, 2)
+        controls_group_layout.addWidget(self.ts_cohort_checkbox, 2, 3)
         controls_group_layout.addWidget(self.ts_plot_btn, 2, 4)
 
         self.fft_column_combo = QComboBox()
@@ -2413,13 +2937,22 @@ class HealthcareApp(QMainWindow):
         self.heatmap_btn = QPushButton("Show Correlation Heatmap")
         self.heatmap_btn.setObjectName("VizHeatmapButton")
         self.heatmap_btn.clicked.connect(self.plot_heatmap)
+        self.heatmap_verify_checkbox = QCheckBox("Recompute from scratch")
+        self.heatmap_verify_checkbox.setToolTip("Rebuilds the running correlation statistics with a full table scan "
+                                                "and reports how far the maintained ones had drifted.")
         
         self.img_proc_btn = QPushButton("Process Medical Image")
         self.img_proc_btn.setObjectName("ProcessImageButton")
         self.img_proc_btn.clicked.connect(self.process_medical_image_viz_refresh)
         
+        self.eeg_bands_btn = QPushButton("Plot EEG Band Trends")
+        self.eeg_bands_btn.setObjectName("EEGBandsButton")
+        self.eeg_bands_btn.clicked.connect(self.plot_eeg_bands_viz_bridge)
+        
         viz_buttons_layout.addWidget(self.heatmap_btn)
+        viz_buttons_layout.addWidget(self.heatmap_verify_checkbox)
         viz_buttons_layout.addWidget(self.img_proc_btn)
+        viz_buttons_layout.addWidget(self.eeg_bands_btn)
         
         viz_buttons_layout.addStretch()
 
@@ -2427,8 +2960,7 @@ class HealthcareApp(QMainWindow):
 
         layout.addWidget(controls_group)
         
-        self.viz_figure = Figure(figsize=(10, 8))
-        self.viz_canvas = FigureCanvas(self.viz_figure)
+        self.viz_figure, self.viz_canvas = self._new_figure_canvas((10, 8))
         self.viz_ax = self.viz_figure.add_subplot(111) 
         
         viz_scroll = QScrollArea()
@@ -2465,144 +2997,160 @@ class HealthcareApp(QMainWindow):
         return panel
     
     def plot_fft_viz_bridge(self):
-        p_data = self.get_viz_patient_data()
-        
-        if p_data is None or p_data.empty:
-            QMessageBox.warning(self, "Data Error", "No data found for this Patient ID.")
+        p_id = self._viz_patient_id()
+        if p_id is None:
             return
+        self._run_task('viz_fft', self._compute_viz_fft, self._render_viz_fft,
+                       "Processing Error", "Failed", p_id, self.fft_column_combo.currentText())
 
-        signal_type = self.fft_column_combo.currentText()
+    def _compute_viz_fft(self, token, patient_id, signal_type):
+        """Background step: denoised FFT (cached) of the patient's newest stored signal."""
+        db = self.db_manager.for_thread()
+        p_data = self._load_viz_patient_data(db, patient_id)
         target_col = f"{signal_type}_Signal" if f"{signal_type}_Signal" in p_data.columns else signal_type
 
-        try:
-            valid_rows = p_data[
-                p_data[target_col].notna() & 
-                (p_data[target_col].astype(str) != 'None') & 
-                (p_data[target_col].astype(str).str.strip() != '')
-            ]
-
-            if valid_rows.empty:
-                QMessageBox.warning(self, "Missing Data", f"No raw {signal_type} signal found in history to analyze.")
-                return
+        valid_rows = p_data[p_data[target_col].map(signal_length) > 0]
+        if valid_rows.empty:
+            raise TaskWarning("Missing Data", f"No raw {signal_type} signal found in history to analyze.")
+        token.raise_if_cancelled()
 
-            raw_val = valid_rows[target_col].iloc[-1]
-
-            signal_str = str(raw_val).strip()
-            clean_str = signal_str.replace('[', '').replace(']', '').replace('"', '').replace("'", "").replace("\n", "")
-            
-            if "," not in clean_str and " " in clean_str:
-                clean_str = clean_str.replace(" ", ",")
-            
-            signal_data = np.array([float(x) for x in clean_str.split(',') if x.strip()])
-            
-            denoised = fft_denoise_signal(signal_data)
-            n = len(denoised)
-            freqs = np.fft.rfftfreq(n, d=1/500)
-            magnitudes = np.abs(np.fft.rfft(denoised))
-
-            self.viz_figure.clear()
-            self.viz_ax = self.viz_figure.add_subplot(111)
-            self.viz_ax.plot(freqs, magnitudes, color='#E74C3C')
-            self.viz_ax.set_title(f"FFT Spectrum: {signal_type}")
-            self.viz_canvas.draw_idle()
-
-        except Exception as e:
-            QMessageBox.critical(self, "Processing Error", f"Failed: {str(e)}")
-
-    def get_viz_patient_data(self):
+        signal_data, sampling_rate = self._stored_signal(valid_rows.iloc[-1], target_col, db)
+        
+        n = len(signal_data)
+        magnitudes, _ = cached_spectrum(
+            db, hash_signal(signal_data, sampling_rate), 0, n,
+            FFT_DENOISED_MAGNITUDE, {'threshold_percent': 0.1},
+            lambda: np.abs(np.fft.rfft(fft_denoise_signal(signal_data))),
+            sampling_rate=sampling_rate, patient_id=valid_rows['patient_id'].iloc[-1],
+            report_id=valid_rows['report_id'].iloc[-1]
+        )
+        freqs = np.fft.rfftfreq(n, d=1.0 / sampling_rate)
+        return signal_type, freqs, magnitudes
+
+    def _render_viz_fft(self, result):
+        signal_type, freqs, magnitudes = result
+        self.viz_figure.clear()
+        self.viz_ax = self.viz_figure.add_subplot(111)
+        self.viz_ax.plot(freqs, magnitudes, color='#E74C3C')
+        self.viz_ax.set_title(f"FFT Spectrum: {signal_type}")
+        self.viz_canvas.draw_idle()
+
+    def plot_eeg_bands_viz_bridge(self):
+        """Plots the patient's stored EEG band powers (eeg_features) over time; nothing is recomputed."""
+        p_id_str = self.viz_patient_id_input.text().strip()
+        if not p_id_str.isdigit():
+            QMessageBox.warning(self, "Input Error", "Please enter a numeric Patient ID first.")
+            return
+        self._run_task('viz_eeg_bands', self._load_eeg_bands, self._render_eeg_bands,
+                       "Processing Error", "Failed to load EEG band powers", int(p_id_str))
+
+    def _load_eeg_bands(self, token, patient_id):
+        features = self.db_manager.for_thread().get_eeg_features(patient_id)
+        if features.empty:
+            raise TaskWarning("No EEG Features",
+                              f"No EEG band powers stored for Patient {patient_id}. Run eeg_batch.py first.")
+        features = features[features['error'].isna()]
+        if features.empty:
+            raise TaskWarning("No EEG Features", f"EEG analysis failed for every record of Patient {patient_id}.")
+        return patient_id, features
+
+    def _render_eeg_bands(self, result):
+        patient_id, features = result
+        bands = [band.lower() for band in EEG_BAND_NAMES]
+        # Relative power keeps recordings with different gains comparable
+        relative = features[bands].div(features[bands].sum(axis=1), axis=0)
+        labels = features['Date_Recorded'].fillna(features['report_id'].astype(str)).astype(str)
+
+        self.viz_figure.clear()
+        self.viz_ax = self.viz_figure.add_subplot(111)
+        for band, name in zip(bands, EEG_BAND_NAMES):
+            self.viz_ax.plot(range(len(relative)), relative[band].values, marker='o', label=name)
+        self.viz_ax.set_xticks(range(len(labels)))
+        self.viz_ax.set_xticklabels(labels, rotation=45, ha='right', fontsize=8)
+        self.viz_ax.set_ylabel("Relative Band Power")
+        self.viz_ax.set_title(f"EEG Band Power Trends: Patient {patient_id}")
+        self.viz_ax.legend()
+        self.viz_ax.grid(True, linestyle=':', alpha=0.6)
+        self.viz_figure.tight_layout()
+        self.viz_canvas.draw_idle()
+
+    def _viz_patient_id(self):
+        """The Visualization tab's patient ID as an int, or None after warning the user."""
         p_id_str = self.viz_patient_id_input.text().strip()
         if not p_id_str:
             QMessageBox.warning(self, "Input Error", "Please enter a Patient ID first.")
             return None
-        
-        try:
-            p_id = int(p_id_str)
-            p_data = self.db_manager.get_all_records_for_patient(p_id)
-            if p_data.empty:
-                QMessageBox.information(self, "No Data", f"No records found for Patient {p_id}")
-                return None
-            
-            p_data.columns = [c.replace(' ', '_') for c in p_data.columns]
-            return p_data.sort_values('Date_Recorded')
-        except Exception as e:
-            QMessageBox.warning(self, "Input Error", f"Error fetching patient data: {e}")
+        if not p_id_str.isdigit():
+            QMessageBox.warning(self, "Input Error", f"Error fetching patient data: invalid Patient ID '{p_id_str}'")
             return None
+        return int(p_id_str)
+
+    def _load_viz_patient_data(self, db, patient_id):
+        """Worker-side read of a patient's records, sorted by date; raises TaskWarning when there are none."""
+        p_data = db.get_all_records_for_patient(patient_id)
+        if p_data is None or p_data.empty:
+            raise TaskWarning("No Data", f"No records found for Patient {patient_id}")
+        
+        p_data.columns = [c.replace(' ', '_') for c in p_data.columns]
+        return p_data.sort_values('Date_Recorded')
 
     def plot_correlation_viz_bridge(self):
-        p_data = self.get_viz_patient_data()
-        if p_data is None or p_data.empty: 
-            QMessageBox.warning(self, "No Data", "No records found for the selected Patient ID.")
+        p_id = self._viz_patient_id()
+        if p_id is None:
             return
         
         m1 = self.scatter_x_combo.currentText().replace(' ', '_')
         m2 = self.scatter_y_combo.currentText().replace(' ', '_')
-        
-        if m1 not in p_data.columns or m2 not in p_data.columns:
-            QMessageBox.warning(self, "Column Error", f"Metrics {m1} or {m2} not found in patient data.")
-            return
+        self._run_task('viz_correlation', self._load_viz_correlation, self._render_viz_correlation,
+                       "Plotting Error", "An error occurred while plotting", p_id, m1, m2)
 
-        try:
-            self.viz_figure.clear()
-            self.viz_ax = self.viz_figure.add_subplot(111)
-
-            sns.regplot(
-                x=m1, y=m2, data=p_data, 
-                ax=self.viz_ax, 
-                color='#3498DB', # Updated to a cleaner blue
-                scatter_kws={'s': 50, 'alpha': 0.6},
-                line_kws={'color': 'red', 'lw': 2}
-            )
-            
-            self.viz_ax.set_title(f"Correlation: {m1.replace('_', ' ')} vs {m2.replace('_', ' ')} (Patient {self.viz_patient_id_input.text()})")
-            self.viz_ax.set_xlabel(m1.replace('_', ' '))
-            self.viz_ax.set_ylabel(m2.replace('_', ' '))
-            self.viz_ax.grid(True, linestyle='--', alpha=0.5)
-            
-            self.viz_canvas.draw_idle() 
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Plotting Error", f"An error occurred while plotting: {str(e)}")
-
-    def plot_timeseries_viz_bridge(self):
-        p_data = self.get_viz_patient_data()
-        if p_data is None or p_data.empty:
-            QMessageBox.warning(self, "No Data", "No records found for this patient.")
-            return
+    def _load_viz_correlation(self, token, patient_id, m1, m2):
+        p_data = self._load_viz_patient_data(self.db_manager.for_thread(), patient_id)
+        if m1 not in p_data.columns or m2 not in p_data.columns:
+            raise TaskWarning("Column Error", f"Metrics {m1} or {m2} not found in patient data.")
+        # Only the two metrics reach the UI thread, not the stored signals
+        return patient_id, m1, m2, p_data[[m1, m2]]
+
+    def _render_viz_correlation(self, result):
+        patient_id, m1, m2, p_data = result
+        self.viz_figure.clear()
+        self.viz_ax = self.viz_figure.add_subplot(111)
+
+        sns.regplot(
+            x=m1, y=m2, data=p_data, 
+            ax=self.viz_ax, 
+            color='#3498DB', # Updated to a cleaner blue
+            scatter_kws={'s': 50, 'alpha': 0.6},
+            line_kws={'color': 'red', 'lw': 2}
+        )
         
-        metric = self.ts_column_combo.currentText().replace(' ', '_')
+        self.viz_ax.set_title(f"Correlation: {m1.replace('_', ' ')} vs {m2.replace('_', ' ')} (Patient {patient_id})")
+        self.viz_ax.set_xlabel(m1.replace('_', ' '))
+        self.viz_ax.set_ylabel(m2.replace('_', ' '))
+        self.viz_ax.grid(True, linestyle='--', alpha=0.5)
         
-        if metric not in p_data.columns:
-            QMessageBox.warning(self, "Column Error", f"Column '{metric}' not found in patient data.")
-            return
-
-        try:
-            p_data['Date_Recorded'] = pd.to_datetime(p_data['Date_Recorded'], format='mixed')
-            p_data = p_data.sort_values('Date_Recorded')
-            
-            self.viz_figure.clear()
-            self.viz_ax = self.viz_figure.add_subplot(111)
+        self.viz_canvas.draw_idle() 
 
-            self.viz_ax.plot(
-                p_data['Date_Recorded'], 
-                p_data[metric], 
-                marker='o', 
-                color='#27AE60',  # Green shade
-                linewidth=2,
-                label=metric.replace('_', ' ')
-            )
-            
-            self.viz_ax.set_title(f"Historical Trend: {metric.replace('_', ' ')} (Patient {self.viz_patient_id_input.text()})")
-            self.viz_ax.set_xlabel("Date Recorded")
-            self.viz_ax.set_ylabel(metric.replace('_', ' '))
-            self.viz_ax.grid(True, linestyle='--', alpha=0.5)
-            self.viz_ax.legend()
-            
-            self.viz_figure.autofmt_xdate()
-            
-            self.viz_canvas.draw_idle()
+    def plot_timeseries_viz_bridge(self):
+        p_id_str = self.viz_patient_id_input.text().strip()
+        if not p_id_str.isdigit():
+            QMessageBox.warning(self, "Input Error", "Please enter a numeric Patient ID first.")
+            return
 
-        except Exception as e:
-            QMessageBox.critical(self, "Plotting Error", f"Failed to plot time series: {str(e)}")
+        metric = self.ts_column_combo.currentText().replace(' ', '_')
+        # Dates are parsed once into the metric_series table, not on every click
+        self._run_task('viz_timeseries', self._compute_metric_trend, self._render_timeseries_viz,
+                       "Plotting Error", "Failed to plot time series",
+                       int(p_id_str), metric, self.ts_window_spin.value(), self.ts_cohort_checkbox.isChecked())
+
+    def _render_timeseries_viz(self, result):
+        patient_id, metric = result[:2]
+        self.viz_figure.clear()
+        self.viz_ax = self.viz_figure.add_subplot(111)
+        self._draw_metric_trend(self.viz_ax, result)
+        self.viz_ax.set_title(f"Historical Trend: {metric.replace('_', ' ')} (Patient {patient_id})")
+        self.viz_figure.autofmt_xdate()
+        self.viz_canvas.draw_idle()
 
     def process_medical_image_viz_refresh(self):
         if self.db_manager:
@@ -2625,24 +3173,22 @@ class HealthcareApp(QMainWindow):
             QMessageBox.warning(self, "No Data", "Please load data first.")
             return
 
+        # Read from the running pair statistics; the verification rebuild scans the table
+        self._run_task('viz_heatmap', self._compute_global_correlation, self._render_global_correlation,
+                       "Heatmap Error", "An error occurred", self.heatmap_verify_checkbox.isChecked())
+
+    def _compute_global_correlation(self, token, verify):
+        """Background step: correlation matrix of every metric with data and spread."""
+        corr_matrix, drift = self.db_manager.for_thread().get_global_correlation(verify=verify)
+        if corr_matrix.empty:
+            raise TaskWarning("Calculation Error", "No valid numerical health data available.")
+        return corr_matrix, drift
+
+    def _render_global_correlation(self, result):
+        corr_matrix, drift = result
+        if drift is not None:
+            self.status_label.setText(f"Correlation statistics recomputed; maintained values differed by at most {drift:.2e}.")
         try:
-            numeric_df = self.df.select_dtypes(include=[np.number]).copy()
-            id_blacklist = [
-                'patient_id', 'report_id', 'Patient ID', 'Report ID', 
-                'Patient_ID', 'Report_ID', 'id', 'ID'
-            ]
-            
-            cols_to_keep = [c for c in numeric_df.columns if c not in id_blacklist]
-            numeric_df = numeric_df[cols_to_keep]
-            numeric_df = numeric_df.dropna(axis=1, how='all')
-            numeric_df = numeric_df.loc[:, numeric_df.std() > 0]
-
-            if numeric_df.empty:
-                QMessageBox.warning(self, "Calculation Error", "No valid numerical health data available.")
-                return
-
-            corr_matrix = numeric_df.corr()
-
             self.viz_figure.clear()
             ax = self.viz_figure.add_subplot(111)
 
@@ -2663,11 +3209,15 @@ class HealthcareApp(QMainWindow):
             QMessageBox.critical(self, "Heatmap Error", f"An error occurred: {str(e)}")
 
     def load_next_page(self):
+        if not self.page_cursors.get('last'):
+            return
+        self.page_anchor = ('after', self.page_cursors['last'])
         self.current_page += 1
         self.db_retrieve_data()
 
     def load_previous_page(self):
-        if self.current_page > 0:
+        if self.current_page > 0 and self.page_cursors.get('first'):
+            self.page_anchor = ('before', self.page_cursors['first'])
             self.current_page -= 1
             self.db_retrieve_data()
 
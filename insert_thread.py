@@ -1,58 +1,181 @@
 from PyQt5.QtCore import QThread, pyqtSignal
-import sqlite3
+import io
+import os
+import time
+import hashlib
 import pandas as pd
 
-class InsertDataThread(QThread):
-    progress = pyqtSignal(str)
+from database_manager import DatabaseManager
 
-    def __init__(self, db_path, df_source):
+
+def iter_csv_records(csv_file, chunksize):
+    """
+    Yields (raw bytes, record count) for up to chunksize CSV records at a time from the
+    file's current position. A newline inside a quoted field stays in its record (quote
+    parity), and blank lines are not counted, so the counts match pandas' rows and the
+    bytes consumed are known exactly.
+    """
+    lines, records, quotes = [], 0, 0
+    for line in csv_file:
+        lines.append(line)
+        quotes += line.count(b'"')
+        if quotes % 2 == 0:
+            if line.strip():
+                records += 1
+            if records == chunksize:
+                yield b''.join(lines), records
+                lines, records, quotes = [], 0, 0
+    if lines:
+        yield b''.join(lines), records + (1 if quotes % 2 else 0)
+
+
+class CsvImportThread(QThread):
+    """
+    Streams a CSV file into the database in fixed-size chunks.
+    Each chunk is committed in its own transaction, so cancelling never leaves a
+    half-written chunk behind and memory stays bounded by the chunk size.
+    """
+    progress = pyqtSignal(dict)
+    finished_import = pyqtSignal(dict)
+
+    def __init__(self, db_path, csv_path, chunksize=5000):
         super().__init__()
         self.db_path = db_path
-        self.df_source = df_source
+        self.csv_path = csv_path
+        self.chunksize = chunksize
+        self.skip_reason = None
+
+    def cancel(self):
+        """Requests a stop; the chunk currently being written is still committed."""
+        self.requestInterruption()
+
+    def _start_position(self, db, csv_file, header):
+        """
+        (data rows, bytes) already imported; None skips the import (reason in skip_reason).
+        csv_file is positioned just after the header.
+        """
+        return 0, len(header)
+
+    def _insert_chunk(self, db, chunk, end_offset, end_byte, raw):
+        # insert_patient_data normalizes headers and commits the chunk atomically
+        return db.insert_patient_data(chunk)
 
     def run(self):
-        self.progress.emit("Inserting data into database...")
+        stats = {
+            'source': os.path.basename(self.csv_path),
+            'rows': 0,
+            'skipped_rows': 0,
+            'bytes': 0,
+            'total_bytes': os.path.getsize(self.csv_path),
+            'rows_per_sec': 0.0,
+            'cancelled': False,
+            'error': None,
+            'note': None,
+        }
+        start_time = time.perf_counter()
+        # SQLite connections are bound to the thread that opened them
+        db = DatabaseManager(db_name=self.db_path)
+
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            selected_columns = [
-                'Age', 'Gender', 'Blood Pressure', 'Cholesterol Level', 'BMI', 'Sleep Hours',
-                'Triglyceride Level', 'Fasting Blood Sugar', 'CRP Level', 'Homocysteine Level', 'Heart Disease Status'
-            ]
-            df = self.df_source[selected_columns].copy()
-            df.rename(columns={
-                'Blood Pressure': 'Blood_Pressure',
-                'Cholesterol Level': 'Cholesterol_Level',
-                'Sleep Hours': 'Sleep_Hours',
-                'Triglyceride Level': 'Triglyceride_Level',
-                'Fasting Blood Sugar': 'Fasting_Blood_Sugar',
-                'CRP Level': 'CRP_Level',
-                'Homocysteine Level': 'Homocysteine_Level',
-                'Heart Disease Status': 'Heart_Disease_Status'
-            }, inplace=True)
-
-            for col in ['Age', 'Blood_Pressure', 'Cholesterol_Level', 'BMI', 'Sleep_Hours',
-                        'Triglyceride_Level', 'Fasting_Blood_Sugar', 'CRP_Level', 'Homocysteine_Level']:
-                if df[col].isnull().any():
-                    df[col].fillna(df[col].median(), inplace=True)
-
-            for col in ['Gender', 'Heart_Disease_Status']:
-                if df[col].isnull().any():
-                    df[col].fillna(df[col].mode()[0], inplace=True)
-
-            data_to_insert = [tuple(row) for row in df.itertuples(index=False)]
-
-            columns_str = ', '.join(df.columns)
-            placeholders = ', '.join(['?' for _ in df.columns])
-            insert_sql = f"INSERT INTO patient_health_metrics ({columns_str}) VALUES ({placeholders})"
-
-            cursor.executemany(insert_sql, data_to_insert)
-            conn.commit()
-            cursor.close()
-            conn.close()
-
-            self.progress.emit(f"Successfully inserted {len(data_to_insert)} rows into patient_health_metrics!")
+            with open(self.csv_path, 'rb') as csv_file:
+                header = csv_file.readline()
+                position = self._start_position(db, csv_file, header)
+                if position is None:
+                    stats['note'] = self.skip_reason
+                    print(f"{stats['source']}: {self.skip_reason}")
+                    self.finished_import.emit(stats)
+                    return
+                row_offset, byte_offset = position
+                stats['skipped_rows'] = row_offset
+                csv_file.seek(byte_offset)
+
+                # Records are split off as raw bytes, so every chunk ends at a known file offset
+                for raw, records in iter_csv_records(csv_file, self.chunksize):
+                    if self.isInterruptionRequested():
+                        stats['cancelled'] = True
+                        break
+
+                    byte_offset += len(raw)
+                    chunk = pd.read_csv(io.BytesIO(header + raw))
+                    if chunk.empty:
+                        continue
+
+                    # Keep row numbers file-relative so fallback patient names stay stable on resume
+                    chunk.index = chunk.index + row_offset
+                    row_offset += len(chunk)
 
+                    inserted = self._insert_chunk(db, chunk, row_offset, byte_offset, raw)
+                    if inserted == 0:
+                        stats['error'] = f"Chunk starting at row {chunk.index[0]} could not be inserted."
+                        break
+
+                    elapsed = time.perf_counter() - start_time
+                    stats['rows'] += inserted
+                    stats['bytes'] = byte_offset
+                    stats['rows_per_sec'] = stats['rows'] / elapsed if elapsed > 0 else 0.0
+                    self.progress.emit(dict(stats))
+
+                    if self.isInterruptionRequested():
+                        stats['cancelled'] = True
+                        break
         except Exception as e:
-            self.progress.emit(f"Error inserting data: {e}")
+            stats['error'] = str(e)
+        finally:
+            db.close_connection()
+
+        self.finished_import.emit(stats)
+
+
+class InsertDataThread(CsvImportThread):
+    """
+    Background ingest of the bundled dataset at startup.
+    Progress is checkpointed in the same transaction as each chunk: the rows and bytes
+    imported and a hash of that byte prefix. The checkpoint is keyed on the file's content
+    (header and first record), not its path, so a moved checkout still matches it.
+    A restart resumes after the prefix while it is unchanged (rows only appended), and an
+    already-loaded file performs no inserts at all. A source that changed in place, or a
+    populated database without a checkpoint, is not imported again.
+    """
+
+    def __init__(self, db_path, csv_path, chunksize=5000):
+        super().__init__(db_path, csv_path, chunksize)
+        self.source = None
+        self._prefix_digest = None
+
+    def _start_position(self, db, csv_file, header):
+        first_record = csv_file.readline()
+        self.source = hashlib.sha256(header + first_record).hexdigest()
+
+        checkpoint = db.get_ingest_checkpoint(self.source)
+        if checkpoint is None:
+            if db.get_total_count() > 0:
+                self.skip_reason = ("no import checkpoint, but the database already holds records; "
+                                    "use File > Load Data to add it explicitly")
+                return None
+            self._prefix_digest = hashlib.sha256(header)
+            return 0, len(header)
+
+        prefix_hash, row_offset, byte_offset = checkpoint
+        csv_file.seek(0)
+        digest = hashlib.sha256()
+        remaining = byte_offset or 0
+        while remaining > 0:
+            block = csv_file.read(min(remaining, 1 << 20))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+        if byte_offset is None or remaining > 0 or digest.hexdigest() != prefix_hash:
+            self.skip_reason = "the file changed since the last import (not an append); not importing it again"
+            return None
+
+        self._prefix_digest = digest
+        return row_offset, byte_offset
+
+    def _insert_chunk(self, db, chunk, end_offset, end_byte, raw):
+        digest = self._prefix_digest.copy()
+        digest.update(raw)
+        inserted = db.insert_patient_data(chunk, checkpoint=(self.source, digest.hexdigest(), end_offset, end_byte))
+        if inserted:
+            self._prefix_digest = digest
+        return inserted
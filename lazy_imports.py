@@ -0,0 +1,44 @@
+import importlib
+import sys
+import threading
+import time
+
+# Module name -> seconds its deferred import took
+import_times = {}
+_import_lock = threading.Lock()
+
+
+def load_module(name):
+    """Imports a module, recording how long the first import took."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    with _import_lock:
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        elapsed = time.perf_counter() - start
+        if name not in import_times:
+            import_times[name] = elapsed
+            print(f"Loaded {name} on first use in {elapsed:.2f} s")
+    return module
+
+
+class LazyModule:
+    """
+    Stand-in for a heavy module (neurokit2, seaborn, scipy.signal, cv2...): the real
+    import runs on first attribute access, so sessions that never reach the feature
+    never pay for it. Call sites keep the usual `nk.ecg_process(...)` form.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = load_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
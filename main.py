@@ -1,11 +1,19 @@
 # main.py (MODIFIED)
 import sys
 import os
+import time
+STARTUP_T0 = time.perf_counter()
+from PyQt5.QtCore import QObject, QEvent
 from PyQt5.QtWidgets import QApplication, QMessageBox
 from data_analyzer import load_data
 from gui_app import HealthcareApp  
 from database_manager import DatabaseManager
 from insert_thread import InsertDataThread
+IMPORT_SECONDS = time.perf_counter() - STARTUP_T0
+
+# Heavy modules that should stay unloaded until a feature needs them
+DEFERRED_MODULES = ("neurokit2", "seaborn", "matplotlib.pyplot", "matplotlib",
+                    "scipy.signal", "scipy.stats", "cv2")
 
 def load_qss(app, qss_path="styles.qss"):
     """Load QSS stylesheet if available (no crash if missing)."""
@@ -20,6 +28,33 @@ def load_qss(app, qss_path="styles.qss"):
     except Exception as e:
         print(f"Failed to load stylesheet: {e}")
 
+class FirstPaintTimer(QObject):
+    """Reports the startup phases once the main window has painted for the first time."""
+
+    def __init__(self, window, phases):
+        super().__init__(window)
+        self.window = window
+        self.phases = phases
+        window.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            self.window.removeEventFilter(self)
+            print_startup_report(self.phases, time.perf_counter() - STARTUP_T0)
+        return False
+
+def print_startup_report(phases, first_paint):
+    """Prints where cold start went and which heavy modules were kept out of it."""
+    print("Startup timings:")
+    for name, seconds in phases:
+        print(f"  {name}: {seconds:.3f} s")
+    print(f"  time to first paint: {first_paint:.3f} s")
+    loaded = [name for name in DEFERRED_MODULES if name in sys.modules]
+    deferred = [name for name in DEFERRED_MODULES if name not in sys.modules]
+    print(f"  deferred until first use: {', '.join(deferred) or 'none'}")
+    if loaded:
+        print(f"  loaded during startup: {', '.join(loaded)}")
+
 def safe_load_csv(path):
     """Load CSV with helpful errors."""
     try:
@@ -36,6 +71,8 @@ def safe_load_csv(path):
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    phases = [("imports", IMPORT_SECONDS)]
+    phase_start = time.perf_counter()
 
     load_qss(app, "styles.qss")
 
@@ -45,6 +82,8 @@ if __name__ == "__main__":
     except Exception as e:
         QMessageBox.critical(None, "Fatal Error", f"Failed to load CSV: {csv_path}\nError: {e}")
         sys.exit(1)
+    phases.append(("stylesheet and CSV", time.perf_counter() - phase_start))
+    phase_start = time.perf_counter()
 
     db_path = os.path.join(os.path.dirname(__file__), "health_metrics.db")
     db_manager = DatabaseManager(db_name=db_path)
@@ -55,7 +94,12 @@ if __name__ == "__main__":
         print(f"Error creating tables: {e}")
         QMessageBox.warning(None, "Database Error", f"Could not create tables: {e}")
 
+    phases.append(("database setup", time.perf_counter() - phase_start))
+    phase_start = time.perf_counter()
+
     main_window = HealthcareApp(df, db_manager=db_manager) 
+    phases.append(("main window", time.perf_counter() - phase_start))
+    FirstPaintTimer(main_window, phases)
     main_window.show()
 
     def update_status(message: str):
@@ -66,9 +110,32 @@ if __name__ == "__main__":
             pass
         print(message)
 
+    def on_ingest_progress(stats: dict):
+        update_status(
+            f"Background import of {stats['source']}: {stats['rows']:,} new rows "
+            f"({stats['bytes'] / 1e6:.1f} of {stats['total_bytes'] / 1e6:.1f} MB, "
+            f"{stats['rows_per_sec']:,.0f} rows/sec)"
+        )
+
+    def on_ingest_finished(stats: dict):
+        if stats['error']:
+            update_status(f"Background import of {stats['source']} failed: {stats['error']}")
+            return
+        if stats['note']:
+            update_status(f"Background import of {stats['source']} skipped: {stats['note']}.")
+            return
+        if stats['rows']:
+            main_window.db_retrieve_data()
+        update_status(
+            f"Background import of {stats['source']} complete: {stats['rows']:,} new rows, "
+            f"{stats['skipped_rows']:,} already loaded."
+        )
+
     try:
-        insert_thread = InsertDataThread(db_path, df)
-        insert_thread.progress.connect(update_status) 
+        insert_thread = InsertDataThread(db_path, csv_path)
+        insert_thread.progress.connect(on_ingest_progress)
+        insert_thread.finished_import.connect(on_ingest_finished)
+        insert_thread.start()
     except Exception as e:
         print(f"Failed to start insert thread: {e}")
         QMessageBox.warning(None, "Insert Error", "Failed to start background data insertion.")
@@ -0,0 +1,107 @@
+import struct
+import numpy as np
+
+# Accuracy parameter: rank error is roughly 1.7 / DEFAULT_K of the item count (~0.8%)
+DEFAULT_K = 200
+# Capacity shrinks by this factor per level below the top, as in the KLL paper
+CAPACITY_DECAY = 2.0 / 3.0
+MIN_CAPACITY = 8
+
+SKETCH_HEADER_FORMAT = '<IQI'  # k | items seen | number of levels
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang & Liberty): a stack of compactors where an item
+    at level h stands for 2**h inputs. A full compactor is sorted and every other item
+    (random offset) moves up a level, so memory stays O(k) however many values are
+    added, and sketches of separate batches merge into one. Updates take NumPy batches.
+    """
+
+    def __init__(self, k=DEFAULT_K):
+        self.k = int(k)
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng()
+
+    def __len__(self):
+        return self.n
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(MIN_CAPACITY, int(np.ceil(self.k * CAPACITY_DECAY ** depth)))
+
+    def update(self, values):
+        """Adds a batch of values; NaN/inf and non-numeric entries are ignored."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return self
+        self.n += len(values)
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Folds another sketch into this one (same k)."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate((self.levels[level], items))
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _compress(self):
+        # Lazy KLL: compact only while the sketch as a whole is over capacity,
+        # always at the lowest level that is full
+        while sum(len(items) for items in self.levels) > sum(self._capacity(h) for h in range(len(self.levels))):
+            level = next(h for h, items in enumerate(self.levels) if len(items) >= self._capacity(h))
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            # An odd item out stays behind; the rest halves into the next level
+            items = np.sort(self.levels[level])
+            leftover = items[:len(items) % 2]
+            paired = items[len(items) % 2:]
+            self.levels[level] = leftover
+            self.levels[level + 1] = np.concatenate((self.levels[level + 1], paired[self._rng.integers(2)::2]))
+
+    def quantiles(self, qs):
+        """Approximate quantiles for probabilities qs (array-like in [0, 1]); NaN when empty."""
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+        # Linear interpolation at position q * (n - 1), like np.quantile / pandas; an item
+        # of weight w sits at the centre of the w positions it stands for (exact while uncompacted)
+        ranks = cumulative - (weights[order] + 1.0) / 2.0
+        return np.interp(qs * (cumulative[-1] - 1.0), ranks, items)
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+    def to_bytes(self):
+        sizes = np.array([len(level) for level in self.levels], dtype='<i8')
+        header = struct.pack(SKETCH_HEADER_FORMAT, self.k, self.n, len(self.levels))
+        return header + sizes.tobytes() + np.concatenate(self.levels).astype('<f8').tobytes()
+
+    @classmethod
+    def from_bytes(cls, blob):
+        k, n, n_levels = struct.unpack_from(SKETCH_HEADER_FORMAT, blob)
+        offset = struct.calcsize(SKETCH_HEADER_FORMAT)
+        sizes = np.frombuffer(blob, dtype='<i8', count=n_levels, offset=offset)
+        values = np.frombuffer(blob, dtype='<f8', offset=offset + 8 * n_levels)
+        sketch = cls(k)
+        sketch.n = n
+        sketch.levels = [values[start:start + size].copy()
+                         for start, size in zip(np.concatenate(([0], np.cumsum(sizes)[:-1])), sizes)]
+        return sketch
+
+
+def iqr_bounds(q1, q3, factor):
+    """Tukey fences (q1 - factor * IQR, q3 + factor * IQR)."""
+    iqr = q3 - q1
+    return q1 - factor * iqr, q3 + factor * iqr
@@ -0,0 +1,16 @@
+# Query-plan regression check for the hot DatabaseManager queries.
+# Usage: python query_plan_check.py [path/to/health_metrics.db]
+# Exits non-zero if any query falls back to a full table scan.
+import sys
+from database_manager import DatabaseManager
+
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else ":memory:"
+    db = DatabaseManager(db_name=db_path)
+    failures = db.check_query_plans(verbose=True)
+    db.close_connection()
+
+    if failures:
+        print(f"FAILED: {len(failures)} query plan regression(s).")
+        sys.exit(1)
+    print("All hot queries use indexes.")
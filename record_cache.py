@@ -0,0 +1,116 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Default memory budget for cached patient histories (BLOB columns included)
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+_shared_caches = {}
+_shared_lock = threading.Lock()
+
+
+class PatientRecordCache:
+    """
+    Thread-safe LRU cache of per-patient record DataFrames, bounded by total byte size.
+    Every write path calls invalidate(patient_id); a per-key generation counter keeps a
+    read that raced with a write from storing its (now stale) result.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # patient_id -> (DataFrame, byte size)
+        self._generations = {}
+        self._epoch = 0  # bumped by clear()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @classmethod
+    def for_database(cls, db_name):
+        """One cache per database file, shared by every DatabaseManager in the process."""
+        if db_name == ':memory:':
+            return cls()
+        key = os.path.abspath(db_name)
+        with _shared_lock:
+            if key not in _shared_caches:
+                _shared_caches[key] = cls()
+            return _shared_caches[key]
+
+    def generation(self, patient_id):
+        with self._lock:
+            return self._epoch, self._generations.get(patient_id, 0)
+
+    def get(self, patient_id):
+        """Returns a copy of the cached DataFrame (callers may mutate it), or None."""
+        with self._lock:
+            entry = self._entries.get(patient_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(patient_id)
+            self.hits += 1
+            df = entry[0]
+        return df.copy()
+
+    def put(self, patient_id, df, generation):
+        """Stores df unless the patient was invalidated since `generation` was read."""
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+        stored = df.copy()
+        with self._lock:
+            if (self._epoch, self._generations.get(patient_id, 0)) != generation:
+                return
+            self._remove(patient_id)
+            self._entries[patient_id] = (stored, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, *patient_ids):
+        """Drops the given patients (ids may arrive as str/np.int64; None is ignored)."""
+        keys = []
+        for patient_id in patient_ids:
+            try:
+                keys.append(int(patient_id))
+            except (TypeError, ValueError):
+                continue
+        with self._lock:
+            for patient_id in keys:
+                self._generations[patient_id] = self._generations.get(patient_id, 0) + 1
+                if self._remove(patient_id):
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Counters for sizing the cache: hits, misses, evictions, invalidations, entries, bytes."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _remove(self, patient_id):
+        entry = self._entries.pop(patient_id, None)
+        if entry is None:
+            return False
+        self.current_bytes -= entry[1]
+        return True
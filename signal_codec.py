@@ -0,0 +1,133 @@
+import struct
+import numpy as np
+
+# Binary layout for ECG/EEG signals and FFT spectra stored in SQLite BLOB columns.
+# A fixed 24-byte little-endian header is followed by the raw sample payload:
+#   magic (4s) | version (B) | dtype code (B) | flags (H) | length (Q) | sampling rate (d)
+# The header size is a multiple of 8 so np.frombuffer can view float64 payloads aligned.
+# With FLAG_CHUNKED set the BLOB is the header alone: the samples of long recordings
+# live in fixed-size chunks (DatabaseManager.get_signal_window reads them).
+SIGNAL_MAGIC = b'SGNL'
+SIGNAL_VERSION = 1
+HEADER_FORMAT = '<4sBBHQd'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+FLAG_CHUNKED = 0x0001
+
+DTYPE_CODES = {1: np.dtype('<f4'), 2: np.dtype('<f8')}
+CODES_BY_DTYPE = {dtype: code for code, dtype in DTYPE_CODES.items()}
+
+DEFAULT_DTYPE = np.dtype('<f4')
+DEFAULT_SAMPLING_RATE = 1000.0
+
+
+def is_encoded_signal(value):
+    """Returns True when the value is a BLOB written by encode_signal."""
+    return isinstance(value, (bytes, bytearray, memoryview)) and bytes(value[:4]) == SIGNAL_MAGIC
+
+
+def is_chunked_signal(value):
+    """Returns True for a header-only BLOB whose samples are stored in chunks."""
+    return is_encoded_signal(value) and bool(struct.unpack_from(HEADER_FORMAT, value)[3] & FLAG_CHUNKED)
+
+
+def encode_signal(values, sampling_rate=DEFAULT_SAMPLING_RATE, dtype=DEFAULT_DTYPE):
+    """Packs a 1-D numeric array into the typed binary signal format."""
+    dtype = np.dtype(dtype).newbyteorder('<')
+    if dtype not in CODES_BY_DTYPE:
+        raise ValueError(f"Unsupported signal dtype: {dtype}")
+
+    data = np.ascontiguousarray(np.ravel(values), dtype=dtype)
+    header = struct.pack(HEADER_FORMAT, SIGNAL_MAGIC, SIGNAL_VERSION, CODES_BY_DTYPE[dtype],
+                         0, data.size, float(sampling_rate or 0.0))
+    return header + data.tobytes()
+
+
+def encode_chunked_header(length, sampling_rate=DEFAULT_SAMPLING_RATE, dtype=DEFAULT_DTYPE):
+    """Header-only BLOB standing in for a chunked signal of `length` samples."""
+    dtype = np.dtype(dtype).newbyteorder('<')
+    if dtype not in CODES_BY_DTYPE:
+        raise ValueError(f"Unsupported signal dtype: {dtype}")
+    return struct.pack(HEADER_FORMAT, SIGNAL_MAGIC, SIGNAL_VERSION, CODES_BY_DTYPE[dtype],
+                       FLAG_CHUNKED, int(length), float(sampling_rate or 0.0))
+
+
+def read_signal_header(blob):
+    """Returns (dtype, length, sampling_rate) without touching the sample payload."""
+    magic, version, dtype_code, _flags, length, sampling_rate = struct.unpack_from(HEADER_FORMAT, blob)
+    if magic != SIGNAL_MAGIC:
+        raise ValueError("Not an encoded signal BLOB.")
+    if version != SIGNAL_VERSION or dtype_code not in DTYPE_CODES:
+        raise ValueError(f"Unsupported signal format (version {version}, dtype {dtype_code}).")
+    return DTYPE_CODES[dtype_code], length, sampling_rate
+
+
+def decode_signal(blob):
+    """
+    Returns (array, sampling_rate) for an encoded signal BLOB.
+    The array is a zero-copy, read-only view over the BLOB bytes.
+    """
+    dtype, length, sampling_rate = read_signal_header(blob)
+    if is_chunked_signal(blob):
+        raise ValueError("Chunked signal: read its samples with DatabaseManager.read_signal/get_signal_window.")
+    data = np.frombuffer(blob, dtype=dtype, count=length, offset=HEADER_SIZE)
+    return data, sampling_rate
+
+
+def parse_signal_text(text):
+    """Parses the legacy comma-separated signal format into a float64 array."""
+    clean_str = str(text).replace('[', '').replace(']', '').replace('"', '').replace("'", "").replace("\n", "").strip()
+    if "," not in clean_str and " " in clean_str:
+        clean_str = clean_str.replace(" ", ",")
+    return np.array([float(x) for x in clean_str.split(',') if x.strip()], dtype=np.float64)
+
+
+def _is_missing(value):
+    if value is None:
+        return True
+    if isinstance(value, float) and np.isnan(value):
+        return True
+    return isinstance(value, str) and value.strip().lower() in ("", "nan", "none", "null")
+
+
+def to_signal_array(value):
+    """
+    Normalizes any stored signal representation (binary BLOB, legacy CSV text or
+    array-like) into a NumPy array. Returns None when no signal is present.
+    """
+    if _is_missing(value):
+        return None
+    if is_encoded_signal(value):
+        return decode_signal(value)[0]
+    if isinstance(value, str):
+        return parse_signal_text(value)
+    return np.atleast_1d(np.asarray(value, dtype=np.float64))
+
+
+def signal_sampling_rate(value, default=DEFAULT_SAMPLING_RATE):
+    """Returns the sampling rate stored in a signal header, or the default for legacy values."""
+    if is_encoded_signal(value):
+        sampling_rate = read_signal_header(value)[2]
+        if sampling_rate > 0:
+            return sampling_rate
+    return default
+
+
+def signal_length(value):
+    """Counts samples, reading only the header for binary signals."""
+    if _is_missing(value):
+        return 0
+    if is_encoded_signal(value):
+        return read_signal_header(value)[1]
+    if isinstance(value, str):
+        return len([x for x in value.split(',') if x.strip()])
+    return int(np.size(value))
+
+
+def to_signal_blob(value, sampling_rate=DEFAULT_SAMPLING_RATE, dtype=DEFAULT_DTYPE):
+    """Converts text or array signals into the binary format. Missing values become None."""
+    if is_encoded_signal(value):
+        return bytes(value)
+    data = to_signal_array(value)
+    if data is None or data.size == 0:
+        return None
+    return encode_signal(data, sampling_rate=sampling_rate, dtype=dtype)
@@ -0,0 +1,89 @@
+import numpy as np
+from signal_codec import DEFAULT_SAMPLING_RATE
+from lazy_imports import LazyModule
+
+sps = LazyModule('scipy.signal')
+sp_integrate = LazyModule('scipy.integrate')
+
+# Frequency bands (Hz) for band-power summaries
+EEG_BANDS = {
+    'Delta': (0.5, 4.0),
+    'Theta': (4.0, 8.0),
+    'Alpha': (8.0, 13.0),
+    'Beta': (13.0, 30.0),
+    'Gamma': (30.0, 45.0),
+}
+
+ECG_BANDS = {
+    'Baseline': (0.0, 0.5),
+    'P/T waves': (0.5, 5.0),
+    'QRS': (5.0, 15.0),
+    'High freq': (15.0, 40.0),
+    'Powerline': (45.0, 65.0),
+}
+
+# Welch segments cover this many seconds (0.25 Hz resolution), STFT frames a quarter second
+WELCH_SECONDS = 4.0
+STFT_SECONDS = 0.25
+
+
+def _clean(values):
+    data = np.asarray(values, dtype=np.float64)
+    return data[~np.isnan(data)]
+
+
+def default_nperseg(n_samples, sampling_rate, seconds=WELCH_SECONDS):
+    """Segment length for Welch/STFT: `seconds` worth of samples, capped at the signal length."""
+    return int(max(8, min(n_samples, round(seconds * sampling_rate))))
+
+
+def fft_spectrum(values, sampling_rate=DEFAULT_SAMPLING_RATE):
+    """Single-window magnitude spectrum with the frequency axis in Hz. NaNs are dropped."""
+    data = _clean(values)
+    if len(data) == 0:
+        return None, None
+    return np.fft.rfftfreq(len(data), d=1.0 / sampling_rate), np.abs(np.fft.rfft(data))
+
+
+def welch_psd(values, sampling_rate=DEFAULT_SAMPLING_RATE, nperseg=None, overlap=0.5, window='hann'):
+    """
+    Welch power spectral density (V**2/Hz): averages overlapping windowed periodograms,
+    so long recordings give a smooth, stable estimate with only nperseg // 2 + 1 bins.
+    """
+    data = _clean(values)
+    if len(data) < 8:
+        return None, None
+    nperseg = min(nperseg or default_nperseg(len(data), sampling_rate), len(data))
+    return sps.welch(data, fs=sampling_rate, window=window, nperseg=nperseg,
+                     noverlap=int(nperseg * overlap), detrend='constant')
+
+
+def welch_frequencies(nperseg, sampling_rate=DEFAULT_SAMPLING_RATE):
+    """Frequency axis of a welch_psd result (for cached PSDs stored without it)."""
+    return np.fft.rfftfreq(nperseg, d=1.0 / sampling_rate)
+
+
+def stft_spectrogram(values, sampling_rate=DEFAULT_SAMPLING_RATE, nperseg=None, overlap=0.5, window='hann'):
+    """Windowed STFT power spectrogram. Returns (freqs, times in seconds, power[freq, time])."""
+    data = _clean(values)
+    if len(data) < 8:
+        return None, None, None
+    nperseg = min(nperseg or default_nperseg(len(data), sampling_rate, STFT_SECONDS), len(data))
+    return sps.spectrogram(data, fs=sampling_rate, window=window, nperseg=nperseg,
+                           noverlap=int(nperseg * overlap), scaling='density', mode='psd')
+
+
+def band_powers(freqs, psd, bands=EEG_BANDS):
+    """
+    Integrates a PSD over each band. Returns {band: (absolute power, fraction of total)};
+    bands above the Nyquist frequency report zero.
+    """
+    freqs = np.asarray(freqs)
+    psd = np.asarray(psd)
+    total = sp_integrate.trapezoid(psd, freqs) if len(freqs) > 1 else 0.0
+    powers = {}
+    for name, (low, high) in bands.items():
+        mask = (freqs >= low) & (freqs <= high)
+        power = sp_integrate.trapezoid(psd[mask], freqs[mask]) if mask.sum() > 1 else 0.0
+        powers[name] = (power, power / total if total > 0 else 0.0)
+    return powers
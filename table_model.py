@@ -0,0 +1,135 @@
+import pandas as pd
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from signal_codec import signal_length, to_signal_array, is_chunked_signal
+
+# Columns hidden from the dataset view to keep it clean
+EXCLUDED_COLUMNS = [
+    'Sleep_Hours', 'Sleep Hours',
+    'Triglyceride_Level', 'Triglyceride Level',
+    'CRP_Level', 'CRP Level',
+    'Homocysteine_Level', 'Homocysteine Level'
+]
+
+SIGNAL_DISPLAY_COLUMNS = ('ECG_Signal', 'ECG Signal')
+IMAGE_DISPLAY_COLUMNS = {
+    'Original_Image_Data': "Original Image Saved",
+    'Image_Data': "Processed Image Saved",
+    'Image Data': "Image Stored",
+}
+FFT_DISPLAY_COLUMNS = ('ECG_FFT_Magnitude',)
+CORRELATION_COLUMNS = ('Correlation_Data',)
+
+STATUS_COLUMNS = set(SIGNAL_DISPLAY_COLUMNS) | set(IMAGE_DISPLAY_COLUMNS) | set(FFT_DISPLAY_COLUMNS) | set(CORRELATION_COLUMNS)
+CENTERED_COLUMNS = STATUS_COLUMNS - {'Original_Image_Data'}
+
+# Rows handed to the view per fetchMore() call while scrolling
+FETCH_BATCH = 500
+
+
+def _is_blank(val):
+    return val is None or str(val).strip() in ("", "None", "nan", "NULL")
+
+
+def _signal_status(val):
+    points = signal_length(val)
+    if points > 1 and is_chunked_signal(val):
+        return f"{points} pts [chunked]"
+    if points > 1:
+        return f"{points} pts [{to_signal_array(val)[0]:.3f}...]"
+    return "No Signal"
+
+
+def _status_text(col, val):
+    """Friendly label for signal, image, FFT and correlation cells."""
+    if col in SIGNAL_DISPLAY_COLUMNS:
+        return _signal_status(val)
+    if col in IMAGE_DISPLAY_COLUMNS:
+        return "No Image" if _is_blank(val) else IMAGE_DISPLAY_COLUMNS[col]
+    if col in FFT_DISPLAY_COLUMNS:
+        return "FFT Computed" if signal_length(val) > 1 else "No FFT Data"
+    if col in CORRELATION_COLUMNS:
+        return "N/A" if _is_blank(val) else str(val).strip()
+    return None
+
+
+class PatientTableModel(QAbstractTableModel):
+    """
+    Read-only table model over a DataFrame for the dataset view.
+    Rows are exposed to the view in batches (canFetchMore/fetchMore) and cells are
+    formatted in data() only when painted. Status labels (signals, images, FFT,
+    correlation) are kept in per-column caches, so each is computed at most once.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._row_total = 0
+        self._columns = []
+        self._arrays = []
+        self._status_cache = {}
+        self._loaded_rows = 0
+
+    def set_dataframe(self, df):
+        """Replaces the model contents; the view is reset instead of rebuilt cell by cell."""
+        self.beginResetModel()
+        if df is None:
+            df = pd.DataFrame()
+
+        # Per-column arrays are views on the DataFrame blocks, so nothing is copied here
+        keep = [j for j, col in enumerate(df.columns) if col not in EXCLUDED_COLUMNS]
+        self._row_total = len(df)
+        self._columns = [str(df.columns[j]) for j in keep]
+        self._arrays = [df.iloc[:, j].to_numpy() for j in keep]
+        self._status_cache = {}
+        self._loaded_rows = min(self._row_total, FETCH_BATCH)
+        self.endResetModel()
+
+    # --- Lazy row loading ---
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded_rows < self._row_total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(FETCH_BATCH, self._row_total - self._loaded_rows)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded_rows, self._loaded_rows + count - 1)
+        self._loaded_rows += count
+        self.endInsertRows()
+
+    # --- QAbstractTableModel interface ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded_rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self._columns[section] if section < len(self._columns) else None
+        return str(section + 1)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        col = self._columns[index.column()]
+
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter if col in CENTERED_COLUMNS else None
+        if role != Qt.DisplayRole:
+            return None
+
+        val = self._arrays[index.column()][index.row()]
+        if col in STATUS_COLUMNS:
+            return self._status(index.row(), index.column(), col, val)
+        return str(val).strip() if val is not None else ""
+
+    def _status(self, row, column, col, val):
+        """Cached status label; binary signal counts read only the BLOB header."""
+        cache = self._status_cache.setdefault(column, [None] * self._row_total)
+        if cache[row] is None:
+            cache[row] = _status_text(col, val)
+        return cache[row]
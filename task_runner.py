@@ -0,0 +1,142 @@
+import itertools
+import threading
+import traceback
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task when its cancellation token has been triggered."""
+
+
+class TaskWarning(Exception):
+    """A user-facing problem (missing data, bad selection) reported by a background task."""
+
+    def __init__(self, title, message):
+        super().__init__(message)
+        self.title = title
+
+
+class CancellationToken:
+    """Thread-safe flag a background task polls between its steps."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise TaskCancelled()
+
+
+class TaskSignals(QObject):
+    """Created on the GUI thread, so connected slots are invoked there (queued)."""
+    result = pyqtSignal(object)
+    error = pyqtSignal(object)
+    finished = pyqtSignal()
+
+
+class Task(QRunnable):
+    """Runs compute(token, *args, **kwargs) on a pool thread and reports through TaskSignals."""
+
+    def __init__(self, compute, token, *args, **kwargs):
+        super().__init__()
+        self.compute = compute
+        self.token = token
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+
+    def run(self):
+        try:
+            self.token.raise_if_cancelled()
+            result = self.compute(self.token, *self.args, **self.kwargs)
+            self.token.raise_if_cancelled()
+        except TaskCancelled:
+            pass
+        except Exception as e:
+            if not isinstance(e, TaskWarning):
+                traceback.print_exc()
+            self.signals.error.emit(e)
+        else:
+            self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+
+class TaskRunner(QObject):
+    """
+    Shared worker layer for the GUI: compute steps run on a QThreadPool, results and
+    errors are delivered to callbacks on the GUI thread.
+    Tasks submitted under the same key coalesce ("latest request wins"): a new submission
+    cancels the previous token and stale results are dropped instead of rendered.
+    """
+
+    def __init__(self, max_threads=None, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        if max_threads:
+            self.pool.setMaxThreadCount(max_threads)
+        self._latest = {}
+        self._running = set()
+        self._ids = itertools.count()
+
+    def submit(self, key, compute, on_result, on_error=None, *args, **kwargs):
+        """
+        Queues compute(token, *args, **kwargs). key=None opts out of coalescing (e.g. writes).
+        Returns the task's CancellationToken.
+        """
+        if key is None:
+            key = ('unique', next(self._ids))
+        previous = self._latest.get(key)
+        if previous is not None:
+            previous.cancel()
+
+        token = CancellationToken()
+        self._latest[key] = token
+
+        task = Task(compute, token, *args, **kwargs)
+        task.setAutoDelete(False)
+        task.signals.result.connect(lambda result: self._deliver(key, token, on_result, result))
+        task.signals.error.connect(lambda error: self._deliver(key, token, on_error, error))
+        task.signals.finished.connect(lambda: self._finish(key, token, task))
+
+        # Keep the Python wrapper alive until the pool is done with it
+        self._running.add(task)
+        self.pool.start(task)
+        return token
+
+    def cancel(self, key):
+        token = self._latest.pop(key, None)
+        if token is not None:
+            token.cancel()
+
+    def cancel_all(self):
+        """Cancels every coalesced task; key=None tasks (writes) are left to finish."""
+        for key in [key for key in self._latest if not (isinstance(key, tuple) and key[0] == 'unique')]:
+            self._latest.pop(key).cancel()
+
+    def is_busy(self, key):
+        return key in self._latest
+
+    def wait(self, msecs=-1):
+        """Blocks until queued tasks finish (used on shutdown)."""
+        return self.pool.waitForDone(msecs)
+
+    def _deliver(self, key, token, callback, value):
+        # Only the newest task for a key may touch the UI
+        if token.cancelled or self._latest.get(key) is not token:
+            return
+        if callback is not None:
+            callback(value)
+
+    def _finish(self, key, token, task):
+        if self._latest.get(key) is token:
+            del self._latest[key]
+        self._running.discard(task)